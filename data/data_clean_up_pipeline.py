@@ -6,20 +6,87 @@ Comprehensive pipeline for:
 2. Data Integrity: Handle missing values, duplicates, and outliers
 3. Normalization: Standardize timestamps, numeric fields, and categorical identifiers
 4. Feature Engineering: Create derived features for deeper insights
+
+Usage: python data_clean_up_pipeline.py [--streaming] [--backend pandas|duckdb] [--dry-run]
+                                        [--watch [--once]] [--replace-trips]
 """
 
-import pandas as pd
-import numpy as np
 import os
+import io
+import sys
+import shutil
+import glob
+import gzip
+import zlib
+import base64
+import json
+import math
+import time
+import sqlite3
+import queue
+import hashlib
+import argparse
+import asyncio
+import signal
+import threading
+import contextlib
+import tracemalloc
+import importlib
+import importlib.util
+import importlib.metadata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-import warnings
-warnings.filterwarnings('ignore')
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access,
+    optionally calling on_load(module) once it is"""
+    
+    def __init__(self, name, on_load=None):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_on_load'] = on_load
+    
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._lazy_name)
+        # Later lookups hit the copied attributes without coming back here
+        self.__dict__.update(vars(module))
+        on_load = self.__dict__.pop('_lazy_on_load', None)
+        if on_load is not None:
+            on_load(module)
+        return getattr(module, attr)
+
+
+def _copy_on_write(_module):
+    """Copy-on-write: filtered frames never alias their parent, so stages can
+    assign columns without SettingWithCopy ambiguity or defensive copies.
+    Always on from pandas 3, where the option is deprecated"""
+    if int(importlib.metadata.version('pandas').split('.')[0]) < 3:
+        importlib.import_module('pandas').set_option('mode.copy_on_write', True)
+
+
+# The data stack loads when a stage first touches it, so importing this
+# module (for Config, or --dry-run) doesn't pay for pandas and pyarrow.
+# Frames also come from pyarrow's to_pandas, so pyarrow switches on
+# copy-on-write as well, before the first frame is built
+pd = LazyModule('pandas', on_load=_copy_on_write)
+np = LazyModule('numpy')
+pa = LazyModule('pyarrow', on_load=_copy_on_write)
+pc = LazyModule('pyarrow.compute', on_load=_copy_on_write)
+pacsv = LazyModule('pyarrow.csv', on_load=_copy_on_write)
+ds = LazyModule('pyarrow.dataset', on_load=_copy_on_write)
+pq = LazyModule('pyarrow.parquet', on_load=_copy_on_write)
+
+# Optional dependencies are imported where they are used: geopandas to
+# build the zone geometry index, duckdb by the duckdb backend
+HAS_GEOPANDAS = importlib.util.find_spec('geopandas') is not None
+HAS_DUCKDB = importlib.util.find_spec('duckdb') is not None
 
 try:
-    import geopandas as gpd
-    HAS_GEOPANDAS = True
-except ImportError:
-    HAS_GEOPANDAS = False
+    import resource
+    HAS_RESOURCE = True
+except ImportError:  # not available on Windows
+    HAS_RESOURCE = False
 
 # =====================================================================
 # CONFIGURATION
@@ -41,12 +108,52 @@ class Config:
     TRIP_DATA_PARQUET = os.path.join(CLEAN_DATA_DIR, "tripdata.parquet")
     ZONE_LOOKUP_CSV = os.path.join(RAW_DATA_DIR, "taxi_zone_lookup.csv")
     TAXI_ZONES_SHP = os.path.join(TAXI_ZONES_DIR, "taxi_zones.shp")
+    # Monthly inputs (glob pattern or list of paths) for multi-file runs
+    TRIP_DATA_FILES = os.path.join(RAW_DATA_DIR, "yellow_tripdata_*.csv")
+    
+    # Ingest schema for yellow trip CSV/Parquet, applied by DataLoader.
+    # IDs use nullable small ints (later months contain nulls). Fee-like
+    # fields only feed the total-amount check and fit float32 until
+    # normalize_numeric_fields widens them for output; fields that are
+    # compared to thresholds or divided in features stay float64 so
+    # results don't shift at a threshold or cent boundary.
+    TRIP_DATETIME_COLUMNS = ['tpep_pickup_datetime', 'tpep_dropoff_datetime']
+    DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+    TRIP_DTYPES = {
+        'VendorID': 'Int8',
+        'passenger_count': 'Int8',
+        'trip_distance': 'float64',
+        'RatecodeID': 'Int8',
+        'store_and_fwd_flag': 'category',
+        'PULocationID': 'Int16',
+        'DOLocationID': 'Int16',
+        'payment_type': 'Int8',
+        'fare_amount': 'float64',
+        'extra': 'float32',
+        'mta_tax': 'float32',
+        'tip_amount': 'float64',
+        'tolls_amount': 'float32',
+        'improvement_surcharge': 'float32',
+        'total_amount': 'float64',
+        'congestion_surcharge': 'float32',
+    }
     
     # Output files
     CLEAN_TRIP_DATA = os.path.join(CLEAN_DATA_DIR, "clean_tripdata_2019-01.csv")
     INTEGRATED_DATA = os.path.join(CLEAN_DATA_DIR, "integrated_trip_data.parquet")
+    FEATHER_DATA = os.path.join(CLEAN_DATA_DIR, "integrated_trip_data.feather")
     ZONE_DATA = os.path.join(CLEAN_DATA_DIR, "clean_taxi_zone_data.csv")
     REPORT_FILE = os.path.join(CLEAN_DATA_DIR, "data_quality_report.txt")
+    PROFILE_REPORT = os.path.join(CLEAN_DATA_DIR, "data_quality_report.json")  # column profiles + counters
+    PROFILE_FILE = os.path.join(CLEAN_DATA_DIR, "run_profile.json")  # per-stage timings
+    CACHE_DIR = os.path.join(CLEAN_DATA_DIR, "cache")
+    ROLLUP_DIR = os.path.join(CLEAN_DATA_DIR, "rollups")  # one Parquet file per rollup
+    OD_MATRIX_DIR = os.path.join(CLEAN_DATA_DIR, "od_matrix")  # hour x zone x zone .npy arrays
+    OUTLIER_STATS_DIR = os.path.join(CLEAN_DATA_DIR, "outlier_stats")  # binned metrics per month
+    ZONE_INDEX_DIR = os.path.join(CLEAN_DATA_DIR, "zone_index")  # zone geometry .npy arrays
+    DATABASE = os.path.join(os.path.dirname(BASE_DIR), "server", "database.db")
+    PARTITIONS_DIR = os.path.join(CLEAN_DATA_DIR, "integrated_trip_data")  # one file per month
+    INGEST_DIR = os.path.join(CLEAN_DATA_DIR, "ingest")  # manifest + per-file counters and profiles
     
     # Data quality thresholds
     MAX_TRIP_DISTANCE = 100  # miles
@@ -57,6 +164,218 @@ class Config:
     MIN_TRIP_DURATION = 1  # minute
     MAX_PASSENGER_COUNT = 6
     MIN_PASSENGER_COUNT = 1
+    TOTAL_AMOUNT_TOLERANCE = 0.5  # dollars between total_amount and its parts
+    
+    # Outlier rules, all evaluated in one pass by DataCleaner.detect_outliers:
+    # (report key, label, column, min threshold, max threshold). Thresholds
+    # may name a Config attribute so overrides apply; None means unbounded.
+    # Order matters for the "first rule that rejected" counts.
+    OUTLIER_RULES = [
+        ('distance', 'Distance outliers', 'trip_distance', 'MIN_TRIP_DISTANCE', 'MAX_TRIP_DISTANCE'),
+        ('fare', 'Fare outliers', 'fare_amount', 'MIN_FARE', 'MAX_FARE'),
+        ('passenger_count', 'Passenger count outliers', 'passenger_count',
+         'MIN_PASSENGER_COUNT', 'MAX_PASSENGER_COUNT'),
+        ('temporal', 'Temporal outliers', 'trip_duration_minutes', 'MIN_TRIP_DURATION', 'MAX_TRIP_DURATION'),
+        ('logical', 'Logical outliers', 'trip_duration_minutes', 0, None),  # dropoff before pickup
+        ('total_mismatch', 'Total amount mismatches', 'total_amount_mismatch', None, 'TOTAL_AMOUNT_TOLERANCE'),
+    ]
+    
+    # Statistical outliers (RobustStats): median and MAD of trip duration,
+    # speed and fare per mile for each pickup hour and zone pair, taken over
+    # the other months in OUTLIER_STATS_DIR. A trip is outside a band when
+    # |value - median| > band * 1.4826 * MAD (a robust z-score). Opt-in:
+    # 'flag' adds an int8 is_stat_outlier column to the integrated trips and
+    # their exports (not the database), 'remove' drops the trips. History
+    # builds up from the runs that have it enabled
+    STAT_OUTLIERS = None
+    STAT_OUTLIER_BANDS = {'trip_duration_minutes': 5.0, 'avg_speed_mph': 5.0, 'fare_per_mile': 5.0}
+    STAT_OUTLIER_MIN_TRIPS = 20  # cells with fewer trips of history aren't judged
+    
+    # Streaming execution
+    STREAMING = False  # process the month chunk by chunk instead of in memory
+    CHUNK_SIZE = 100000  # rows per batch when reading CSV / Parquet
+    # Batch by batch (streaming and duckdb): decode the next batch and write
+    # the previous one on background threads while the current one is
+    # transformed (PipelinedIO); False runs the three steps in turn
+    PIPELINED_IO = True
+    PIPELINE_QUEUE_SIZE = 2  # batches waiting on each side of the transform
+    
+    # Execution backend: 'pandas', or 'duckdb' to run the integrity stages
+    # (missing values, duplicates, outliers) as multithreaded SQL over the
+    # Parquet input, spilling to disk past the memory limit; the remaining
+    # stages and outputs then stream batch by batch as in STREAMING mode
+    BACKEND = 'pandas'
+    DUCKDB_THREADS = None  # None = one per CPU core
+    DUCKDB_MEMORY_LIMIT = None  # e.g. '4GB'; None = DuckDB default (80% of RAM)
+    DUCKDB_TEMP_DIR = os.path.join(CLEAN_DATA_DIR, "cache", "duckdb")  # scratch database and spills
+    
+    # Stage cache (batch mode): reuse intermediate outputs whose inputs,
+    # settings and code are unchanged. Single-file runs only: multi-file and
+    # ingest workers skip it, as a year of full-month stage copies would
+    # only evict each other
+    STAGE_CACHE = True
+    CACHE_MAX_BYTES = 2 * 1024 ** 3  # least recently used entries evicted beyond this
+    
+    # Column profiles (DataProfile): one pass per chunk over every column of
+    # the raw and the final trips, merged across chunks and files
+    PROFILE_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+    PROFILE_QUANTILE_ACCURACY = 0.01  # relative error of sketched quantiles
+    PROFILE_TOP_K = 10  # most frequent values reported per column
+    PROFILE_FREQUENT_ITEMS = 256  # value counters kept; exact below this many distinct values
+    PROFILE_DISTINCT_PRECISION = 12  # HyperLogLog with 2**12 registers (~1.6% error)
+    
+    # Derived features to compute (None = every registered feature that is
+    # available; the zone geometry features need the shapefile or a built
+    # ZONE_INDEX_DIR); their dependencies are resolved by FeatureEngineer.registry
+    DERIVED_FEATURES = None
+    
+    # Integrated output layout. With partition columns the output path becomes
+    # a hive-style directory (pickup_year=2019/pickup_month=1/...) that
+    # TripStore.read can prune; None writes a single file
+    OUTPUT_PARTITION_COLS = None  # e.g. ['pickup_year', 'pickup_month', 'pickup_day', 'pickup_borough']
+    PARQUET_COMPRESSION = 'snappy'  # or 'zstd': smaller files, slightly slower reads
+    PARQUET_ROW_GROUP_SIZE = 250000  # rows; smaller groups let statistics skip more
+    # Exports besides the Parquet output: 'csv' (CLEAN_TRIP_DATA), 'feather'
+    # (FEATHER_DATA, Arrow IPC); [] writes Parquet only
+    OUTPUT_FORMATS = ['csv']
+    CSV_COMPRESSION = None  # 'gzip' writes CLEAN_TRIP_DATA + '.gz'
+    CSV_COMPRESSION_LEVEL = 1  # gzip level; 1 is ~10x faster than 9 for ~25% more bytes
+    EXPORT_IN_BACKGROUND = True  # overlap the exports with the rest of the run
+    
+    # Dashboard rollups: name -> group keys. Built from the final trips and
+    # written to ROLLUP_DIR (and rollup_<name> tables on database load)
+    ROLLUPS = {
+        'hour_dayofweek': ['pickup_dayofweek', 'pickup_hour'],
+        'borough_pair': ['pickup_borough', 'dropoff_borough'],
+        'zone': ['PULocationID', 'pickup_borough', 'pickup_zone'],
+        'payment_type': ['payment_type'],
+        'vendor': ['VendorID'],
+    }
+    # Origin-destination arrays (ODMatrix): trips, revenue, duration and
+    # speed per hour and zone pair; months add up in OD_MATRIX_DIR
+    OD_MATRIX = True
+    
+    # SQLite bulk load into the server database (after save_results)
+    LOAD_DATABASE = False
+    # Clear the trips table first (the server's own trips too); --replace-trips.
+    # Otherwise a source file's trips from an earlier load are replaced
+    DB_REPLACE_TRIPS = False
+    DB_BATCH_SIZE = 500000  # rows per executemany / transaction
+    # TLC code lists for the vendors and payments lookup tables
+    VENDOR_NAMES = {1: 'Creative Mobile Technologies, LLC', 2: 'VeriFone Inc.'}
+    PAYMENT_TYPES = {1: 'Credit card', 2: 'Cash', 3: 'No charge', 4: 'Dispute',
+                     5: 'Unknown', 6: 'Voided trip'}
+    
+    # Duplicate detection: 64-bit keys over DataCleaner.DUPLICATE_COLS
+    DUPLICATE_MODE = 'exact'  # 'exact' key set, or 'bloom' (approximate, fixed memory)
+    DUPLICATE_PARTITION = 'D'  # split the exact key set by pickup day; None = one set
+    # Directory to persist kept keys across runs (e.g. for backfills), one
+    # .npz per source file; a file is never checked against its own keys,
+    # so re-running a month keeps its trips
+    DUPLICATE_KEYS_DIR = None
+    BLOOM_CAPACITY = 20_000_000  # keys the Bloom filter is sized for
+    BLOOM_ERROR_RATE = 1e-4  # false-positive rate at capacity (drops a real trip)
+    
+    # Instrumentation: tracemalloc gives per-stage Python allocation peaks
+    # but slows allocation-heavy stages noticeably, so it is opt-in
+    PROFILE_TRACEMALLOC = False
+    
+    # Multi-file execution
+    MAX_WORKERS = None  # worker processes, None = one per CPU core
+    
+    # Watch-folder ingestion (IngestDaemon, --watch): poll TRIP_DATA_FILES and
+    # process only files whose size and hash differ from the manifest
+    WATCH_INTERVAL = 60  # seconds between scans
+    WATCH_SETTLE_SECONDS = 10  # files modified more recently may still be copying
+    WATCH_MAX_CONCURRENT = 2  # files processed at once, one worker process each
+    
+    @classmethod
+    def settings(cls):
+        """Snapshot of all settings, to hand to worker processes"""
+        return {name: value for name, value in vars(cls).items() if name.isupper()}
+    
+    @staticmethod
+    def source_key(path):
+        """Name for per-file state: the file stem plus a hash of its absolute
+        path, so same-named files in different directories stay apart"""
+        stem = os.path.splitext(os.path.basename(path))[0]
+        digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:10]
+        return f"{stem}-{digest}"
+    
+    @classmethod
+    def use_trip_file(cls, path):
+        """Point the per-month input and output paths at one trip file"""
+        # Named by source_key: same-named months from different directories
+        # must not overwrite each other's outputs
+        key = cls.source_key(path)
+        
+        if path.endswith('.parquet'):
+            cls.TRIP_DATA_CSV = None
+            cls.TRIP_DATA_PARQUET = path
+        else:
+            cls.TRIP_DATA_CSV = path
+            cls.TRIP_DATA_PARQUET = os.path.join(cls.CLEAN_DATA_DIR, f"{key}.parquet")
+        cls.CLEAN_TRIP_DATA = os.path.join(cls.CLEAN_DATA_DIR, f"clean_{key}.csv")
+        cls.INTEGRATED_DATA = os.path.join(cls.PARTITIONS_DIR, f"{key}.parquet")
+        cls.FEATHER_DATA = os.path.join(cls.PARTITIONS_DIR, f"{key}.feather")
+    
+    @classmethod
+    def validate(cls):
+        """Problems with the settings and inputs, found without loading any data"""
+        problems = []
+        
+        if cls.BACKEND not in DataPipeline.BACKENDS:
+            problems.append(f"Unknown backend: {cls.BACKEND}")
+        elif cls.BACKEND == 'duckdb':
+            if not HAS_DUCKDB:
+                problems.append("BACKEND = 'duckdb' needs the duckdb package")
+            if cls.DUPLICATE_KEYS_DIR:
+                problems.append("DUPLICATE_KEYS_DIR needs the pandas backend")
+        if cls.DUPLICATE_MODE not in DuplicateIndex.MODES:
+            problems.append(f"Unknown duplicate mode: {cls.DUPLICATE_MODE}")
+        unknown = set(cls.OUTPUT_FORMATS) - set(TripExport.FORMATS)
+        if unknown:
+            problems.append(f"Unknown output formats: {sorted(unknown)}")
+        if cls.CSV_COMPRESSION not in (None, 'gzip'):
+            problems.append(f"Unknown CSV compression: {cls.CSV_COMPRESSION}")
+        if cls.CHUNK_SIZE <= 0:
+            problems.append(f"CHUNK_SIZE must be positive, not {cls.CHUNK_SIZE}")
+        if cls.PIPELINE_QUEUE_SIZE < 1:
+            problems.append(f"PIPELINE_QUEUE_SIZE must be at least 1, not {cls.PIPELINE_QUEUE_SIZE}")
+        if cls.WATCH_MAX_CONCURRENT < 1:
+            problems.append(f"WATCH_MAX_CONCURRENT must be at least 1, not {cls.WATCH_MAX_CONCURRENT}")
+        
+        for key, label, column, *thresholds in cls.OUTLIER_RULES:
+            for threshold in thresholds:
+                if isinstance(threshold, str) and not hasattr(cls, threshold):
+                    problems.append(f"Outlier rule {key} refers to unknown setting {threshold}")
+        if cls.STAT_OUTLIERS not in (None, 'flag', 'remove'):
+            problems.append(f"Unknown statistical outlier action: {cls.STAT_OUTLIERS}")
+        for metric, band in cls.STAT_OUTLIER_BANDS.items():
+            if metric not in RobustStats.METRICS:
+                problems.append(f"Unknown statistical outlier metric: {metric}")
+            elif band is not None and band <= 0:
+                problems.append(f"Band for {metric} must be positive, not {band}")
+        registry = FeatureEngineer.registry
+        for name in cls.DERIVED_FEATURES or []:
+            if name not in registry.features:
+                problems.append(f"Unknown feature: {name}")
+        # Named geometry features (or their dependencies) can't be skipped like defaults
+        columns = {col for feature in registry.features.values() for col in feature['inputs']
+                   if col not in registry.features}
+        needed = registry.resolve([name for name in cls.DERIVED_FEATURES or [] if name in registry.features],
+                                  available=columns)
+        geometry = [name for name in needed if registry.features[name]['available'] == ZoneGeometry.available]
+        if geometry and ZoneGeometry.missing():
+            problems.append(f"Features {', '.join(geometry)} need {ZoneGeometry.missing()}")
+        
+        if not os.path.exists(cls.ZONE_LOOKUP_CSV):
+            problems.append(f"Zone lookup not found: {cls.ZONE_LOOKUP_CSV}")
+        if len(DataLoader.find_trip_files()) <= 1 and not any(
+                path and os.path.exists(path) for path in [cls.TRIP_DATA_CSV, cls.TRIP_DATA_PARQUET]):
+            problems.append(f"Trip data not found: {cls.TRIP_DATA_CSV or cls.TRIP_DATA_PARQUET}")
+        
+        return problems
 
 # =====================================================================
 # STEP 1: DATA INTEGRATION
@@ -69,33 +388,123 @@ class DataLoader:
     def convert_csv_to_parquet():
         """Convert CSV to Parquet for efficient processing"""
         
-        if os.path.exists(Config.TRIP_DATA_PARQUET):
+        # A Parquet input (no CSV source) is used as-is; an earlier
+        # conversion is reused only if it came from the same CSV and
+        # ingest schema
+        has_csv = bool(Config.TRIP_DATA_CSV) and os.path.exists(Config.TRIP_DATA_CSV)
+        if os.path.exists(Config.TRIP_DATA_PARQUET) and not has_csv:
             return
+        source = DataLoader.source_fingerprint()
+        if os.path.exists(Config.TRIP_DATA_PARQUET):
+            if StageCache.read_metadata(Config.TRIP_DATA_PARQUET).get('source') == source:
+                return
         
-        # Read CSV in chunks for memory efficiency
-        chunk_size = 100000
-        chunks = []
-        
-        for i, chunk in enumerate(pd.read_csv(Config.TRIP_DATA_CSV, chunksize=chunk_size)):
-            chunks.append(chunk)
-            if (i + 1) % 10 == 0:
-                print(f"  Processed {(i+1)*chunk_size:,} rows...")
+        # Read CSV in chunks and append each one as a row group, so memory
+        # stays bounded by the chunk size instead of the whole month
+        chunk_size = Config.CHUNK_SIZE
+        writer = None
         
-        df = pd.concat(chunks, ignore_index=True)
-        df.to_parquet(Config.TRIP_DATA_PARQUET, engine='pyarrow', compression='snappy')
+        try:
+            for i, chunk in enumerate(DataLoader.read_trip_csv(Config.TRIP_DATA_CSV, chunksize=chunk_size)):
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    # Integer columns outside the schema become float64 as soon
+                    # as a chunk holds a null, so widen them up front
+                    schema = pa.schema([
+                        pa.field(field.name, pa.float64())
+                        if pa.types.is_integer(field.type) and field.name not in Config.TRIP_DTYPES
+                        else field
+                        for field in table.schema
+                    ], metadata=StageCache.with_metadata(table.schema.metadata, {'source': source}))
+                    writer = pq.ParquetWriter(Config.TRIP_DATA_PARQUET, schema, compression='snappy')
+                writer.write_table(table.cast(schema))
+                if (i + 1) % 10 == 0:
+                    print(f"  Processed {(i+1)*chunk_size:,} rows...")
+        finally:
+            if writer is not None:
+                writer.close()
         
     
     @staticmethod
     def load_trip_data():
         """Load trip data from Parquet"""
         
-        if not os.path.exists(Config.TRIP_DATA_PARQUET):
-            DataLoader.convert_csv_to_parquet()
+        DataLoader.convert_csv_to_parquet()
         
-        df = pd.read_parquet(Config.TRIP_DATA_PARQUET)
+        df = DataLoader.apply_schema(pd.read_parquet(Config.TRIP_DATA_PARQUET))
+        print(f"  Loaded {len(df):,} rows, {DataLoader.memory_per_row(df):.0f} bytes/row in memory")
         
         return df
     
+    @staticmethod
+    def source_fingerprint():
+        """Fingerprint of the raw trip input and ingest schema"""
+        if Config.TRIP_DATA_CSV and os.path.exists(Config.TRIP_DATA_CSV):
+            source = StageCache.fingerprint(Config.TRIP_DATA_CSV)
+        elif os.path.exists(Config.TRIP_DATA_PARQUET):
+            source = StageCache.fingerprint(Config.TRIP_DATA_PARQUET)
+        else:
+            return None
+        
+        return StageCache.make_key(source, Config.TRIP_DTYPES,
+                                   Config.TRIP_DATETIME_COLUMNS, Config.DATETIME_FORMAT)
+    
+    @staticmethod
+    def read_trip_csv(path, chunksize=None):
+        """Read a trip CSV with the ingest schema (datetimes parsed on read)"""
+        header = pd.read_csv(path, nrows=0).columns
+        
+        return pd.read_csv(
+            path,
+            dtype={col: dtype for col, dtype in Config.TRIP_DTYPES.items() if col in header},
+            parse_dates=[col for col in Config.TRIP_DATETIME_COLUMNS if col in header],
+            date_format=Config.DATETIME_FORMAT,
+            chunksize=chunksize,
+        )
+    
+    @staticmethod
+    def apply_schema(df):
+        """Cast trip columns to the ingest schema where they differ"""
+        for col in Config.TRIP_DATETIME_COLUMNS:
+            if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+                df[col] = pd.to_datetime(df[col], format=Config.DATETIME_FORMAT)
+        
+        casts = {col: dtype for col, dtype in Config.TRIP_DTYPES.items()
+                 if col in df.columns and str(df[col].dtype) != dtype}
+        
+        return df.astype(casts) if casts else df
+    
+    @staticmethod
+    def memory_per_row(df):
+        """Resident bytes per row, including string payloads"""
+        return df.memory_usage(deep=True).sum() / max(len(df), 1)
+    
+    @staticmethod
+    def find_trip_files(inputs=None):
+        """Resolve a glob pattern or list of paths/patterns to trip files"""
+        inputs = Config.TRIP_DATA_FILES if inputs is None else inputs
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        
+        files = []
+        for pattern in inputs:
+            for path in sorted(glob.glob(pattern)):
+                if path not in files:
+                    files.append(path)
+        
+        return files
+    
+    @staticmethod
+    def iter_trip_batches(columns=None, batch_size=None):
+        """Yield trip data from Parquet one batch at a time"""
+        
+        DataLoader.convert_csv_to_parquet()
+        
+        parquet_file = pq.ParquetFile(Config.TRIP_DATA_PARQUET)
+        for batch in parquet_file.iter_batches(batch_size=batch_size or Config.CHUNK_SIZE,
+                                               columns=columns):
+            yield DataLoader.apply_schema(batch.to_pandas())
+    
     @staticmethod
     def load_zone_lookup():
         """Load taxi zone lookup table"""
@@ -105,142 +514,561 @@ class DataLoader:
     
     @staticmethod
     def load_zone_geometry():
-        """Load taxi zone spatial data (optional)"""
-        
-        if not HAS_GEOPANDAS:
-            return None
-        
-        if not os.path.exists(Config.TAXI_ZONES_SHP):
-            return None
-        
-        try:
-            gdf = gpd.read_file(Config.TAXI_ZONES_SHP)
-            return gdf
-        except Exception as e:
-            return None
+        """Load the taxi zone geometry index (optional; None without shapefile or index)"""
+        return ZoneGeometry.load()
     
     @staticmethod
     def integrate_data(trips_df, zones_df):
         """Associate trip data with zone metadata"""
+        
+        # zones_df may be a prebuilt ZoneLookup (e.g. reused across chunks)
+        lookup = zones_df if isinstance(zones_df, ZoneLookup) else ZoneLookup(zones_df)
 
-        print("Merging trip data with pickup zone information...")
-        trips_df = trips_df.merge(
-            zones_df,
-            left_on='PULocationID',
-            right_on='LocationID',
-            how='left',
-            suffixes=('', '_pickup')
-        )
-        trips_df.rename(columns={
-            'Borough': 'pickup_borough',
-            'Zone': 'pickup_zone',
-            'service_zone': 'pickup_service_zone'
-        }, inplace=True)
-        
-        print("Merging trip data with dropoff zone information...")
-        trips_df = trips_df.merge(
-            zones_df,
-            left_on='DOLocationID',
-            right_on='LocationID',
-            how='left',
-            suffixes=('', '_dropoff')
-        )
-        trips_df.rename(columns={
-            'Borough': 'dropoff_borough',
-            'Zone': 'dropoff_zone',
-            'service_zone': 'dropoff_service_zone'
-        }, inplace=True)
-        
-        # Remove duplicate LocationID columns
-        if 'LocationID' in trips_df.columns:
-            trips_df.drop(columns=['LocationID'], inplace=True)
-        if 'LocationID_dropoff' in trips_df.columns:
-            trips_df.drop(columns=['LocationID_dropoff'], inplace=True)
+        print("Attaching pickup zone information...")
+        lookup.attach(trips_df, 'PULocationID', 'pickup')
+        
+        print("Attaching dropoff zone information...")
+        lookup.attach(trips_df, 'DOLocationID', 'dropoff')
     
         print(f"  New columns: pickup_borough, pickup_zone, dropoff_borough, dropoff_zone")
         
         return trips_df
 
+
+class ZoneLookup:
+    """Zone attributes as code arrays indexed directly by LocationID"""
+    
+    # Lookup column -> suffix of the attached trip column
+    COLUMNS = {'Borough': 'borough', 'Zone': 'zone', 'service_zone': 'service_zone'}
+    
+    def __init__(self, zones_df):
+        location_ids = zones_df['LocationID'].to_numpy(dtype=np.int64)
+        self.size = int(location_ids.max()) + 1
+        self.codes = {}
+        self.dtypes = {}
+        
+        # One small int16 code array per attribute; -1 marks unknown IDs
+        for col in self.COLUMNS:
+            values = pd.Categorical(zones_df[col])
+            codes = np.full(self.size, -1, dtype=np.int16)
+            codes[location_ids] = values.codes
+            self.codes[col] = codes
+            self.dtypes[col] = values.dtype
+    
+    def attach(self, trips_df, id_col, prefix):
+        """Add <prefix>_borough/_zone/_service_zone columns for an ID column"""
+        ids = trips_df[id_col].to_numpy(dtype='float64', na_value=np.nan)
+        valid = (ids >= 0) & (ids < self.size)
+        index = np.where(valid, ids, 0).astype(np.intp)
+        
+        for col, suffix in self.COLUMNS.items():
+            codes = np.where(valid, self.codes[col][index], -1)
+            trips_df[f'{prefix}_{suffix}'] = pd.Categorical.from_codes(codes, dtype=self.dtypes[col])
+        
+        return trips_df
+
+
+class ZoneGeometry:
+    """Zone centroids, bounds, adjacency and centroid distances as memory-mapped arrays by LocationID"""
+    
+    ZONES = 266  # LocationIDs 1-265 index directly; 0 stays empty
+    PROJECTED_CRS = 'EPSG:2263'  # NY State Plane (feet), used when the shapefile is in degrees
+    METERS_PER_MILE = 1609.344
+    ARRAYS = ['centroids', 'bounds', 'adjacency', 'distance_miles']
+    
+    # directory -> opened index (or None), so each process maps the files once
+    _loaded = {}
+    
+    def __init__(self, arrays):
+        self.centroids = arrays['centroids']  # (ZONES, 2) x, y in the index CRS; NaN without geometry
+        self.bounds = arrays['bounds']  # (ZONES, 4) minx, miny, maxx, maxy
+        self.adjacency = arrays['adjacency']  # (ZONES, ZONES) bool, zones that share a boundary
+        self.distance_miles = arrays['distance_miles']  # (ZONES, ZONES) float32 centroid to centroid
+    
+    @classmethod
+    def build(cls, shapefile=None, directory=None):
+        """Compute the arrays from the zone shapefile and store them as .npy files"""
+        import geopandas as gpd
+        
+        shapefile = shapefile or Config.TAXI_ZONES_SHP
+        directory = directory or Config.ZONE_INDEX_DIR
+        gdf = gpd.read_file(shapefile)
+        if gdf.crs is None or gdf.crs.is_geographic:
+            gdf = gdf.set_crs('EPSG:4326') if gdf.crs is None else gdf
+            gdf = gdf.to_crs(cls.PROJECTED_CRS)
+        # The TLC file has a few zones split over several rows
+        gdf = gdf[['LocationID', 'geometry']].dissolve(by='LocationID').reset_index()
+        gdf = gdf[(gdf['LocationID'] > 0) & (gdf['LocationID'] < cls.ZONES)].reset_index(drop=True)
+        ids = gdf['LocationID'].to_numpy(dtype=np.intp)
+        
+        centroids = np.full((cls.ZONES, 2), np.nan)
+        centroids[ids, 0] = gdf.geometry.centroid.x.to_numpy()
+        centroids[ids, 1] = gdf.geometry.centroid.y.to_numpy()
+        bounds = np.full((cls.ZONES, 4), np.nan)
+        bounds[ids] = gdf.geometry.bounds.to_numpy()
+        
+        # Neighbours: candidate pairs from the spatial index, kept when they
+        # share an edge (a corner alone has zero-length intersection)
+        left, right = gdf.sindex.query(gdf.geometry, predicate='intersects')
+        left, right = left[left < right], right[left < right]
+        shared = gdf.geometry.iloc[left].intersection(gdf.geometry.iloc[right], align=False)
+        edge = shared.length.to_numpy() > 0
+        left, right = left[edge], right[edge]
+        adjacency = np.zeros((cls.ZONES, cls.ZONES), dtype=bool)
+        adjacency[ids[left], ids[right]] = True
+        adjacency[ids[right], ids[left]] = True
+        
+        # Pairwise centroid distances in one broadcast, CRS units -> miles
+        miles_per_unit = gdf.crs.axis_info[0].unit_conversion_factor / cls.METERS_PER_MILE
+        dx = centroids[:, None, 0] - centroids[None, :, 0]
+        dy = centroids[:, None, 1] - centroids[None, :, 1]
+        distance_miles = (np.hypot(dx, dy) * miles_per_unit).astype(np.float32)
+        
+        os.makedirs(directory, exist_ok=True)
+        arrays = {'centroids': centroids, 'bounds': bounds, 'adjacency': adjacency,
+                  'distance_miles': distance_miles}
+        for name, values in arrays.items():
+            ODMatrix.write_atomic(os.path.join(directory, f"{name}.npy"), np.save, values)
+        meta = {'source': StageCache.fingerprint(shapefile), 'crs': gdf.crs.to_string(), 'zones': len(ids)}
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        
+        print(f"✓ Zone geometry index saved to: {directory} ({len(ids)} zones, "
+              f"{int(adjacency.sum()) // 2:,} adjacent pairs)")
+        return cls(arrays)
+    
+    @classmethod
+    def open(cls, directory=None):
+        """The stored index, memory-mapped; None if it has not been built"""
+        directory = directory or Config.ZONE_INDEX_DIR
+        paths = {name: os.path.join(directory, f"{name}.npy") for name in cls.ARRAYS}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return None
+        return cls({name: np.load(path, mmap_mode='r') for name, path in paths.items()})
+    
+    @classmethod
+    def source(cls, directory=None):
+        """Fingerprint of the shapefile the stored index was built from"""
+        path = os.path.join(directory or Config.ZONE_INDEX_DIR, 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)['source']
+    
+    @classmethod
+    def load(cls, directory=None):
+        """Open the index, (re)building it first when the shapefile is newer; None if neither exists"""
+        directory = directory or Config.ZONE_INDEX_DIR
+        if directory not in cls._loaded:
+            shapefile = Config.TAXI_ZONES_SHP
+            if HAS_GEOPANDAS and os.path.exists(shapefile) \
+                    and cls.source(directory) != StageCache.fingerprint(shapefile):
+                cls.build(shapefile, directory)
+            cls._loaded[directory] = cls.open(directory)
+        return cls._loaded[directory]
+    
+    @classmethod
+    def available(cls):
+        return cls.load() is not None
+    
+    @classmethod
+    def missing(cls, directory=None):
+        """What load() would lack, checked without loading anything; None if nothing"""
+        directory = directory or Config.ZONE_INDEX_DIR
+        if os.path.exists(os.path.join(directory, 'meta.json')) or \
+                (HAS_GEOPANDAS and os.path.exists(Config.TAXI_ZONES_SHP)):
+            return None
+        needs = [] if HAS_GEOPANDAS else ['geopandas']
+        if not os.path.exists(Config.TAXI_ZONES_SHP):
+            needs.append(Config.TAXI_ZONES_SHP)
+        return f"{' and '.join(needs)} (or a zone index built in {directory})"
+    
+    @classmethod
+    def require(cls):
+        """load(), or an error naming what is missing"""
+        geometry = cls.load()
+        if geometry is None:
+            raise FileNotFoundError(f"Zone geometry features need {cls.missing() or 'the zone index'}")
+        return geometry
+    
+    def pairs(self, pickup, dropoff):
+        """Pickup and dropoff row indices per trip, and a mask of trips where both zones have geometry"""
+        pickup = np.asarray(pickup, dtype='float64')
+        dropoff = np.asarray(dropoff, dtype='float64')
+        valid = (pickup > 0) & (pickup < self.ZONES) & (dropoff > 0) & (dropoff < self.ZONES)
+        pickup = np.where(valid, pickup, 0).astype(np.intp)
+        dropoff = np.where(valid, dropoff, 0).astype(np.intp)
+        valid &= ~np.isnan(self.centroids[pickup, 0]) & ~np.isnan(self.centroids[dropoff, 0])
+        return pickup, dropoff, valid
+    
+    def straight_line_miles(self, pickup, dropoff):
+        """Centroid-to-centroid distance per trip; NaN where a zone has no geometry"""
+        pickup, dropoff, valid = self.pairs(pickup, dropoff)
+        return np.where(valid, self.distance_miles[pickup, dropoff], np.nan)
+    
+    def adjacent(self, pickup, dropoff):
+        """True per trip when the two zones share a boundary"""
+        pickup, dropoff, valid = self.pairs(pickup, dropoff)
+        return valid & self.adjacency[pickup, dropoff]
+    
+    def neighbors(self, zone):
+        return np.flatnonzero(self.adjacency[zone])
+
 # =====================================================================
 # STEP 2: DATA INTEGRITY
 # =====================================================================
 
+class DuplicateIndex:
+    """Keys of trips already kept, for duplicate checks across chunks, files and runs"""
+    
+    MODES = ('exact', 'bloom')
+    
+    def __init__(self, mode=None):
+        self.mode = mode or Config.DUPLICATE_MODE
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown duplicate mode: {self.mode}")
+        
+        # Exact: sorted uint64 keys per pickup partition (8 bytes per key)
+        self.partitions = {}
+        # Bloom: bit array sized for the configured capacity and error rate
+        self.bits = None
+        self.added = 0
+        self.count = 0
+        # Keys stored by other files, checked but never added to
+        self.history = None
+        if self.mode == 'bloom':
+            bits = -Config.BLOOM_CAPACITY * np.log(Config.BLOOM_ERROR_RATE) / np.log(2) ** 2
+            self.size = int(np.ceil(bits / 8)) * 8
+            self.hashes = max(1, round(self.size / Config.BLOOM_CAPACITY * np.log(2)))
+            self.bits = np.zeros(self.size // 8, dtype=np.uint8)
+    
+    @staticmethod
+    def row_keys(df, columns):
+        """One 64-bit key per row over the duplicate columns"""
+        return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    
+    @staticmethod
+    def partition_keys(df):
+        """Pickup time bucket per row; duplicates always share a bucket"""
+        if not Config.DUPLICATE_PARTITION:
+            return np.zeros(len(df), dtype=np.int64)
+        pickup = df['tpep_pickup_datetime']
+        if not pd.api.types.is_datetime64_any_dtype(pickup):
+            pickup = pd.to_datetime(pickup)
+        pickup = pickup.to_numpy()
+        return pickup.astype(f'datetime64[{Config.DUPLICATE_PARTITION}]').view(np.int64)
+    
+    def check_and_add(self, df, columns):
+        """Mask of rows that repeat an earlier row or a stored key; keeps the rest"""
+        keys = self.row_keys(df, columns)
+        # First occurrence wins inside the frame, as with DataFrame.duplicated
+        is_duplicate = pd.Series(keys).duplicated(keep='first').to_numpy().copy()
+        if self.history is not None:
+            is_duplicate |= self.history.contains(df, keys)
+        
+        if self.mode == 'bloom':
+            positions = self.bloom_positions(keys)
+            seen = np.ones(len(keys), dtype=bool)
+            for pos in positions:
+                seen &= ((self.bits[pos >> 3] >> (pos & 7).astype(np.uint8)) & 1).astype(bool)
+            is_duplicate |= seen
+            # One fancy-indexed OR per bit value; repeated bytes get the same bit
+            new_positions = np.concatenate([pos[~is_duplicate] for pos in positions])
+            bytes_, bits = new_positions >> 3, new_positions & 7
+            for bit in range(8):
+                self.bits[bytes_[bits == bit]] |= np.uint8(1 << bit)
+        else:
+            # Group row positions by partition with one stable sort
+            parts = self.partition_keys(df)
+            order = np.argsort(parts, kind='stable')
+            bounds = np.flatnonzero(np.diff(parts[order])) + 1
+            for rows in np.split(order, bounds) if len(order) else []:
+                part = int(parts[rows[0]])
+                part_keys = keys[rows]
+                stored = self.partitions.get(part)
+                if stored is not None:
+                    found = stored[np.minimum(np.searchsorted(stored, part_keys), len(stored) - 1)] == part_keys
+                    is_duplicate[rows] |= found
+                # New keys are unique and not stored yet: a sorted insert suffices
+                new_keys = np.sort(part_keys[~is_duplicate[rows]])
+                if len(new_keys):
+                    self.partitions[part] = (np.insert(stored, np.searchsorted(stored, new_keys), new_keys)
+                                             if stored is not None else new_keys)
+        
+        added = int(len(keys) - is_duplicate.sum())
+        self.added += added
+        self.count += added
+        return is_duplicate
+    
+    def contains(self, df, keys):
+        """Mask of keys already in the index, without adding any"""
+        if self.mode == 'bloom':
+            seen = np.ones(len(keys), dtype=bool)
+            for pos in self.bloom_positions(keys):
+                seen &= ((self.bits[pos >> 3] >> (pos & 7).astype(np.uint8)) & 1).astype(bool)
+            return seen
+        
+        found = np.zeros(len(keys), dtype=bool)
+        parts = self.partition_keys(df)
+        order = np.argsort(parts, kind='stable')
+        bounds = np.flatnonzero(np.diff(parts[order])) + 1
+        for rows in np.split(order, bounds) if len(order) else []:
+            stored = self.partitions.get(int(parts[rows[0]]))
+            if stored is not None:
+                found[rows] = stored[np.minimum(np.searchsorted(stored, keys[rows]), len(stored) - 1)] == keys[rows]
+        return found
+    
+    def bloom_positions(self, keys):
+        """Bit positions per hash function, by double hashing the 64-bit key"""
+        h1 = keys % np.uint64(self.size)
+        h2 = ((keys >> np.uint64(32)) | np.uint64(1)) % np.uint64(self.size)
+        return [((h1 + np.uint64(i) * h2) % np.uint64(self.size)).astype(np.int64)
+                for i in range(self.hashes)]
+    
+    def merge(self, other):
+        """Fold in keys added by another index (e.g. another file's stored keys)"""
+        if self.mode == 'bloom':
+            if other.size != self.size:
+                raise ValueError("Stored Bloom filters were sized for a different BLOOM_CAPACITY / BLOOM_ERROR_RATE")
+            self.bits |= other.bits
+        else:
+            for part, keys in other.partitions.items():
+                stored = self.partitions.get(part)
+                self.partitions[part] = keys if stored is None else np.union1d(stored, keys)
+        self.added += other.added
+        self.count += other.added
+    
+    @property
+    def nbytes(self):
+        own = self.bits.nbytes if self.mode == 'bloom' else sum(keys.nbytes for keys in self.partitions.values())
+        return own + (self.history.nbytes if self.history is not None else 0)
+    
+    def describe(self):
+        if self.mode == 'bloom':
+            return (f"Bloom filter, {self.count:,} keys in {self.nbytes / 1e6:.1f} MB "
+                    f"({self.hashes} hashes)")
+        return (f"{self.count:,} keys in {len(self.partitions)} partitions, "
+                f"{self.nbytes / 1e6:.1f} MB")
+    
+    @staticmethod
+    def path(source, directory=None):
+        return os.path.join(directory or Config.DUPLICATE_KEYS_DIR, f"{Config.source_key(source)}.npz")
+    
+    @classmethod
+    def open(cls, exclude=(), directory=None):
+        """An empty index that also checks the keys stored by every source
+        file except the excluded ones (the files about to be processed)"""
+        index = cls()
+        directory = directory or Config.DUPLICATE_KEYS_DIR
+        if not directory:
+            return index
+        skip = {cls.path(source, directory) for source in exclude}
+        paths = [path for path in sorted(glob.glob(os.path.join(directory, '*.npz'))) if path not in skip]
+        if not paths:
+            return index
+        
+        index.history = cls()
+        for path in paths:
+            stored = cls.load(path)
+            index.history.merge(stored)
+            index.history.count += stored.count
+        index.count = index.history.count
+        return index
+    
+    @classmethod
+    def load(cls, path):
+        """One source file's stored keys"""
+        with np.load(path) as stored:
+            index = cls(str(stored['mode']))
+            if index.mode != Config.DUPLICATE_MODE:
+                raise ValueError(f"{path} holds {index.mode} keys, not {Config.DUPLICATE_MODE}")
+            if index.mode == 'bloom':
+                index.size, index.hashes = (int(v) for v in stored['shape'])
+                index.bits = stored['bits']
+            else:
+                index.partitions = {int(name[2:]): stored[name] for name in stored.files
+                                    if name.startswith('p_')}
+            index.count = int(stored['count'])
+        return index
+    
+    @classmethod
+    def stored(cls, directory=None):
+        """Keys and bytes stored over all source files"""
+        paths = glob.glob(os.path.join(directory or Config.DUPLICATE_KEYS_DIR, '*.npz'))
+        count = 0
+        for path in paths:
+            with np.load(path) as stored:
+                count += int(stored['count'])
+        return count, sum(os.path.getsize(path) for path in paths)
+    
+    def save(self, source, directory=None):
+        """Store the keys this index added for one source file; re-running it replaces them"""
+        path = self.path(source, directory)
+        arrays = {'mode': np.array(self.mode), 'count': np.array(self.added)}
+        if self.mode == 'bloom':
+            arrays['shape'] = np.array([self.size, self.hashes])
+            arrays['bits'] = self.bits
+        else:
+            arrays.update({f'p_{part}': keys for part, keys in self.partitions.items()})
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+
 class DataCleaner:
     """Handle missing values, duplicates, and outliers"""
     
+    CRITICAL_FIELDS = ['tpep_pickup_datetime', 'tpep_dropoff_datetime', 
+                       'PULocationID', 'DOLocationID', 'trip_distance', 'fare_amount']
+    PAYMENT_FIELDS = ['extra', 'mta_tax', 'tip_amount', 'tolls_amount', 
+                      'improvement_surcharge', 'congestion_surcharge']
+    # Duplicate criteria: same pickup/dropoff time, locations, and fare
+    DUPLICATE_COLS = ['tpep_pickup_datetime', 'tpep_dropoff_datetime', 
+                      'PULocationID', 'DOLocationID', 'fare_amount']
+    
     def __init__(self):
         self.report = []
+        # Counters behind the report; they add up across chunks and files
+        self.stats = Counter()
+        # Sketches of every raw input column, merged the same way
+        self.profile = DataProfile()
+        # Cross-chunk state; the duplicate key set is opened on first use
+        self.passenger_median = None
+        self.duplicate_keys = None
+        # Source files whose stored keys aren't checked (default: this one)
+        self.duplicate_exclude = None
+        # Medians used by each file when counters are merged across files
+        self.merged_medians = set()
+        # Per hour and zone pair medians / MADs, loaded on first use unless
+        # a parent process snapshotted them (RobustStats.references), and
+        # the fingerprints of the months they came from
+        self.stat_reference = None
+        self.stat_history = None
+    
+    def prepare_streaming(self, batches):
+        """Precompute cross-chunk state so chunked cleaning matches batch mode"""
+        
+        # The passenger_count median is taken over rows that survive the
+        # critical-field drop; the sketch's value counts merge exactly
+        sketch = ColumnSketch()
+        for batch in batches:
+            present = [f for f in self.CRITICAL_FIELDS if f in batch.columns]
+            sketch.add(batch.dropna(subset=present)['passenger_count'])
+        self.passenger_median = sketch.median()
+        
+        # Keys of every trip kept so far, so duplicates are removed across
+        # chunk boundaries and the first occurrence wins as in batch mode
+        self.duplicate_keys = self.open_duplicate_keys()
+    
+    def open_duplicate_keys(self):
+        """Keys stored by other files; never this file's own, so a re-run keeps its trips"""
+        return DuplicateIndex.open(self.duplicate_exclude or [Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET])
+    
+    def merge(self, stats, passenger_median=None, profile=None):
+        """Fold counters from another cleaner (e.g. a worker's file) into this one"""
+        self.stats.update(stats)
+        if passenger_median is not None and not pd.isna(passenger_median):
+            self.merged_medians.add(passenger_median)
+        if profile is not None:
+            self.profile.merge(profile)
     
     def handle_missing_values(self, df):
         """Identify and resolve missing values"""
         
         initial_rows = len(df)
-        missing_summary = df.isnull().sum()
-        missing_pct = (missing_summary / len(df) * 100).round(2)
+        # Profile every raw column in one pass; its null counts are the summary
+        missing_summary = self.profile.add(df)
         
         print("Missing values by column:")
         for col in df.columns:
             if missing_summary[col] > 0:
-                print(f"  {col}: {missing_summary[col]} ({missing_pct[col]}%)")
+                print(f"  {col}: {missing_summary[col]} ({round(missing_summary[col] / initial_rows * 100, 2)}%)")
         
-        self.report.append(f"Initial rows: {initial_rows:,}\n")
+        # Null masks of the fields the drop and the fills decide on
+        is_null = {field: df[field].isna().to_numpy()
+                   for field in self.CRITICAL_FIELDS + ['passenger_count'] + self.PAYMENT_FIELDS
+                   if field in df.columns}
         
-        # Strategy 1: Drop rows with missing critical fields
-        critical_fields = ['tpep_pickup_datetime', 'tpep_dropoff_datetime', 
-                          'PULocationID', 'DOLocationID', 'trip_distance', 'fare_amount']
+        self.stats['initial_rows'] += initial_rows
         
-        for field in critical_fields:
+        # Strategy 1: Drop rows with missing critical fields, in one filter.
+        # Each field counts the rows it would drop after the fields before it
+        dropped_rows = np.zeros(initial_rows, dtype=bool)
+        for field in self.CRITICAL_FIELDS:
             if field in df.columns:
-                before = len(df)
-                df = df.dropna(subset=[field])
-                dropped = before - len(df)
+                field_null = is_null[field]
+                dropped = int((field_null & ~dropped_rows).sum())
+                dropped_rows |= field_null
                 if dropped > 0:
                     print(f"  Dropped {dropped} rows with missing {field}")
-                    self.report.append(f"  Dropped {dropped} rows: missing {field}\n")
-        
-        # Strategy 2: Fill missing passenger_count with median
-        if 'passenger_count' in df.columns and df['passenger_count'].isnull().any():
-            median_passengers = df['passenger_count'].median()
-            null_count = df['passenger_count'].isnull().sum()
-            df['passenger_count'].fillna(median_passengers, inplace=True)
-            self.report.append(f"  Filled {null_count} passenger_count with median: {median_passengers}\n")
-        
-        # Strategy 3: Fill missing payment-related fields with 0
-        payment_fields = ['extra', 'mta_tax', 'tip_amount', 'tolls_amount', 
-                         'improvement_surcharge', 'congestion_surcharge']
-        for field in payment_fields:
-            if field in df.columns and df[field].isnull().any():
-                null_count = df[field].isnull().sum()
-                df[field].fillna(0, inplace=True)
+                    self.stats[f'missing_{field}'] += dropped
+        
+        kept = ~dropped_rows
+        if dropped_rows.any():
+            df = df[kept]
+        
+        # Strategies 2 and 3: fill passenger_count with the median and
+        # payment-related fields with 0, in a single fillna
+        fills = {}
+        
+        def still_missing(field):
+            return int((is_null[field] & kept).sum()) if field in df.columns else 0
+        
+        null_count = still_missing('passenger_count')
+        if null_count:
+            if self.passenger_median is None:
+                self.passenger_median = ColumnSketch.of(df['passenger_count']).median()
+            fill_value = self.passenger_median
+            if pd.api.types.is_integer_dtype(df['passenger_count']):
+                # Integer counts keep the whole part, as the int cast later did
+                fill_value = int(fill_value)
+            fills['passenger_count'] = fill_value
+            self.stats['filled_passenger_count'] += null_count
+        
+        for field in self.PAYMENT_FIELDS:
+            null_count = still_missing(field)
+            if null_count:
+                fills[field] = 0
                 print(f"  Filled {null_count} missing {field} with 0")
-                self.report.append(f"  Filled {null_count} {field} with 0\n")
+                self.stats[f'filled_{field}'] += null_count
+        
+        if fills:
+            # Copy-on-write: columns without nulls are shared, not copied
+            df = df.fillna(fills)
         
         final_rows = len(df)
-        self.report.append(f"Final rows after missing value handling: {final_rows:,}\n\n")
+        self.stats['rows_after_missing'] += final_rows
         
         return df
     
     def remove_duplicates(self, df):
         """Identify and remove duplicate records"""
         
-        # Define duplicate criteria: same pickup/dropoff time, locations, and fare
-        duplicate_cols = ['tpep_pickup_datetime', 'tpep_dropoff_datetime', 
-                         'PULocationID', 'DOLocationID', 'fare_amount']
+        if self.duplicate_keys is None:
+            self.duplicate_keys = self.open_duplicate_keys()
         
-        # Check for exact duplicates
-        duplicates = df.duplicated(subset=duplicate_cols, keep='first').sum()
+        # Hash the key columns once; the mask serves both counting and dropping,
+        # and also covers trips kept in earlier chunks, files or runs
+        is_duplicate = self.duplicate_keys.check_and_add(df, self.DUPLICATE_COLS)
+        duplicates = int(is_duplicate.sum())
         
         if duplicates > 0:
-            df = df.drop_duplicates(subset=duplicate_cols, keep='first')
+            df = df[~is_duplicate]
             print(f"  Removed {duplicates} duplicate records")
-            self.report.append(f"Duplicates Removed: {duplicates}\n")
         else:
             print("  No duplicates found")
-            self.report.append("Duplicates Removed: 0\n")
+        self.stats['duplicates'] += duplicates
         
         final_rows = len(df)
         print(f"✓ Duplicate removal complete: {final_rows:,} rows remaining")
-        self.report.append(f"Rows after duplicate removal: {final_rows:,}\n\n")
+        print(f"  Duplicate key set: {self.duplicate_keys.describe()}")
+        self.stats['rows_after_duplicates'] += final_rows
+        # Current size, not a running total; merged files add up their sets
+        self.stats['duplicate_keys'] = self.duplicate_keys.count
+        self.stats['duplicate_key_bytes'] = self.duplicate_keys.nbytes
         
         return df
     
@@ -248,99 +1076,439 @@ class DataCleaner:
         """Identify physical and logical outliers"""
       
         initial_rows = len(df)
-        self.report.append("Outlier Detection:\n")
+        self.stats['outlier_input_rows'] += initial_rows
         
-        # 1. Trip distance outliers
-        print("\n1. Trip Distance Outliers:")
-        distance_outliers = (
-            (df['trip_distance'] < Config.MIN_TRIP_DISTANCE) | 
-            (df['trip_distance'] > Config.MAX_TRIP_DISTANCE)
-        )
-        outlier_count = distance_outliers.sum()
-        df = df[~distance_outliers]
-        self.report.append(f"  Distance outliers removed: {outlier_count}\n")
-        
-        # 2. Fare amount outliers
-        print("\n2. Fare Amount Outliers:")
-        fare_outliers = (
-            (df['fare_amount'] < Config.MIN_FARE) | 
-            (df['fare_amount'] > Config.MAX_FARE)
-        )
-        outlier_count = fare_outliers.sum()
-        df = df[~fare_outliers]
-        self.report.append(f"  Fare outliers removed: {outlier_count}\n")
-        
-        # 3. Passenger count outliers
-        print("\n3. Passenger Count Outliers:")
-        passenger_outliers = (
-            (df['passenger_count'] < Config.MIN_PASSENGER_COUNT) | 
-            (df['passenger_count'] > Config.MAX_PASSENGER_COUNT)
-        )
-        outlier_count = passenger_outliers.sum()
-        print(f"   Found {outlier_count} trips with invalid passenger count")
-        df = df[~passenger_outliers]
-        self.report.append(f"  Passenger count outliers removed: {outlier_count}\n")
-        
-        df['trip_duration_minutes'] = (
-            pd.to_datetime(df['tpep_dropoff_datetime']) - 
-            pd.to_datetime(df['tpep_pickup_datetime'])
-        ).dt.total_seconds() / 60
-        
-        temporal_outliers = (
-            (df['trip_duration_minutes'] < Config.MIN_TRIP_DURATION) | 
-            (df['trip_duration_minutes'] > Config.MAX_TRIP_DURATION)
-        )
-        outlier_count = temporal_outliers.sum()
-        df = df[~temporal_outliers]
-        self.report.append(f"  Temporal outliers removed: {outlier_count}\n")
-        
-        # 4. Logical outliers (dropoff before pickup)
-        print("\n4. Logical Outliers:")
-        logical_outliers = df['trip_duration_minutes'] < 0
-        outlier_count = logical_outliers.sum()
-        if outlier_count > 0:
-            df = df[~logical_outliers]
-            self.report.append(f"  Logical outliers removed: {outlier_count}\n")
-        else:
-            print(f"   No logical inconsistencies found")
+        # Parse the timestamps once; normalize_timestamps then has nothing to do
+        for col in ['tpep_pickup_datetime', 'tpep_dropoff_datetime']:
+            df[col] = pd.to_datetime(df[col])
+        df['trip_duration_minutes'] = FeatureEngineer.trip_duration_minutes(df)
         
-        # 5. Total amount consistency check
-        df['calculated_total'] = (
+        # Derived values that rules can refer to besides the frame's columns
+        calculated_total = (
             df['fare_amount'] + df['extra'] + df['mta_tax'] + 
             df['tip_amount'] + df['tolls_amount'] + 
             df['improvement_surcharge'] + df['congestion_surcharge'].fillna(0)
         )
+        derived = {
+            'total_amount_mismatch': np.abs(df['total_amount'].to_numpy() - calculated_total.to_numpy()),
+        }
         
-        # Allow 1% tolerance for rounding
-        total_mismatch = abs(df['total_amount'] - df['calculated_total']) > 0.5
-        outlier_count = total_mismatch.sum()
-        print(f"   Found {outlier_count} trips with total amount mismatch")
-        df = df[~total_mismatch]
-        self.report.append(f"  Total amount mismatches removed: {outlier_count}\n")
+        # Evaluate every rule as a mask over the same rows, then filter once
+        rejected = np.zeros(initial_rows, dtype=bool)
+        for key, label, column, low, high in Config.OUTLIER_RULES:
+            if column in derived:
+                values = derived[column]
+            else:
+                values = df[column].to_numpy(dtype='float64', na_value=np.nan)
+            hit = np.zeros(initial_rows, dtype=bool)
+            if low is not None:
+                hit |= values < self.threshold(low)
+            if high is not None:
+                hit |= values > self.threshold(high)
+            
+            first_hits = int((hit & ~rejected).sum())
+            any_hits = int(hit.sum())
+            rejected |= hit
+            print(f"   {label}: {first_hits} removed ({any_hits} flagged by this rule)")
+            self.stats[f'outliers_{key}'] += first_hits
+            self.stats[f'outliers_any_{key}'] += any_hits
         
-        df.drop(columns=['calculated_total'], inplace=True)
+        df = df[~rejected]
         
         final_rows = len(df)
         removed = initial_rows - final_rows
         print(f"\n✓ Outlier detection complete:")
         print(f"  Initial: {initial_rows:,} rows")
-        print(f"  Removed: {removed:,} outliers ({removed/initial_rows*100:.2f}%)")
+        print(f"  Removed: {removed:,} outliers ({removed/max(initial_rows, 1)*100:.2f}%)")
         print(f"  Final: {final_rows:,} rows")
         
-        self.report.append(f"\nTotal outliers removed: {removed:,} ({removed/initial_rows*100:.2f}%)\n")
-        self.report.append(f"Final rows: {final_rows:,}\n\n")
+        self.stats['rows_after_outliers'] += final_rows
+        
+        return df
+    
+    def detect_statistical_outliers(self, df):
+        """Identify trips far from the usual duration, speed or fare for their hour and zone pair"""
+        
+        if self.stat_reference is None:
+            self.stat_reference = RobustStats.reference(Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET)
+        
+        initial_rows = len(df)
+        self.stats['stat_outlier_input_rows'] += initial_rows
+        
+        # One lookup per metric into the sorted cell summaries, no groupby
+        cells, valid = ODMatrix.keys(df)
+        judged = np.zeros(initial_rows, dtype=bool)
+        flagged = np.zeros(initial_rows, dtype=bool)
+        for metric, values in RobustStats.metrics(df).items():
+            band = Config.STAT_OUTLIER_BANDS.get(metric)
+            if band is None or metric not in self.stat_reference:
+                continue
+            hit, known = RobustStats.outside(self.stat_reference[metric], cells, values[valid], band)
+            judged[valid] |= known
+            flagged[valid] |= hit
+            print(f"   {metric}: {int(hit.sum())} outside {band} MADs")
+            self.stats[f'stat_outliers_{metric}'] += int(hit.sum())
+        
+        outliers = int(flagged.sum())
+        self.stats['stat_outlier_judged'] += int(judged.sum())
+        self.stats['stat_outliers'] += outliers
+        
+        if Config.STAT_OUTLIERS == 'remove':
+            df = df[~flagged]
+        else:
+            df['is_stat_outlier'] = flagged.astype(np.int8)
+        
+        print(f"\n✓ Statistical outlier detection complete:")
+        print(f"  Judged: {int(judged.sum()):,} of {initial_rows:,} rows "
+              f"(cells with {Config.STAT_OUTLIER_MIN_TRIPS}+ trips of history)")
+        print(f"  {'Removed' if Config.STAT_OUTLIERS == 'remove' else 'Flagged'}: {outliers:,} outliers")
+        self.stats['rows_after_stat_outliers'] += len(df)
         
         return df
     
-    def save_report(self):
-        """Save data quality report"""
+    @staticmethod
+    def threshold(value):
+        """Resolve a rule threshold that may name a Config attribute"""
+        return getattr(Config, value) if isinstance(value, str) else value
+    
+    def render_report(self):
+        """Build the report lines from the accumulated counters"""
+        s = self.stats
+        report = []
+        
+        if 'initial_rows' in s:
+            report.append(f"Initial rows: {s['initial_rows']:,}\n")
+            for field in self.CRITICAL_FIELDS:
+                if s[f'missing_{field}'] > 0:
+                    report.append(f"  Dropped {s[f'missing_{field}']} rows: missing {field}\n")
+            if s['filled_passenger_count'] > 0:
+                if len(self.merged_medians) > 1:
+                    median = "per file " + ", ".join(str(m) for m in sorted(self.merged_medians))
+                else:
+                    median = self.passenger_median if self.passenger_median is not None else next(iter(self.merged_medians))
+                report.append(f"  Filled {s['filled_passenger_count']} passenger_count with median: {median}\n")
+            for field in self.PAYMENT_FIELDS:
+                if s[f'filled_{field}'] > 0:
+                    report.append(f"  Filled {s[f'filled_{field}']} {field} with 0\n")
+            report.append(f"Final rows after missing value handling: {s['rows_after_missing']:,}\n\n")
+        
+        if 'rows_after_duplicates' in s:
+            report.append(f"Duplicates Removed: {s['duplicates']}\n")
+            report.append(f"Rows after duplicate removal: {s['rows_after_duplicates']:,}\n")
+            report.append(f"Duplicate key set ({Config.DUPLICATE_MODE}): {s['duplicate_keys']:,} keys, "
+                          f"{s['duplicate_key_bytes'] / 1e6:.1f} MB\n\n")
+        
+        if 'rows_after_outliers' in s:
+            initial_rows = s['outlier_input_rows']
+            removed = initial_rows - s['rows_after_outliers']
+            report.append("Outlier Detection:\n")
+            for key, label, *_ in Config.OUTLIER_RULES:
+                report.append(f"  {label} removed: {s[f'outliers_{key}']}\n")
+            # A trip can break several rules; "removed" counts the first one
+            report.append("\nOutlier rule hits (any rule, overlapping):\n")
+            for key, label, *_ in Config.OUTLIER_RULES:
+                report.append(f"  {label} flagged: {s[f'outliers_any_{key}']}\n")
+            report.append(f"\nTotal outliers removed: {removed:,} ({removed/max(initial_rows, 1)*100:.2f}%)\n")
+            report.append(f"Final rows: {s['rows_after_outliers']:,}\n\n")
+        
+        if 'rows_after_stat_outliers' in s:
+            initial_rows = s['stat_outlier_input_rows']
+            action = 'removed' if Config.STAT_OUTLIERS == 'remove' else 'flagged'
+            report.append("Statistical Outliers (median/MAD per pickup hour and zone pair):\n")
+            report.append(f"  Rows judged: {s['stat_outlier_judged']:,} of {initial_rows:,}\n")
+            for metric in RobustStats.METRICS:
+                if metric in Config.STAT_OUTLIER_BANDS:
+                    report.append(f"  Outside the {metric} band: {s[f'stat_outliers_{metric}']}\n")
+            report.append(f"Total statistical outliers {action}: {s['stat_outliers']:,} "
+                          f"({s['stat_outliers']/max(initial_rows, 1)*100:.2f}%)\n\n")
+        
+        return report
+    
+    def save_report(self, output_profile=None):
+        """Save data quality report, plus counters and column profiles as JSON"""
+        self.report = self.render_report()
+        generated = datetime.now()
+        
         with open(Config.REPORT_FILE, 'w') as f:
             f.write("DATA QUALITY REPORT\n")
             f.write("=" * 70 + "\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+            f.write(f"Generated: {generated.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
             f.writelines(self.report)
         
-        print(f"\n✓ Data quality report saved to: {Config.REPORT_FILE}")
+        medians = (self.merged_medians or {self.passenger_median}) if self.stats['filled_passenger_count'] else set()
+        report = {
+            'generated': generated.isoformat(timespec='seconds'),
+            'counters': {key: int(value) for key, value in sorted(self.stats.items())},
+            'passenger_count_fill': sorted(float(m) for m in medians if m is not None and not pd.isna(m)),
+            # Raw columns before cleaning (not profiled by the duckdb backend)
+            'input': self.profile.summary() if self.profile.columns else None,
+            'output': output_profile.summary() if output_profile is not None else None,
+        }
+        with open(Config.PROFILE_REPORT, 'w') as f:
+            json.dump(report, f, indent=2)
+        
+        print(f"\n✓ Data quality report saved to: {Config.REPORT_FILE} (+ {os.path.basename(Config.PROFILE_REPORT)})")
+
+
+class RobustStats:
+    """Median and MAD of trip metrics per pickup hour and zone pair, from
+    log-binned value counts that add up across chunks and months"""
+    
+    METRICS = ['trip_duration_minutes', 'avg_speed_mph', 'fare_per_mile']
+    # Values bin on a log scale with 2% relative error (as in ColumnSketch);
+    # values outside [MIN_VALUE, MAX_VALUE] fall in the end bins. Keys
+    # (ODMatrix cell * BINS + bin) stay below 2**32, so files store uint32
+    ACCURACY = 0.02
+    MIN_VALUE = 1e-3
+    MAX_VALUE = 1e5
+    GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+    FIRST_BIN = math.ceil(math.log(MIN_VALUE) / math.log(GAMMA))
+    BINS = math.ceil(math.log(MAX_VALUE) / math.log(GAMMA)) - FIRST_BIN + 1
+    MAD_SCALE = 1.4826  # MAD -> standard deviation for normally distributed values
+    # Pending chunk counts are summed into the cells once they reach this many entries
+    COMPACT_AT = 4_000_000
+    
+    def __init__(self, cells=None):
+        # metric -> (sorted keys, counts); key = ODMatrix cell * BINS + bin
+        self.cells = cells or {}
+        self.pending = {metric: [] for metric in self.METRICS}
+    
+    @staticmethod
+    def metrics(trips_df):
+        """Per-trip duration, uncapped speed and fare per mile; NaN or inf where undefined"""
+        duration = trips_df['trip_duration_minutes'].to_numpy(dtype='float64', na_value=np.nan)
+        distance = trips_df['trip_distance'].to_numpy(dtype='float64', na_value=np.nan)
+        fare = trips_df['fare_amount'].to_numpy(dtype='float64', na_value=np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {
+                'trip_duration_minutes': duration,
+                'avg_speed_mph': distance / (duration / 60),
+                'fare_per_mile': fare / distance,
+            }
+    
+    @classmethod
+    def representative(cls, bins):
+        """Value a bin stands for, within ACCURACY of everything in it"""
+        return 2 * cls.GAMMA ** (bins + cls.FIRST_BIN).astype('float64') / (cls.GAMMA + 1)
+    
+    def add(self, trips_df):
+        """Count one frame of final trips into the (cell, bin) counters"""
+        cells, valid = ODMatrix.keys(trips_df)
+        for metric, values in self.metrics(trips_df).items():
+            values = values[valid]
+            usable = np.isfinite(values) & (values > 0)
+            values = np.clip(values[usable], self.MIN_VALUE, self.MAX_VALUE)
+            bins = np.ceil(np.log(values) / np.log(self.GAMMA)).astype(np.int64) - self.FIRST_BIN
+            self.pending[metric].append(np.unique(cells[usable] * self.BINS + bins, return_counts=True))
+            if sum(len(keys) for keys, _ in self.pending[metric]) >= self.COMPACT_AT:
+                self.compact(metric)
+    
+    def compact(self, metric):
+        """Sum the pending chunk counts into the metric's cells"""
+        parts = self.pending[metric]
+        if not parts:
+            return
+        if metric in self.cells:
+            parts = [self.cells[metric]] + parts
+        keys = np.concatenate([keys for keys, _ in parts])
+        counts = np.concatenate([counts for _, counts in parts])
+        if len(keys):
+            # Every part is sorted: a stable sort (timsort) only merges the runs
+            order = np.argsort(keys, kind='stable')
+            keys, counts = keys[order], counts[order]
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            keys, counts = keys[starts], np.add.reduceat(counts, starts)
+        # Subtracting a month can leave empty cells behind
+        kept = counts > 0
+        self.cells[metric] = keys[kept], counts[kept]
+        self.pending[metric] = []
+    
+    def merge(self, arrays, sign=1):
+        """Fold in stored counts (a month's file, or another store); sign=-1 takes them out"""
+        for metric in self.METRICS:
+            if f'{metric}_keys' in arrays:
+                counts = arrays[f'{metric}_counts'].astype(np.int64)
+                self.pending[metric].append((arrays[f'{metric}_keys'].astype(np.int64), sign * counts))
+    
+    def arrays(self):
+        """Flat name -> array form, as stored per month and combined"""
+        arrays = {}
+        for metric in self.METRICS:
+            self.compact(metric)
+            if metric in self.cells:
+                keys, counts = self.cells[metric]
+                arrays[f'{metric}_keys'] = keys.astype(np.uint32)
+                arrays[f'{metric}_counts'] = counts.astype(np.uint32)
+        return arrays
+    
+    @staticmethod
+    def weighted_median(values, counts, starts, totals):
+        """Lower median per group; values are sorted within contiguous groups"""
+        cumulative = np.cumsum(counts)
+        before = cumulative[starts] - counts[starts]
+        return values[np.searchsorted(cumulative, before + (totals + 1) // 2)]
+    
+    def summary(self):
+        """metric -> (cells, trips, median, MAD) arrays, sorted by cell"""
+        summary = {}
+        for metric in self.METRICS:
+            self.compact(metric)
+            if metric not in self.cells or not len(self.cells[metric][0]):
+                continue
+            keys, counts = self.cells[metric]
+            # Keys sort by cell, then bin: each cell's values are already in order
+            cells = keys // self.BINS
+            values = self.representative(keys % self.BINS)
+            starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+            totals = np.add.reduceat(counts, starts)
+            median = self.weighted_median(values, counts, starts, totals)
+            
+            # MAD: the median of the distances to the cell's median. One integer
+            # sort orders them within cells (much faster than a lexsort): cell
+            # ordinal in the high bits, the distance's float32 bits (monotonic
+            # for non-negative floats) in the low bits
+            sizes = np.diff(np.r_[starts, len(keys)])
+            deviation = np.abs(values - np.repeat(median, sizes))
+            ordinal = np.repeat(np.arange(len(starts), dtype=np.int64), sizes)
+            order = np.argsort((ordinal << 32) | deviation.astype(np.float32).view(np.uint32))
+            mad = self.weighted_median(deviation[order], counts[order], starts, totals)
+            summary[metric] = (cells[starts], totals, median, mad)
+        return summary
+    
+    @classmethod
+    def outside(cls, summary, cells, values, band):
+        """Trips outside the band around their cell's median, and trips whose cell has enough history"""
+        known_cells, totals, median, mad = summary
+        if not len(known_cells):
+            empty = np.zeros(len(cells), dtype=bool)
+            return empty, empty
+        
+        position = np.minimum(np.searchsorted(known_cells, cells), len(known_cells) - 1)
+        known = (known_cells[position] == cells) & (totals[position] >= Config.STAT_OUTLIER_MIN_TRIPS)
+        center = median[position]
+        # A single bin's width is the smallest spread the binned counts can show
+        spread = cls.MAD_SCALE * np.maximum(mad[position], center * (cls.GAMMA - 1))
+        with np.errstate(invalid='ignore'):
+            hit = known & (np.abs(values - center) > band * spread)
+        return hit, known
+    
+    # ----- storage: one file of counts per month, plus their sum and its summary -----
+    
+    @staticmethod
+    def month_path(source, directory=None):
+        return os.path.join(directory or Config.OUTLIER_STATS_DIR, 'months', f"{Config.source_key(source)}.npz")
+    
+    @classmethod
+    def months(cls, directory=None):
+        """Stored month files -> fingerprint"""
+        paths = sorted(glob.glob(os.path.join(directory or Config.OUTLIER_STATS_DIR, 'months', '*.npz')))
+        return {path: StageCache.fingerprint(path) for path in paths}
+    
+    @classmethod
+    def history(cls, source, directory=None):
+        """Fingerprints of the months a file is judged against (every stored month but its own)"""
+        own = cls.month_path(source, directory)
+        return [fingerprint for path, fingerprint in cls.months(directory).items() if path != own]
+    
+    @staticmethod
+    def included(directory=None):
+        """Month files (-> fingerprint) the stored sum was built from; None if there is no sum"""
+        path = os.path.join(directory or Config.OUTLIER_STATS_DIR, 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)['months']
+    
+    @classmethod
+    def load(cls, paths):
+        stats = cls()
+        for path in paths:
+            with np.load(path) as arrays:
+                stats.merge(dict(arrays))
+        return stats
+    
+    def save(self, source, directory=None):
+        """Store this run's counts under its source month and fold them into the stored sum"""
+        directory = directory or Config.OUTLIER_STATS_DIR
+        own = self.month_path(source, directory)
+        stored = self.months(directory)
+        if self.included(directory) != stored:
+            # No sum yet, or one that doesn't match the month files: add them all up
+            self.save_month(source, directory)
+            self.rebuild(directory)
+            return
+        
+        # Only this month's counts change the sum: no other month is read
+        combined = self.load([os.path.join(directory, 'counts.npz')])
+        if own in stored:
+            with np.load(own) as arrays:
+                combined.merge(dict(arrays), sign=-1)
+        self.save_month(source, directory)
+        combined.merge(self.arrays())
+        combined.write(directory)
+    
+    def save_month(self, source, directory=None):
+        """Store the counts for one source file; re-running a month replaces them"""
+        path = self.month_path(source, directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        ODMatrix.write_atomic(path, np.savez, **self.arrays())
+    
+    @classmethod
+    def rebuild(cls, directory=None):
+        """Sum every stored month, e.g. after workers each saved their own"""
+        directory = directory or Config.OUTLIER_STATS_DIR
+        cls.load(cls.months(directory)).write(directory)
+    
+    def write(self, directory):
+        """Store the sum and its summary (what later runs look up), then the months they cover"""
+        ODMatrix.write_atomic(os.path.join(directory, 'counts.npz'), np.savez, **self.arrays())
+        summary = self.summary()
+        # Same dtypes as reference() computes, so a re-run judges a month exactly as its first run did
+        ODMatrix.write_atomic(os.path.join(directory, 'summary.npz'), np.savez, **{
+            f'{metric}_{field}': values for metric, arrays in summary.items()
+            for field, values in zip(['cells', 'trips', 'median', 'mad'], arrays)})
+        # Written last: an interrupted save leaves a mismatch, and the next one rebuilds
+        months = self.months(directory)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'months': months}, f, indent=2)
+        
+        cells = max((len(arrays[0]) for arrays in summary.values()), default=0)
+        print(f"✓ Outlier statistics saved to: {directory} ({len(months)} months, "
+              f"{cells:,} hour/zone-pair cells)")
+    
+    @classmethod
+    def references(cls, sources, directory=None):
+        """source -> (history, reference) for files about to run in parallel,
+        taken before any of them saves its month, so each is judged the same
+        whatever the worker count and finishing order"""
+        return {source: (cls.history(source, directory), cls.reference(source, directory))
+                for source in sources}
+    
+    @classmethod
+    def reference(cls, source, directory=None):
+        """Summary a file's trips are judged against: the stored months other than its own"""
+        directory = directory or Config.OUTLIER_STATS_DIR
+        own = cls.month_path(source, directory)
+        stored = cls.months(directory)
+        others = [path for path in stored if path != own]
+        if not others:
+            return {}
+        
+        if cls.included(directory) != stored:
+            # The stored sum is out of date (e.g. an interrupted run)
+            return cls.load(others).summary()
+        if own not in stored:
+            # A new month: the stored summary is already the right one
+            with np.load(os.path.join(directory, 'summary.npz')) as arrays:
+                return {metric: tuple(arrays[f'{metric}_{field}'] for field in ['cells', 'trips', 'median', 'mad'])
+                        for metric in cls.METRICS if f'{metric}_cells' in arrays}
+        
+        # A re-run: take the month's own counts back out of the sum
+        stats = cls.load([os.path.join(directory, 'counts.npz')])
+        with np.load(own) as arrays:
+            stats.merge(dict(arrays), sign=-1)
+        return stats.summary()
+
 
 # =====================================================================
 # STEP 3: NORMALIZATION
@@ -389,7 +1557,8 @@ class DataNormalizer:
         
         for col, precision in numeric_precision.items():
             if col in df.columns:
-                df[col] = df[col].round(precision)
+                # float32 ingest fields go out as float64 cents (0.3, not 0.30000001)
+                df[col] = df[col].astype('float64').round(precision)
         
         # Ensure integer fields are proper integers
         integer_fields = ['VendorID', 'passenger_count', 'RatecodeID', 
@@ -397,7 +1566,8 @@ class DataNormalizer:
         
         for col in integer_fields:
             if col in df.columns:
-                df[col] = df[col].astype(int)
+                # Compact numpy ints from the ingest schema ('Int8' -> 'int8')
+                df[col] = df[col].astype(Config.TRIP_DTYPES.get(col, 'int64').lower())
         
         print(f"✓ Numeric field normalization complete")
         
@@ -409,7 +1579,7 @@ class DataNormalizer:
         
         # Standardize store_and_fwd_flag
         if 'store_and_fwd_flag' in df.columns:
-            df['store_and_fwd_flag'] = df['store_and_fwd_flag'].str.upper()
+            df['store_and_fwd_flag'] = DataNormalizer.relabel(df['store_and_fwd_flag'], lambda v: v.str.upper())
 
         
         # Standardize zone names (strip whitespace, title case)
@@ -418,155 +1588,2077 @@ class DataNormalizer:
         
         for col in zone_cols:
             if col in df.columns:
-                df[col] = df[col].str.strip()
+                df[col] = DataNormalizer.relabel(df[col], lambda v: v.str.strip())
         
         # Create categorical codes for efficient storage
         categorical_mappings = {}
+        borough_cols = [col for col in ['pickup_borough', 'dropoff_borough'] if col in df.columns]
         
-        for col in ['pickup_borough', 'dropoff_borough']:
-            if col in df.columns:
-                df[col] = df[col].astype('category')
-                categorical_mappings[col] = dict(enumerate(df[col].cat.categories))
+        # Share one category set between pickup and dropoff so the two stay
+        # comparable (e.g. for is_inter_borough) whatever each chunk contains
+        boroughs = pd.unique(pd.concat([df[col] for col in borough_cols]).dropna()) if borough_cols else []
+        borough_dtype = pd.CategoricalDtype(sorted(boroughs))
+        
+        for col in borough_cols:
+            df[col] = df[col].astype(borough_dtype)
+            categorical_mappings[col] = dict(enumerate(df[col].cat.categories))
         
         return df, categorical_mappings
+    
+    @staticmethod
+    def relabel(series, func):
+        """Apply a .str transform, to the labels only when categorical"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            categories = func(series.cat.categories)
+            if categories.is_unique:
+                return series.cat.rename_categories(categories)
+        return func(series)
 
 # =====================================================================
 # STEP 4: FEATURE ENGINEERING
 # =====================================================================
 
-class FeatureEngineer:
-    """Create derived features for deeper insights"""
+class FeatureRegistry:
+    """Derived features with declared inputs, computed on demand"""
     
-    @staticmethod
-    def create_derived_features(df):
-        """Define and create meaningful derived features"""
-
-        # ===================================================================
-        # FEATURE 1: Average Speed (mph)
-        # ===================================================================
+    def __init__(self):
+        self.features = {}
+    
+    def register(self, name, inputs, dtype, available=None):
+        """Decorator: register func(df) -> values as feature `name`
         
-        df['avg_speed_mph'] = np.where(
-            df['trip_duration_minutes'] > 0,
-            df['trip_distance'] / (df['trip_duration_minutes'] / 60),
-            0
-        )
+        `available` is an optional check; features that fail it are left
+        out of the default set (they can still be requested by name).
+        """
+        def decorator(func):
+            self.features[name] = {'inputs': list(inputs), 'dtype': dtype, 'func': func,
+                                   'available': available}
+            return func
+        return decorator
+    
+    def defaults(self):
+        """Registered features whose availability check (if any) passes"""
+        return [name for name, feature in self.features.items()
+                if feature['available'] is None or feature['available']()]
+    
+    def resolve(self, names, available=()):
+        """Features to compute, dependencies first, skipping available columns"""
+        available = set(available)
+        order = []
         
-        # Cap unrealistic speeds (>80 mph in NYC)
-        df['avg_speed_mph'] = df['avg_speed_mph'].clip(upper=80)
-        df['avg_speed_mph'] = df['avg_speed_mph'].round(2)
+        def visit(name, path):
+            if name in order or name in available:
+                return
+            if name in path:
+                raise ValueError(f"Circular feature dependency: {' -> '.join(path + (name,))}")
+            for dependency in self.features[name]['inputs']:
+                if dependency in self.features:
+                    visit(dependency, path + (name,))
+                elif dependency not in available:
+                    raise KeyError(f"Feature {name} needs missing column {dependency}")
+            order.append(name)
         
-        # ===================================================================
-        # FEATURE 2: Cost Per Mile ($/mile)
-        # ===================================================================
+        for name in names:
+            if name not in self.features and name not in available:
+                raise KeyError(f"Unknown feature: {name}")
+            visit(name, ())
         
-        df['cost_per_mile'] = np.where(
-            df['trip_distance'] > 0,
-            df['total_amount'] / df['trip_distance'],
-            0
-        )
-        df['cost_per_mile'] = df['cost_per_mile'].round(2)
-        
-        # ===================================================================
-        # FEATURE 3: Tip Percentage
-        # ===================================================================
-        df['tip_percentage'] = np.where(
-            df['fare_amount'] > 0,
-            (df['tip_amount'] / df['fare_amount']) * 100,
-            0
-        )
-        df['tip_percentage'] = df['tip_percentage'].clip(upper=100).round(2)
-        
-        # ===================================================================
-        # FEATURE 4: Time of Day Category
-        # ===================================================================
-        
-        def categorize_time_of_day(hour):
-            if 0 <= hour < 6:
-                return 'Night'
-            elif 6 <= hour < 10:
-                return 'Morning Rush'
-            elif 10 <= hour < 16:
-                return 'Midday'
-            elif 16 <= hour < 20:
-                return 'Evening Rush'
-            else:
-                return 'Night'
-        
-        df['time_of_day'] = df['pickup_hour'].apply(categorize_time_of_day)
-        
-        # ===================================================================
-        # FEATURE 5: Inter-Borough Trip Flag
-        # ===================================================================
-        
-        df['is_inter_borough'] = (
-            df['pickup_borough'] != df['dropoff_borough']
-        ).astype(int)
-       
-        df['revenue_per_minute'] = np.where(
-            df['trip_duration_minutes'] > 0,
-            df['total_amount'] / df['trip_duration_minutes'],
-            0
-        )
-        df['revenue_per_minute'] = df['revenue_per_minute'].round(2)
+        return order
+    
+    def compute(self, df, names=None):
+        """Add the requested features (default: all available) and what they depend on"""
+        names = self.defaults() if names is None else names
+        
+        for name in self.resolve(names, available=df.columns):
+            feature = self.features[name]
+            df[name] = feature['func'](df)
+            if df[name].dtype != feature['dtype']:
+                df[name] = df[name].astype(feature['dtype'])
         
         return df
 
-# =====================================================================
-# PIPELINE EXECUTION
-# =====================================================================
 
-class DataPipeline:
-    """Main pipeline orchestrator"""
+class FeatureEngineer:
+    """Create derived features for deeper insights"""
     
-    def __init__(self):
-        self.start_time = datetime.now()
-        self.cleaner = DataCleaner()
-        
-        # Ensure output directory exists
-        os.makedirs(Config.CLEAN_DATA_DIR, exist_ok=True)
+    # Hour of pickup -> time of day, as codes into TIME_OF_DAY_LABELS
+    TIME_OF_DAY_LABELS = ['Night', 'Morning Rush', 'Midday', 'Evening Rush']
+    HOUR_TO_TIME_OF_DAY = (
+        [0] * 6 +    # 00-05 Night
+        [1] * 4 +    # 06-09 Morning Rush
+        [2] * 6 +    # 10-15 Midday
+        [3] * 4 +    # 16-19 Evening Rush
+        [0] * 4      # 20-23 Night
+    )
     
-    def run(self):
+    # Every feature declares its input columns and output dtype; inputs
+    # that are themselves features are computed first when missing
+    registry = FeatureRegistry()
+    
+    @staticmethod
+    def create_derived_features(df, features=None):
+        """Define and create meaningful derived features"""
+        features = Config.DERIVED_FEATURES if features is None else features
+        
+        return FeatureEngineer.registry.compute(df, features)
+    
+    @staticmethod
+    def ratio(numerator, denominator, valid):
+        """numerator / denominator where valid, 0 elsewhere (no division there)"""
+        out = np.zeros(len(valid), dtype='float64')
+        np.divide(numerator, denominator, out=out, where=valid)
+        return out
+    
+    # ===================================================================
+    # BASE: Trip Duration (minutes), normally already set by detect_outliers
+    # ===================================================================
+    
+    @staticmethod
+    @registry.register('trip_duration_minutes',
+                       inputs=['tpep_pickup_datetime', 'tpep_dropoff_datetime'], dtype='float64')
+    def trip_duration_minutes(df):
+        return (df['tpep_dropoff_datetime'] - df['tpep_pickup_datetime']).dt.total_seconds() / 60
+    
+    # ===================================================================
+    # FEATURE 1: Average Speed (mph)
+    # ===================================================================
+    
+    @staticmethod
+    @registry.register('avg_speed_mph', inputs=['trip_distance', 'trip_duration_minutes'], dtype='float64')
+    def avg_speed_mph(df):
+        duration = df['trip_duration_minutes'].to_numpy(dtype='float64')
+        speed = FeatureEngineer.ratio(df['trip_distance'].to_numpy(dtype='float64'),
+                                      duration / 60, duration > 0)
+        
+        # Cap unrealistic speeds (>80 mph in NYC)
+        np.minimum(speed, 80, out=speed)
+        return np.round(speed, 2, out=speed)
+    
+    # ===================================================================
+    # FEATURE 2: Cost Per Mile ($/mile)
+    # ===================================================================
+    
+    @staticmethod
+    @registry.register('cost_per_mile', inputs=['total_amount', 'trip_distance'], dtype='float64')
+    def cost_per_mile(df):
+        distance = df['trip_distance'].to_numpy(dtype='float64')
+        cost = FeatureEngineer.ratio(df['total_amount'].to_numpy(dtype='float64'),
+                                     distance, distance > 0)
+        return np.round(cost, 2, out=cost)
+    
+    # ===================================================================
+    # FEATURE 3: Tip Percentage
+    # ===================================================================
+    
+    @staticmethod
+    @registry.register('tip_percentage', inputs=['tip_amount', 'fare_amount'], dtype='float64')
+    def tip_percentage(df):
+        fare = df['fare_amount'].to_numpy(dtype='float64')
+        tip = FeatureEngineer.ratio(df['tip_amount'].to_numpy(dtype='float64'), fare, fare > 0)
+        tip *= 100
+        np.minimum(tip, 100, out=tip)
+        return np.round(tip, 2, out=tip)
+    
+    # ===================================================================
+    # FEATURE 4: Time of Day Category
+    # ===================================================================
+    
+    @staticmethod
+    @registry.register('time_of_day', inputs=['pickup_hour'], dtype='category')
+    def time_of_day(df):
+        hours = df['pickup_hour'].to_numpy()
+        codes = np.array(FeatureEngineer.HOUR_TO_TIME_OF_DAY, dtype=np.int8)[hours]
+        return pd.Categorical.from_codes(codes, categories=FeatureEngineer.TIME_OF_DAY_LABELS)
+    
+    # ===================================================================
+    # FEATURE 5: Inter-Borough Trip Flag
+    # ===================================================================
+    
+    @staticmethod
+    @registry.register('is_inter_borough', inputs=['pickup_borough', 'dropoff_borough'], dtype='int64')
+    def is_inter_borough(df):
+        return (df['pickup_borough'] != df['dropoff_borough']).astype(int)
+    
+    # ===================================================================
+    # FEATURE 6: Revenue Per Minute ($/minute)
+    # ===================================================================
+    
+    @staticmethod
+    @registry.register('revenue_per_minute', inputs=['total_amount', 'trip_duration_minutes'], dtype='float64')
+    def revenue_per_minute(df):
+        duration = df['trip_duration_minutes'].to_numpy(dtype='float64')
+        revenue = FeatureEngineer.ratio(df['total_amount'].to_numpy(dtype='float64'),
+                                        duration, duration > 0)
+        return np.round(revenue, 2, out=revenue)
+    
+    # ===================================================================
+    # FEATURES 7-9: Zone Geometry (need the zone geometry index)
+    # ===================================================================
+    
+    @staticmethod
+    @registry.register('straight_line_miles', inputs=['PULocationID', 'DOLocationID'],
+                       dtype='float64', available=ZoneGeometry.available)
+    def straight_line_miles(df):
+        geometry = ZoneGeometry.require()
+        miles = geometry.straight_line_miles(df['PULocationID'].to_numpy(dtype='float64', na_value=np.nan),
+                                             df['DOLocationID'].to_numpy(dtype='float64', na_value=np.nan))
+        return np.round(miles, 2, out=miles)
+    
+    @staticmethod
+    @registry.register('distance_ratio', inputs=['trip_distance', 'straight_line_miles'],
+                       dtype='float64', available=ZoneGeometry.available)
+    def distance_ratio(df):
+        # Trip distance over the straight line between zone centroids:
+        # how indirect the route was (0 within a zone or without geometry)
+        straight = df['straight_line_miles'].to_numpy(dtype='float64')
+        ratio = FeatureEngineer.ratio(df['trip_distance'].to_numpy(dtype='float64'),
+                                      straight, straight > 0)
+        return np.round(ratio, 2, out=ratio)
+    
+    @staticmethod
+    @registry.register('is_adjacent_zone', inputs=['PULocationID', 'DOLocationID'],
+                       dtype='int64', available=ZoneGeometry.available)
+    def is_adjacent_zone(df):
+        geometry = ZoneGeometry.require()
+        return geometry.adjacent(df['PULocationID'].to_numpy(dtype='float64', na_value=np.nan),
+                                 df['DOLocationID'].to_numpy(dtype='float64', na_value=np.nan)).astype(int)
+
+# =====================================================================
+# DATA PROFILING
+# =====================================================================
+
+class ColumnSketch:
+    """Mergeable one-pass summary of a column: nulls, min/max, quantiles,
+    distinct count and most frequent values"""
+    
+    def __init__(self):
+        self.kind = None  # 'numeric', 'datetime' or 'categorical', set by the first add
+        self.dtype = None
+        self.rows = 0
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        # Quantiles: log-spaced buckets with bounded relative error (as in
+        # DDSketch), kept separately for positive and negative values
+        self.positive = Counter()
+        self.negative = Counter()
+        self.zeros = 0
+        # Distinct count: HyperLogLog registers
+        self.registers = np.zeros(2 ** Config.PROFILE_DISTINCT_PRECISION, dtype=np.uint8)
+        # Frequent values (Misra-Gries): exact counts until there are more
+        # distinct values than counters, lower bounds after that
+        self.frequent = Counter()
+        self.truncated = False
+    
+    @classmethod
+    def of(cls, series):
+        sketch = cls()
+        sketch.add(series)
+        return sketch
+    
+    @staticmethod
+    def gamma():
+        accuracy = Config.PROFILE_QUANTILE_ACCURACY
+        return (1 + accuracy) / (1 - accuracy)
+    
+    def add(self, series):
+        """Fold one chunk of a column into the sketch"""
+        if self.kind is None:
+            self.dtype = str(series.dtype)
+            if pd.api.types.is_datetime64_any_dtype(series):
+                self.kind = 'datetime'
+            elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                self.kind = 'numeric'
+            else:
+                self.kind = 'categorical'
+        
+        null = series.isna().to_numpy()
+        self.rows += len(series)
+        self.nulls += int(null.sum())
+        if null.all():
+            return
+        
+        if self.kind == 'datetime':
+            # Timestamps are nearly all distinct: bounds and distinct count only
+            values = series.to_numpy(dtype='datetime64[ns]')[~null].view(np.int64)
+            self.update_bounds(values)
+            self.add_hashes(pd.util.hash_array(values))
+            return
+        
+        # One counting pass; bounds, buckets and the distinct sketch then
+        # work on the chunk's distinct values (weighted by their counts)
+        counts = series.value_counts()
+        counts = counts[counts > 0]  # categoricals list unused categories too
+        if self.kind == 'numeric':
+            values = counts.index.to_numpy(dtype='float64')
+            self.update_bounds(values)
+            self.add_buckets(values, counts.to_numpy())
+        else:
+            values = np.asarray(counts.index, dtype=object)
+        self.add_hashes(pd.util.hash_array(values))
+        
+        truncated = len(counts) > Config.PROFILE_FREQUENT_ITEMS
+        if truncated:
+            # Only the chunk's top counters can survive the reduction
+            cut = counts.iloc[Config.PROFILE_FREQUENT_ITEMS]
+            counts = counts[counts > cut] - cut
+        self.add_frequent(dict(zip(counts.index.tolist(), counts.tolist())), truncated)
+    
+    def update_bounds(self, values):
+        self.min = values.min() if self.min is None else min(self.min, values.min())
+        self.max = values.max() if self.max is None else max(self.max, values.max())
+    
+    def add_buckets(self, values, weights):
+        log_gamma = np.log(self.gamma())
+        for store, sign in ((self.positive, 1), (self.negative, -1)):
+            part = values * sign > 0
+            if part.any():
+                buckets = np.ceil(np.log(values[part] * sign) / log_gamma).astype(np.int64)
+                low = buckets.min()
+                counts = np.bincount(buckets - low, weights=weights[part]).astype(np.int64)
+                nonzero = np.flatnonzero(counts)
+                store.update(dict(zip((nonzero + low).tolist(), counts[nonzero].tolist())))
+        self.zeros += int(weights[values == 0].sum())
     
+    def add_hashes(self, hashes):
+        precision = Config.PROFILE_DISTINCT_PRECISION
+        # Register from the top bits, rank = leading zeros of the rest + 1
+        index = (hashes >> np.uint64(64 - precision)).astype(np.intp)
+        rest = hashes << np.uint64(precision)
+        for shift in (1, 2, 4, 8, 16, 32):
+            rest |= rest >> np.uint64(shift)
+        # Set bits of the smeared value = bit length of the original
+        if hasattr(np, 'bitwise_count'):
+            bit_length = np.bitwise_count(rest).astype(np.int64)
+        else:
+            # numpy < 2: count a byte at a time through a lookup table
+            ones = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1, dtype=np.uint8)
+            bit_length = ones[rest.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.int64)
+        rank = np.minimum(64 - bit_length + 1, 64 - precision + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+    
+    def add_frequent(self, counts, truncated):
+        self.frequent.update(counts)
+        capacity = Config.PROFILE_FREQUENT_ITEMS
+        if len(self.frequent) > capacity:
+            # Misra-Gries reduction: take the (capacity + 1)-th largest count off every counter
+            cut = sorted(self.frequent.values(), reverse=True)[capacity]
+            self.frequent = Counter({value: count - cut for value, count in self.frequent.items() if count > cut})
+            truncated = True
+        self.truncated = self.truncated or truncated
+    
+    def merge(self, other):
+        """Fold in a sketch of the same column from another chunk or file"""
+        if other.kind is None:
+            return
+        self.kind = self.kind or other.kind
+        self.dtype = self.dtype or other.dtype
+        self.rows += other.rows
+        self.nulls += other.nulls
+        for bound, pick in (('min', min), ('max', max)):
+            mine, theirs = getattr(self, bound), getattr(other, bound)
+            setattr(self, bound, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zeros += other.zeros
+        np.maximum(self.registers, other.registers, out=self.registers)
+        self.add_frequent(other.frequent, other.truncated)
+    
+    @property
+    def exact(self):
+        """True while the frequent-value counters still hold every value"""
+        return self.kind != 'datetime' and not self.truncated
+    
+    def distinct(self):
+        if self.exact:
+            return len(self.frequent)
+        registers = self.registers.astype(np.float64)
+        m = len(registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(2.0 ** -registers)
+        empty = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and empty:
+            estimate = m * np.log(m / empty)  # linear counting for small sets
+        return int(round(estimate))
+    
+    def quantile(self, q):
+        """Value at quantile q: interpolated from exact counts while they are
+        complete, else the bucket representative (within the relative accuracy)"""
+        if self.kind != 'numeric' or self.rows == self.nulls:
+            return None
+        if self.exact:
+            values = np.array(list(self.frequent), dtype='float64')
+            order = np.argsort(values)
+            values, cumulative = values[order], np.cumsum(np.array(list(self.frequent.values()))[order])
+            rank = q * (cumulative[-1] - 1)
+            lower = values[np.searchsorted(cumulative, np.floor(rank), side='right')]
+            upper = values[np.searchsorted(cumulative, np.ceil(rank), side='right')]
+            return float(lower + (upper - lower) * (rank - np.floor(rank)))
+        
+        gamma = self.gamma()
+        negative = sorted(self.negative, reverse=True)
+        positive = sorted(self.positive)
+        representatives = np.array([-2 * gamma ** i / (gamma + 1) for i in negative] + [0.0] +
+                                   [2 * gamma ** i / (gamma + 1) for i in positive])
+        counts = np.array([self.negative[i] for i in negative] + [self.zeros] +
+                          [self.positive[i] for i in positive])
+        rank = np.floor(q * (counts.sum() - 1))
+        value = representatives[np.searchsorted(np.cumsum(counts), rank, side='right')]
+        return float(np.clip(value, self.min, self.max))
+    
+    def median(self):
+        """Median of the non-null values (NaN when there are none)"""
+        value = self.quantile(0.5)
+        return np.nan if value is None else value
+    
+    def top(self, k=None):
+        """Most frequent values as (value, count) pairs"""
+        return self.frequent.most_common(k or Config.PROFILE_TOP_K)
+    
+    def summary(self):
+        """JSON-ready description of the column"""
+        summary = {'dtype': self.dtype, 'rows': self.rows, 'nulls': self.nulls,
+                   'null_pct': round(self.nulls / max(self.rows, 1) * 100, 2)}
+        if self.min is not None:
+            if self.kind == 'datetime':
+                summary['min'] = pd.Timestamp(self.min).isoformat()
+                summary['max'] = pd.Timestamp(self.max).isoformat()
+            else:
+                summary['min'], summary['max'] = float(self.min), float(self.max)
+        if self.kind == 'numeric' and self.rows > self.nulls:
+            summary['quantiles'] = {f"p{round(q * 100):02d}": round(self.quantile(q), 4)
+                                    for q in Config.PROFILE_QUANTILES}
+        summary['distinct'] = self.distinct()
+        summary['distinct_exact'] = self.exact
+        if self.kind != 'datetime':
+            summary['top'] = [[value, count] for value, count in self.top()]
+            summary['top_exact'] = self.exact
+        return summary
+    
+    def state(self):
+        """Everything needed to rebuild the sketch, JSON-serializable"""
+        return {
+            'kind': self.kind, 'dtype': self.dtype, 'rows': self.rows, 'nulls': self.nulls,
+            'min': None if self.min is None else self.min.item() if hasattr(self.min, 'item') else self.min,
+            'max': None if self.max is None else self.max.item() if hasattr(self.max, 'item') else self.max,
+            'positive': list(self.positive.items()), 'negative': list(self.negative.items()),
+            'zeros': self.zeros,
+            'registers': base64.b64encode(zlib.compress(self.registers.tobytes())).decode(),
+            'frequent': [list(self.frequent), list(self.frequent.values())],
+            'truncated': self.truncated,
+        }
+    
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls()
+        for name in ['kind', 'dtype', 'rows', 'nulls', 'min', 'max', 'zeros', 'truncated']:
+            setattr(sketch, name, state[name])
+        sketch.positive = Counter(dict(state['positive']))
+        sketch.negative = Counter(dict(state['negative']))
+        sketch.registers = np.frombuffer(zlib.decompress(base64.b64decode(state['registers'])),
+                                         dtype=np.uint8).copy()
+        sketch.frequent = Counter(dict(zip(*state['frequent'])))
+        return sketch
+
+
+class DataProfile:
+    """Column sketches for every column of a frame, mergeable across chunks and files"""
+    
+    def __init__(self):
+        self.columns = {}
+    
+    @classmethod
+    def of(cls, df):
+        profile = cls()
+        profile.add(df)
+        return profile
+    
+    def add(self, df):
+        """Fold in a frame; returns its null count per column"""
+        nulls = {}
+        for col in df.columns:
+            sketch = self.columns.setdefault(col, ColumnSketch())
+            before = sketch.nulls
+            sketch.add(df[col])
+            nulls[col] = sketch.nulls - before
+        return nulls
+    
+    def merge(self, other):
+        for col, sketch in other.columns.items():
+            self.columns.setdefault(col, ColumnSketch()).merge(sketch)
+    
+    def __contains__(self, col):
+        return col in self.columns
+    
+    def __getitem__(self, col):
+        return self.columns[col]
+    
+    @property
+    def rows(self):
+        return max((sketch.rows for sketch in self.columns.values()), default=0)
+    
+    def summary(self):
+        return {col: sketch.summary() for col, sketch in self.columns.items()}
+    
+    def state(self):
+        return {col: sketch.state() for col, sketch in self.columns.items()}
+    
+    @classmethod
+    def from_state(cls, state):
+        profile = cls()
+        profile.columns = {col: ColumnSketch.from_state(sketch) for col, sketch in state.items()}
+        return profile
+
+# =====================================================================
+# STAGE CACHE
+# =====================================================================
+
+class StageCache:
+    """Parquet copies of intermediate stage outputs, keyed by content hash"""
+    
+    METADATA_KEY = b'urban_mobility'
+    _code_version = None
+    
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or Config.CACHE_DIR
+        self.max_bytes = Config.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def fingerprint(path):
+        """Cheap identity of an input file: path, size and modification time"""
+        stat = os.stat(path)
+        return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+    
+    @staticmethod
+    def make_key(*parts):
+        """Short stable hash of JSON-serializable parts"""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+    
+    @classmethod
+    def code_version(cls):
+        """Hash of this module, so any code change invalidates the cache"""
+        if cls._code_version is None:
+            with open(os.path.abspath(__file__), 'rb') as f:
+                cls._code_version = hashlib.sha256(f.read()).hexdigest()[:16]
+        return cls._code_version
+    
+    @classmethod
+    def with_metadata(cls, metadata, values):
+        """Schema metadata with our JSON entry added"""
+        return {**(metadata or {}), cls.METADATA_KEY: json.dumps(values).encode()}
+    
+    @classmethod
+    def read_metadata(cls, path):
+        """Our JSON entry from a Parquet file's schema metadata"""
+        metadata = pq.read_schema(path).metadata or {}
+        return json.loads(metadata[cls.METADATA_KEY]) if cls.METADATA_KEY in metadata else {}
+    
+    def path(self, stage, key):
+        return os.path.join(self.cache_dir, f"{stage}-{key}.parquet")
+    
+    def contains(self, stage, key):
+        return os.path.exists(self.path(stage, key))
+    
+    def load(self, stage, key):
+        """Cached frame and the state stored with it, or None once evicted"""
+        path = self.path(stage, key)
         try:
-            # ====== DATA INTEGRATION ======
-            loader = DataLoader()
+            table = pq.read_table(path)
+        except FileNotFoundError:
+            # Another run sharing the cache evicted it after contains()
+            return None
+        # Touch the entry so eviction treats it as recently used
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+        
+        return table.to_pandas(), json.loads(table.schema.metadata[self.METADATA_KEY])
+    
+    def store(self, stage, key, df, state):
+        """Write a stage output, then evict old entries beyond the size limit"""
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata(self.with_metadata(table.schema.metadata, state))
+        
+        path = self.path(stage, key)
+        pq.write_table(table, path + '.tmp', compression='snappy')
+        os.replace(path + '.tmp', path)
+        
+        self.evict(keep=path)
+    
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.parquet') and path != keep:
+                # Entries can vanish under another run evicting at the same time
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+# =====================================================================
+# EXECUTION BACKENDS
+# =====================================================================
+
+class DuckDBBackend:
+    """Integrity stages as out-of-core DuckDB SQL over the Parquet input"""
+    
+    # Pipeline stages this backend replaces. Zones are attached per batch
+    # with ZoneLookup (an array index beats a SQL join plus re-encoding to
+    # categoricals); normalization and features run through the pandas
+    # stage definitions
+    STAGES = ['integrate_data', 'handle_missing_values', 'remove_duplicates', 'detect_outliers']
+    # SQL for the derived values outlier rules refer to (see DataCleaner.detect_outliers)
+    DERIVED = {
+        'trip_duration_minutes':
+            '(epoch_us(tpep_dropoff_datetime) - epoch_us(tpep_pickup_datetime)) / 1e6 / 60',
+        'total_amount_mismatch':
+            'abs(total_amount - (fare_amount + extra + mta_tax + tip_amount + tolls_amount'
+            ' + improvement_surcharge + coalesce(congestion_surcharge, 0)))',
+    }
+    
+    def __init__(self, cleaner):
+        if not HAS_DUCKDB:
+            raise ImportError("Config.BACKEND = 'duckdb' needs the duckdb package")
+        if Config.DUPLICATE_KEYS_DIR:
+            raise ValueError("DUPLICATE_KEYS_DIR needs the pandas backend")
+        import duckdb
+        
+        self.cleaner = cleaner
+        # Raw columns as ingested; results are cast back to these types
+        self.schema = pa.schema([
+            pa.field(field.name, field.type.value_type if pa.types.is_dictionary(field.type) else field.type)
+            for field in pq.read_schema(Config.TRIP_DATA_PARQUET)
+        ])
+        # A scratch database file per process rather than memory, so the
+        # cleaned table can live on disk when it outgrows the memory limit;
+        # intermediate results spill next to it (<file>.tmp)
+        os.makedirs(Config.DUCKDB_TEMP_DIR, exist_ok=True)
+        self.path = os.path.join(Config.DUCKDB_TEMP_DIR, f"trips_{os.getpid()}.duckdb")
+        self.con = duckdb.connect(self.path)
+        if Config.DUCKDB_THREADS:
+            self.con.execute(f"SET threads = {int(Config.DUCKDB_THREADS)}")
+        if Config.DUCKDB_MEMORY_LIMIT:
+            self.con.execute(f"SET memory_limit = '{Config.DUCKDB_MEMORY_LIMIT}'")
+    
+    @staticmethod
+    def quote(name):
+        return '"' + name.replace('"', '""') + '"'
+    
+    def clean(self):
+        """Drop, fill, deduplicate and flag outliers in SQL; counters go to the cleaner"""
+        cleaner = self.cleaner
+        columns = self.schema.names
+        q = self.quote
+        source = f"read_parquet('{Config.TRIP_DATA_PARQUET}', file_row_number = true)"
+        
+        # Missing values: rows are dropped field by field, so each field
+        # counts the rows still complete in the fields before it
+        critical = [f for f in cleaner.CRITICAL_FIELDS if f in columns]
+        present = "TRUE"
+        counts = ["count(*) AS initial_rows"]
+        for field in critical:
+            counts.append(f"count(*) FILTER (WHERE {present} AND {q(field)} IS NULL) AS {q('missing_' + field)}")
+            present = f"{present} AND {q(field)} IS NOT NULL"
+        fills = [f for f in ['passenger_count'] + cleaner.PAYMENT_FIELDS if f in columns]
+        counts += [f"count(*) FILTER (WHERE {present} AND {q(f)} IS NULL) AS {q('filled_' + f)}" for f in fills]
+        counts.append(f"count(*) FILTER (WHERE {present}) AS rows_after_missing")
+        if 'passenger_count' in columns:
+            counts.append(f"quantile_cont(passenger_count, 0.5) FILTER (WHERE {present}) AS passenger_median")
+        
+        result = self.con.execute(f"SELECT {', '.join(counts)} FROM {source}")
+        stats = dict(zip([d[0] for d in result.description], result.fetchone()))
+        median = stats.pop('passenger_median', None)
+        
+        replace = [f"coalesce({q(f)}, 0) AS {q(f)}" for f in cleaner.PAYMENT_FIELDS if f in columns]
+        if median is not None and stats['filled_passenger_count']:
+            cleaner.passenger_median = median
+            # Integer counts keep the whole part, as in handle_missing_values
+            replace.append(f"coalesce(passenger_count, {int(median)}) AS passenger_count")
+        
+        # Outlier rules: one flag column per rule, evaluated after duplicate removal
+        flags = []
+        for i, (key, _, column, low, high) in enumerate(Config.OUTLIER_RULES):
+            values = self.DERIVED.get(column, q(column))
+            tests = []
+            if low is not None:
+                tests.append(f"{values} < {float(cleaner.threshold(low))!r}")
+            if high is not None:
+                tests.append(f"{values} > {float(cleaner.threshold(high))!r}")
+            flags.append(f"coalesce({' OR '.join(tests) or 'FALSE'}, FALSE) AS hit_{i}")
+        
+        # First occurrence (in file order) wins, as with DuplicateIndex. A
+        # grouped min + semi join spills to disk where a window would not;
+        # the table is stored in file order so batches stream without a sort
+        duplicate_cols = ', '.join(q(col) for col in cleaner.DUPLICATE_COLS)
+        self.con.execute(f"""
+            CREATE OR REPLACE TABLE trips AS
+            WITH complete AS (
+                SELECT * {f"REPLACE ({', '.join(replace)})" if replace else ""}
+                FROM {source}
+                WHERE {present}
+            ),
+            first_rows AS (
+                SELECT min(file_row_number) AS file_row_number FROM complete GROUP BY {duplicate_cols}
+            )
+            SELECT *, {', '.join(flags)}
+            FROM complete SEMI JOIN first_rows USING (file_row_number)
+            ORDER BY file_row_number
+        """)
+        
+        hits = [f"hit_{i}" for i in range(len(Config.OUTLIER_RULES))]
+        counts = ["count(*) AS rows_after_duplicates"]
+        for i, (key, *_) in enumerate(Config.OUTLIER_RULES):
+            earlier = ' OR '.join(hits[:i]) or 'FALSE'
+            counts.append(f"count(*) FILTER (WHERE hit_{i} AND NOT ({earlier})) AS {q('outliers_' + key)}")
+            counts.append(f"count(*) FILTER (WHERE hit_{i}) AS {q('outliers_any_' + key)}")
+        counts.append(f"count(*) FILTER (WHERE NOT ({' OR '.join(hits) or 'FALSE'})) AS rows_after_outliers")
+        result = self.con.execute(f"SELECT {', '.join(counts)} FROM trips")
+        stats.update(zip([d[0] for d in result.description], result.fetchone()))
+        
+        stats['duplicates'] = stats['rows_after_missing'] - stats['rows_after_duplicates']
+        stats['outlier_input_rows'] = stats['rows_after_duplicates']
+        cleaner.stats.update({key: int(value) for key, value in stats.items()})
+        # Keys live in DuckDB's hash table, not in a Python-side key set
+        cleaner.stats['duplicate_keys'] = stats['rows_after_duplicates']
+        cleaner.stats['duplicate_key_bytes'] = 0
+        
+        print(f"✓ DuckDB integrity stages: {stats['initial_rows']:,} rows in, "
+              f"{stats['rows_after_outliers']:,} rows out")
+        return stats['rows_after_outliers']
+    
+    def batches(self, batch_size=None):
+        """Yield the kept trips in file order, with file row numbers as the index"""
+        hits = ' OR '.join(f"hit_{i}" for i in range(len(Config.OUTLIER_RULES))) or 'FALSE'
+        columns = ', '.join(self.quote(col) for col in self.schema.names)
+        result = self.con.execute(f"""
+            SELECT {columns}, file_row_number FROM trips WHERE NOT ({hits})
+        """)
+        # to_arrow_reader replaces fetch_record_batch from DuckDB 1.4
+        to_reader = getattr(result, 'to_arrow_reader', None) or result.fetch_record_batch
+        reader = to_reader(batch_size or Config.CHUNK_SIZE)
+        
+        for batch in reader:
+            table = pa.Table.from_batches([batch])
+            index = table['file_row_number'].to_numpy()
+            trips_df = DataLoader.apply_schema(table.drop_columns('file_row_number').cast(self.schema).to_pandas())
+            trips_df.index = pd.Index(index)
+            yield trips_df
+    
+    @staticmethod
+    def integrate(trips_df, lookup):
+        """Zones and trip duration for a batch from batches() (kept off the reader thread)"""
+        trips_df = DataLoader.integrate_data(trips_df, lookup)
+        trips_df['trip_duration_minutes'] = FeatureEngineer.trip_duration_minutes(trips_df)
+        return trips_df
+    
+    def close(self):
+        self.con.close()
+        for path in (self.path, self.path + '.wal'):
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(self.path + '.tmp', ignore_errors=True)
+
+# =====================================================================
+# OUTPUT STORAGE
+# =====================================================================
+
+class TripStore:
+    """Write integrated trips as one Parquet file or a partitioned directory,
+    and read back only the partitions and columns a query needs"""
+    
+    MAX_PARTITIONS = 10000  # day x borough partitions of a multi-year backfill
+    
+    def __init__(self, path=None, partition_cols=None, preserve_index=None):
+        self.path = path or Config.INTEGRATED_DATA
+        self.partition_cols = Config.OUTPUT_PARTITION_COLS if partition_cols is None else partition_cols
+        # Row labels have no meaning once rows are spread over partitions
+        self.preserve_index = False if self.partition_cols else preserve_index
+        self.schema = None
+        self.writer = None
+        self.parts = 0
+        
+        # Replace the previous output, whichever layout it had
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+    
+    @staticmethod
+    def options():
+        # Zone/borough categoricals are stored as dictionaries; cent-rounded
+        # amounts repeat enough that dictionary pages pay off for them too
+        return {
+            'compression': Config.PARQUET_COMPRESSION,
+            'use_dictionary': True,
+            'write_statistics': True,
+        }
+    
+    def write(self, trips_df):
+        """Append one frame; every frame must share the first frame's schema"""
+        table = pa.Table.from_pandas(trips_df, schema=self.schema, preserve_index=self.preserve_index)
+        if self.schema is None:
+            self.schema = table.schema
+        
+        if not self.partition_cols:
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, self.schema, **self.options())
+            self.writer.write_table(table, row_group_size=Config.PARQUET_ROW_GROUP_SIZE)
+            return
+        
+        # Directory names hold plain values, not dictionary codes
+        for name in self.partition_cols:
+            field = table.schema.field(name)
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(table.schema.get_field_index(name), name,
+                                         table[name].cast(field.type.value_type))
+        
+        ds.write_dataset(
+            table, self.path, format='parquet',
+            partitioning=self.partition_cols, partitioning_flavor='hive',
+            basename_template=f"part-{self.parts}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=ds.ParquetFileFormat().make_write_options(**self.options()),
+            max_rows_per_group=Config.PARQUET_ROW_GROUP_SIZE,
+            max_partitions=self.MAX_PARTITIONS,
+        )
+        self.parts += 1
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+    
+    @staticmethod
+    def dataset(paths=None):
+        """One dataset over trip outputs, single files or partition directories"""
+        paths = paths or [Config.INTEGRATED_DATA]
+        if isinstance(paths, str):
+            paths = [paths]
+        datasets = [ds.dataset(path, format='parquet', partitioning='hive') for path in paths]
+        return datasets[0] if len(datasets) == 1 else ds.dataset(datasets)
+    
+    @staticmethod
+    def read(paths=None, columns=None, **partitions):
+        """Trips matching partition values, e.g. read(pickup_day=15, pickup_borough='Queens').
+        
+        Directory partitions are pruned without opening their files; on a
+        single file the same filter skips row groups by their statistics.
+        A list or tuple value matches any of its values.
+        """
+        condition = None
+        for name, value in partitions.items():
+            if isinstance(value, (list, tuple)):
+                term = ds.field(name).isin(value)
+            else:
+                term = ds.field(name) == value
+            condition = term if condition is None else condition & term
+        
+        return TripStore.dataset(paths).to_table(columns=columns, filter=condition).to_pandas()
+
+
+class TripExport:
+    """Secondary exports of the integrated trips (CSV, Feather), written
+    chunk by chunk with pyarrow, by default on a background thread"""
+    
+    QUEUE_SIZE = 4  # frames waiting for the writer thread
+    FORMATS = ('csv', 'feather')
+    
+    def __init__(self, formats=None, background=None):
+        self.formats = list(Config.OUTPUT_FORMATS if formats is None else formats)
+        unknown = set(self.formats) - set(self.FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown output formats: {sorted(unknown)}")
+        self.background = Config.EXPORT_IN_BACKGROUND if background is None else background
+        
+        self.paths = {
+            'csv': Config.CLEAN_TRIP_DATA + ('.gz' if Config.CSV_COMPRESSION == 'gzip' else ''),
+            'feather': Config.FEATHER_DATA,
+        }
+        self.sinks = []
+        self.writers = {}
+        self.schemas = {}
+        self.error = None
+        self.busy_seconds = 0.0
+        
+        self.queue = None
+        self.thread = None
+        if self.formats and self.background:
+            self.queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+            self.thread = threading.Thread(target=self.drain, name='trip-export', daemon=True)
+            self.thread.start()
+    
+    def write(self, trips_df):
+        if not self.formats:
+            return
+        if self.queue is not None:
+            self.queue.put(trips_df)
+        else:
+            self.write_frame(trips_df)
+    
+    def drain(self):
+        """Writer thread: keep taking frames until the None sentinel"""
+        while True:
+            trips_df = self.queue.get()
+            if trips_df is None:
+                return
+            if self.error is None:
+                try:
+                    self.write_frame(trips_df)
+                except Exception as e:
+                    # Raised from close(); keep draining so producers never block
+                    self.error = e
+    
+    def write_frame(self, trips_df):
+        start = time.perf_counter()
+        table = pa.Table.from_pandas(trips_df, preserve_index=False)
+        # Plain values: chunks carry different category sets, which neither
+        # a CSV header nor one IPC file can follow
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table[field.name].cast(field.type.value_type))
+        
+        for fmt in self.formats:
+            out = table
+            if fmt == 'csv':
+                # Same text as DataFrame.to_csv, without fractional seconds
+                for i, field in enumerate(out.schema):
+                    if pa.types.is_timestamp(field.type):
+                        out = out.set_column(i, field.name, pc.strftime(
+                            out[field.name].cast(pa.timestamp('s')), format='%Y-%m-%d %H:%M:%S'))
+            if fmt not in self.writers:
+                self.open(fmt, out.schema)
+            self.writers[fmt].write_table(out.cast(self.schemas[fmt]))
+        self.busy_seconds += time.perf_counter() - start
+    
+    def open(self, fmt, schema):
+        path = self.paths[fmt]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if fmt == 'csv' and Config.CSV_COMPRESSION == 'gzip':
+            # zlib releases the GIL, so compression overlaps the pipeline too
+            sink = gzip.open(path, 'wb', compresslevel=Config.CSV_COMPRESSION_LEVEL)
+        else:
+            sink = pa.OSFile(path, 'wb')
+        self.sinks.append(sink)
+        
+        if fmt == 'csv':
+            self.writers[fmt] = pacsv.CSVWriter(sink, schema)
+        else:
+            self.writers[fmt] = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+        self.schemas[fmt] = schema
+    
+    def close(self):
+        """Wait for pending frames, then finish every file"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        for writer in self.writers.values():
+            writer.close()
+        for sink in self.sinks:
+            sink.close()
+        self.writers, self.sinks = {}, []
+        
+        if self.error is not None:
+            raise self.error
+        for fmt in self.schemas:
+            print(f"✓ {fmt.upper()} export saved to: {self.paths[fmt]} ({self.busy_seconds:.1f}s writing"
+                  f"{', in background' if self.background else ''})")
+
+
+# =====================================================================
+# ROLLUPS
+# =====================================================================
+
+class RollupBuilder:
+    """Dashboard aggregates kept as additive sums, mergeable across chunks and files"""
+    
+    # output column -> (source column, aggregation)
+    MEASURES = {
+        'trips': ('total_amount', 'size'),
+        'revenue': ('total_amount', 'sum'),
+        'avg_speed_mph_sum': ('avg_speed_mph', 'sum'),
+        'tip_percentage_sum': ('tip_percentage', 'sum'),
+    }
+    
+    def __init__(self, rollups=None):
+        self.rollups = Config.ROLLUPS if rollups is None else rollups
+        self.tables = {}
+    
+    def add(self, trips_df):
+        """Aggregate one frame of final trips into every rollup"""
+        measures = {name: spec for name, spec in self.MEASURES.items() if spec[0] in trips_df}
+        for name, keys in self.rollups.items():
+            partial = trips_df.groupby(keys, observed=True, dropna=False, sort=False).agg(**measures)
+            self.combine(name, partial.reset_index())
+    
+    def merge(self, tables):
+        """Fold in rollup tables built elsewhere (another chunk or file)"""
+        for name, table in tables.items():
+            self.combine(name, table)
+    
+    def combine(self, name, partial):
+        # Keys stay columns: an index would widen small integer keys
+        # (int8 payment_type -> int64) and the schema would depend on chunking
+        keys = self.rollups[name]
+        # Plain object keys: chunks may carry different categories
+        partial = partial.astype({key: object for key in keys
+                                  if isinstance(partial[key].dtype, pd.CategoricalDtype)})
+        
+        if name in self.tables:
+            partial = pd.concat([self.tables[name], partial], ignore_index=True)
+            partial = partial.groupby(keys, dropna=False, sort=False).sum().reset_index()
+        self.tables[name] = partial
+    
+    def result(self, name):
+        """Rollup with averages derived from the sums, sorted by its keys"""
+        keys = self.rollups[name]
+        table = self.tables[name].sort_values(keys, ignore_index=True)
+        table['revenue'] = table['revenue'].round(2)
+        for measure in ['avg_speed_mph', 'tip_percentage']:
+            if f'{measure}_sum' in table:
+                table[measure] = (table[f'{measure}_sum'] / table['trips']).round(2)
+        return table
+    
+    def results(self):
+        return {name: self.result(name) for name in self.tables}
+    
+    def save(self, directory=None):
+        directory = directory or Config.ROLLUP_DIR
+        os.makedirs(directory, exist_ok=True)
+        for name, table in self.results().items():
+            table.to_parquet(os.path.join(directory, f"{name}.parquet"), index=False)
+        print(f"✓ {len(self.tables)} rollups saved to: {directory}")
+    
+    def save_month(self, source, directory=None):
+        """Store the sums for one source file; re-running a file replaces them"""
+        month_dir = os.path.join(directory or Config.ROLLUP_DIR, 'months', Config.source_key(source))
+        os.makedirs(month_dir, exist_ok=True)
+        for name, table in self.tables.items():
+            table.to_parquet(os.path.join(month_dir, f"{name}.parquet"), index=False)
+    
+    @classmethod
+    def rebuild(cls, directory=None):
+        """Add up the stored sums of every file"""
+        builder = cls()
+        for month_dir in sorted(glob.glob(os.path.join(directory or Config.ROLLUP_DIR, 'months', '*'))):
+            for name in builder.rollups:
+                path = os.path.join(month_dir, f"{name}.parquet")
+                if os.path.exists(path):
+                    builder.combine(name, pd.read_parquet(path))
+        return builder
+
+
+class ODMatrix:
+    """Dense hour x pickup zone x dropoff zone flow arrays, additive across chunks and months"""
+    
+    HOURS = 24
+    ZONES = 266  # LocationIDs 1-265 index directly; 0 stays empty
+    CELLS = HOURS * ZONES * ZONES
+    # stored sum -> source column; means are derived from sums / trips
+    MEASURES = {
+        'revenue': 'total_amount',
+        'duration_sum': 'trip_duration_minutes',
+        'speed_sum': 'avg_speed_mph',
+    }
+    
+    def __init__(self, arrays=None):
+        # Flat arrays indexed by (hour * ZONES + pickup) * ZONES + dropoff
+        self.arrays = arrays or {'trips': np.zeros(self.CELLS, dtype=np.int64)}
+    
+    @classmethod
+    def keys(cls, trips_df):
+        """Cell index per trip, and a mask of trips with usable IDs"""
+        pickup = trips_df['PULocationID'].to_numpy(dtype=np.int64)
+        dropoff = trips_df['DOLocationID'].to_numpy(dtype=np.int64)
+        hour = trips_df['pickup_hour'].to_numpy(dtype=np.int64)
+        valid = (pickup > 0) & (pickup < cls.ZONES) & (dropoff > 0) & (dropoff < cls.ZONES) \
+            & (hour >= 0) & (hour < cls.HOURS)
+        return ((hour * cls.ZONES + pickup) * cls.ZONES + dropoff)[valid], valid
+    
+    def add(self, trips_df):
+        """Count and sum one frame of final trips into the cells, one bincount per measure"""
+        keys, valid = self.keys(trips_df)
+        self.arrays['trips'] += np.bincount(keys, minlength=self.CELLS).astype(np.int64)
+        for name, column in self.MEASURES.items():
+            if column in trips_df:
+                weights = trips_df[column].to_numpy(dtype='float64')[valid]
+                # bincount returns int64 when there are no weights at all (an empty month)
+                totals = np.bincount(keys, weights=weights, minlength=self.CELLS).astype(np.float64)
+                if name in self.arrays:
+                    self.arrays[name] += totals
+                else:
+                    self.arrays[name] = totals
+    
+    def cells(self):
+        """Non-empty cells only: a compact form to pass between processes or store per month"""
+        index = np.flatnonzero(self.arrays['trips']).astype(np.int32)
+        return dict({name: values[index] for name, values in self.arrays.items()}, cells=index)
+    
+    def merge(self, cells):
+        """Fold in cells from another matrix (e.g. a worker's file or an earlier month)"""
+        index = cells['cells']
+        for name, values in cells.items():
+            if name == 'cells':
+                continue
+            if name not in self.arrays:
+                # Sums are float64 whatever an older month file stored
+                self.arrays[name] = np.zeros(self.CELLS, dtype=np.int64 if name == 'trips' else np.float64)
+            # Cell indices are unique, so plain fancy-indexed adds are safe
+            self.arrays[name][index] += values
+    
+    @property
+    def trips(self):
+        return int(self.arrays['trips'].sum())
+    
+    def save(self, source, directory=None):
+        """Store this run's cells under its source month and rebuild the combined arrays"""
+        self.save_month(source, directory)
+        self.rebuild(directory)
+    
+    def save_month(self, source, directory=None):
+        """Store the non-empty cells for one source file; re-running a month replaces them"""
+        months_dir = os.path.join(directory or Config.OD_MATRIX_DIR, 'months')
+        os.makedirs(months_dir, exist_ok=True)
+        self.write_atomic(os.path.join(months_dir, f"{Config.source_key(source)}.npz"), np.savez, **self.cells())
+    
+    @classmethod
+    def rebuild(cls, directory=None):
+        """Sum every stored month into the dense arrays that open() maps"""
+        directory = directory or Config.OD_MATRIX_DIR
+        combined = cls()
+        months = sorted(glob.glob(os.path.join(directory, 'months', '*.npz')))
+        for path in months:
+            with np.load(path) as cells:
+                combined.merge(dict(cells))
+        
+        shape = (cls.HOURS, cls.ZONES, cls.ZONES)
+        for name, values in combined.arrays.items():
+            # Counts fit uint32 per cell; sums stay float64 so merges don't drift
+            values = values.astype(np.uint32) if name == 'trips' else values
+            cls.write_atomic(os.path.join(directory, f"{name}.npy"), np.save, values.reshape(shape))
+        
+        print(f"✓ OD matrix saved to: {directory} ({len(months)} months, "
+              f"{np.count_nonzero(combined.arrays['trips']):,} hour/zone-pair cells, {combined.trips:,} trips)")
+    
+    @staticmethod
+    def write_atomic(path, write, *args, **kwargs):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            write(f, *args, **kwargs)
+        os.replace(tmp, path)
+    
+    @classmethod
+    def open(cls, directory=None):
+        """The combined matrix, memory-mapped: slices read only the pages they touch"""
+        directory = directory or Config.OD_MATRIX_DIR
+        arrays = {}
+        for name in ['trips'] + list(cls.MEASURES):
+            path = os.path.join(directory, f"{name}.npy")
+            if os.path.exists(path):
+                arrays[name] = np.load(path, mmap_mode='r').reshape(-1)
+        return cls(arrays)
+    
+    def grid(self, name):
+        return self.arrays[name].reshape(self.HOURS, self.ZONES, self.ZONES)
+    
+    def top_flows(self, zone, n=10, hour=None, by='trips', inbound=False):
+        """Largest flows out of (or into) a zone, for one hour or the whole day"""
+        hours = slice(None) if hour is None else slice(hour, hour + 1)
+        
+        def flows(name):
+            # One row (or column) of the hour planes: a few KB even when memory-mapped
+            grid = self.grid(name)[hours]
+            return np.asarray(grid[:, :, zone] if inbound else grid[:, zone, :]).sum(axis=0)
+        
+        sums = {name: flows(name) for name in self.arrays}
+        trips = sums['trips'].astype(np.int64)
+        zones = np.flatnonzero(trips)
+        
+        flows_df = pd.DataFrame({'PULocationID' if inbound else 'DOLocationID': zones,
+                                 'trips': trips[zones]})
+        if 'revenue' in sums:
+            flows_df['revenue'] = sums['revenue'][zones].round(2)
+        if 'duration_sum' in sums:
+            flows_df['mean_duration_minutes'] = (sums['duration_sum'][zones] / trips[zones]).round(2)
+        if 'speed_sum' in sums:
+            flows_df['mean_speed_mph'] = (sums['speed_sum'][zones] / trips[zones]).round(2)
+        return flows_df.nlargest(n, by).reset_index(drop=True)
+
+
+# =====================================================================
+# DATABASE LOAD
+# =====================================================================
+
+class DatabaseLoader:
+    """Bulk load cleaned trips and lookups into the server's SQLite database"""
+    
+    # Same tables as server/src/db/db.js
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS locations (
+            location_id INTEGER PRIMARY KEY,
+            borough TEXT,
+            zone TEXT,
+            service_zone TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS vendors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            email TEXT UNIQUE,
+            phone_number TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS trips (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vendor_id INTEGER,
+            pickup_datetime TEXT,
+            dropoff_datetime TEXT,
+            passenger_count INTEGER,
+            trip_distance REAL,
+            mta_tax REAL,
+            pickup_location_id INTEGER,
+            dropoff_location_id INTEGER,
+            tip_amount REAL,
+            fare_amount REAL,
+            total_amount REAL,
+            FOREIGN KEY (vendor_id) REFERENCES vendors(id),
+            FOREIGN KEY (pickup_location_id) REFERENCES locations(location_id),
+            FOREIGN KEY (dropoff_location_id) REFERENCES locations(location_id)
+        )
+        """,
+        # The pipeline's own: the trip ids each source file was loaded as
+        """
+        CREATE TABLE IF NOT EXISTS trip_loads (
+            source TEXT PRIMARY KEY,
+            first_id INTEGER,
+            last_id INTEGER,
+            loaded_at TEXT
+        )
+        """,
+    ]
+    
+    # trips column -> pipeline column, in insert order
+    TRIP_COLUMNS = {
+        'vendor_id': 'VendorID',
+        'pickup_datetime': 'tpep_pickup_datetime',
+        'dropoff_datetime': 'tpep_dropoff_datetime',
+        'passenger_count': 'passenger_count',
+        'trip_distance': 'trip_distance',
+        'mta_tax': 'mta_tax',
+        'pickup_location_id': 'PULocationID',
+        'dropoff_location_id': 'DOLocationID',
+        'tip_amount': 'tip_amount',
+        'fare_amount': 'fare_amount',
+        'total_amount': 'total_amount',
+    }
+    
+    # Built after the load rather than maintained row by row
+    TRIP_INDEXES = {
+        'idx_trips_pickup_datetime': ['pickup_datetime'],
+        'idx_trips_pickup_location_id': ['pickup_location_id'],
+        'idx_trips_dropoff_location_id': ['dropoff_location_id'],
+        'idx_trips_vendor_id': ['vendor_id'],
+    }
+    
+    def __init__(self, db_path=None, batch_size=None):
+        self.db_path = db_path or Config.DATABASE
+        self.batch_size = batch_size or Config.DB_BATCH_SIZE
+    
+    def connect(self):
+        """Connection tuned for one bulk writer"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -262144")  # 256 MB
+        conn.execute("PRAGMA foreign_keys = OFF")
+        return conn
+    
+    def load(self, sources, zones_df, replace=None):
+        """Insert lookups, then the trip frames of each source file
+        (path -> frames), replacing its earlier load; returns rows inserted"""
+        replace = Config.DB_REPLACE_TRIPS if replace is None else replace
+        start = time.perf_counter()
+        conn = self.connect()
+        
+        try:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
             
-            # Load raw data
-            trips_df = loader.load_trip_data()
-            zones_df = loader.load_zone_lookup()
+            conn.execute("BEGIN")
+            self.load_lookups(conn, zones_df)
+            for name in self.TRIP_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            if replace:
+                conn.execute("DELETE FROM trips")
+                conn.execute("DELETE FROM trip_loads")
+                conn.execute("DELETE FROM sqlite_sequence WHERE name = 'trips'")
+            conn.execute("COMMIT")
             
-            # Integrate data sources
-            trips_df = loader.integrate_data(trips_df, zones_df)
+            rows = 0
+            for source, trip_frames in sources.items():
+                # One transaction per file keeps its ids contiguous, and a
+                # crash never leaves half a month behind
+                key = Config.source_key(source)
+                conn.execute("BEGIN")
+                previous = conn.execute("SELECT first_id, last_id FROM trip_loads WHERE source = ?",
+                                        (key,)).fetchone()
+                if previous:
+                    conn.execute("DELETE FROM trips WHERE id BETWEEN ? AND ?", previous)
+                first_id = self.next_id(conn)
+                for trips_df in trip_frames:
+                    for offset in range(0, len(trips_df), self.batch_size):
+                        batch = trips_df.iloc[offset:offset + self.batch_size]
+                        conn.executemany(self.insert_sql(), self.trip_rows(batch))
+                        rows += len(batch)
+                conn.execute("INSERT OR REPLACE INTO trip_loads (source, first_id, last_id, loaded_at) "
+                             "VALUES (?, ?, ?, ?)",
+                             (key, first_id, self.next_id(conn) - 1, datetime.now().isoformat(timespec='seconds')))
+                conn.execute("COMMIT")
+            insert_time = time.perf_counter() - start
             
-            # ====== DATA INTEGRITY ======
-            trips_df = self.cleaner.handle_missing_values(trips_df)
-            trips_df = self.cleaner.remove_duplicates(trips_df)
-            trips_df = self.cleaner.detect_outliers(trips_df)
+            conn.execute("BEGIN")
+            for name, columns in self.TRIP_INDEXES.items():
+                conn.execute(f"CREATE INDEX {name} ON trips ({', '.join(columns)})")
+            conn.execute("COMMIT")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+        
+        elapsed = time.perf_counter() - start
+        print(f"✓ Loaded {rows:,} trips into {self.db_path}")
+        print(f"  Insert: {insert_time:.1f}s ({rows / max(insert_time, 1e-9):,.0f} rows/sec), "
+              f"total with indexes: {elapsed:.1f}s")
+        
+        return rows
+    
+    def load_rollups(self, rollups):
+        """Replace the rollup_<name> summary tables"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for name, table in rollups.items():
+                table.to_sql(f"rollup_{name}", conn, if_exists='replace', index=False)
+            conn.commit()
+        finally:
+            conn.close()
+        print(f"✓ Loaded {len(rollups)} rollup tables into {self.db_path}")
+    
+    def load_lookups(self, conn, zones_df):
+        """Add missing locations, vendors and payments; rows the server
+        already has (seeded names, vendor contact details) are left alone"""
+        locations = zones_df[['LocationID', 'Borough', 'Zone', 'service_zone']].astype(object)
+        conn.executemany(
+            "INSERT OR IGNORE INTO locations (location_id, borough, zone, service_zone) VALUES (?, ?, ?, ?)",
+            locations.where(locations.notna(), None).itertuples(index=False, name=None)
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO vendors (id, name) VALUES (?, ?)",
+            Config.VENDOR_NAMES.items()
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO payments (id, name) VALUES (?, ?)",
+            Config.PAYMENT_TYPES.items()
+        )
+    
+    @staticmethod
+    def next_id(conn):
+        """Id the next inserted trip gets; AUTOINCREMENT never reuses one"""
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'trips'").fetchone()
+        return seq[0] + 1 if seq else 1
+    
+    def insert_sql(self):
+        columns = list(self.TRIP_COLUMNS)
+        return (f"INSERT INTO trips ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})")
+    
+    @staticmethod
+    def trip_rows(trips_df):
+        """Row tuples of native Python values, built column-wise"""
+        columns = []
+        for source in DatabaseLoader.TRIP_COLUMNS.values():
+            values = trips_df[source]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                # Same text format as the server's seed data
+                values = pa.array(values).cast(pa.timestamp('s'), safe=False)
+                values = pc.strftime(values, format='%Y-%m-%d %H:%M:%S')
+                columns.append(values.to_pylist())
+            else:
+                columns.append(values.astype(object).where(values.notna(), None).tolist())
+        return zip(*columns)
+    
+    @staticmethod
+    def iter_parquet(paths, batch_size=None):
+        """Trip frames from Parquet outputs, reading only the loaded columns"""
+        columns = list(DatabaseLoader.TRIP_COLUMNS.values())
+        for path in paths:
+            for batch in TripStore.dataset(path).to_batches(columns=columns,
+                                                            batch_size=batch_size or Config.DB_BATCH_SIZE):
+                yield batch.to_pandas()
+
+# =====================================================================
+# INSTRUMENTATION
+# =====================================================================
+
+class StageProfiler:
+    """Wall/CPU time, memory and row counts per stage, summed over chunks and files"""
+    
+    def __init__(self):
+        # Stage name -> totals, in the order stages first ran
+        self.records = {}
+        self.stack = []
+        self.start = time.perf_counter()
+    
+    @staticmethod
+    def peak_rss_mb():
+        """Peak resident set size of this process so far (None without resource)"""
+        if not HAS_RESOURCE:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+    
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """Time the block; set result['rows_out'] when the stage changes the row count"""
+        record = self.records.setdefault(name, {
+            'stage': name,
+            'parent': self.stack[-1]['name'] if self.stack else None,
+            'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rows_in': 0, 'rows_out': 0,
+            'peak_rss_mb': None, 'rss_growth_mb': 0.0, 'tracemalloc_peak_mb': None,
+        })
+        frame = {'name': name, 'child_peak': 0}
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            frame['traced_start'] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        rss_start = self.peak_rss_mb()
+        result = {'rows_out': None}
+        
+        self.stack.append(frame)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield result
+        finally:
+            record['wall_s'] += time.perf_counter() - wall
+            record['cpu_s'] += time.process_time() - cpu
+            self.stack.pop()
             
-            # ====== NORMALIZATION ======
-            normalizer = DataNormalizer()
-            trips_df = normalizer.normalize_timestamps(trips_df)
-            trips_df = normalizer.normalize_numeric_fields(trips_df)
-            trips_df, categorical_mappings = normalizer.normalize_categorical_fields(trips_df)
+            record['calls'] += 1
+            record['rows_in'] += rows_in or 0
+            record['rows_out'] += (rows_in or 0) if result['rows_out'] is None else result['rows_out']
             
-            # ====== FEATURE ENGINEERING ======
-            engineer = FeatureEngineer()
-            trips_df = engineer.create_derived_features(trips_df)
+            peak = self.peak_rss_mb()
+            if peak is not None:
+                record['peak_rss_mb'] = max(record['peak_rss_mb'] or 0, peak)
+                record['rss_growth_mb'] += peak - rss_start
+            if tracing:
+                # Nested stages reset the peak, so fold theirs back in
+                traced_peak = max(tracemalloc.get_traced_memory()[1], frame['child_peak'])
+                record['tracemalloc_peak_mb'] = max(record['tracemalloc_peak_mb'] or 0,
+                                                    (traced_peak - frame['traced_start']) / 1e6)
+                if self.stack:
+                    self.stack[-1]['child_peak'] = max(self.stack[-1]['child_peak'], traced_peak)
+    
+    def run(self, name, func, df):
+        """Call func(df) as a stage; frame in, frame (or frame, extra) out"""
+        with self.stage(name, len(df)) as result:
+            output = func(df)
+            result['rows_out'] = len(output[0] if isinstance(output, tuple) else output)
+        return output
+    
+    def iterate(self, name, batches):
+        """Yield from an iterator, timing each fetch as a stage"""
+        batches = iter(batches)
+        while True:
+            with self.stage(name) as result:
+                batch = next(batches, None)
+                result['rows_out'] = 0 if batch is None else len(batch)
+            if batch is None:
+                return
+            yield batch
+    
+    def add(self, name, wall_s, cpu_s=0.0, rows=0):
+        """Record work done off the main thread as a stage (one call)"""
+        record = self.records.setdefault(name, {
+            'stage': name, 'parent': None,
+            'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rows_in': 0, 'rows_out': 0,
+            'peak_rss_mb': None, 'rss_growth_mb': 0.0, 'tracemalloc_peak_mb': None,
+        })
+        record['calls'] += 1
+        record['wall_s'] += wall_s
+        record['cpu_s'] += cpu_s
+        record['rows_in'] += rows
+        record['rows_out'] += rows
+    
+    def merge(self, records):
+        """Fold in another profiler's records (e.g. a worker's file)"""
+        for name, other in records.items():
+            record = self.records.setdefault(name, dict(other, calls=0, wall_s=0.0, cpu_s=0.0,
+                                                        rows_in=0, rows_out=0, rss_growth_mb=0.0))
+            for key in ['calls', 'wall_s', 'cpu_s', 'rows_in', 'rows_out', 'rss_growth_mb']:
+                record[key] += other[key]
+            for key in ['peak_rss_mb', 'tracemalloc_peak_mb']:
+                if other[key] is not None:
+                    record[key] = max(record[key] or 0, other[key])
+    
+    def summary(self):
+        stages = []
+        for record in self.records.values():
+            rows = record['rows_in'] or record['rows_out']
+            stages.append(dict(record, rows_per_sec=rows / record['wall_s'] if record['wall_s'] else None))
+        return {
+            'generated': datetime.now().isoformat(timespec='seconds'),
+            'wall_s': time.perf_counter() - self.start,
+            'cpu_s': time.process_time(),
+            'peak_rss_mb': self.peak_rss_mb(),
+            'stages': stages,
+        }
+    
+    def save(self, path=None, **context):
+        """Write the run profile as JSON and print the top-level stage timings"""
+        path = path or Config.PROFILE_FILE
+        profile = dict(context, **self.summary())
+        with open(path, 'w') as f:
+            json.dump(profile, f, indent=2)
+        
+        print(f"\nStage timings (wall / CPU seconds, rows/sec):")
+        for stage in profile['stages']:
+            indent = "    " if stage['parent'] else "  "
+            rate = f"{stage['rows_per_sec']:,.0f}" if stage['rows_per_sec'] else "-"
+            print(f"{indent}{stage['stage']}: {stage['wall_s']:.2f} / {stage['cpu_s']:.2f}, {rate}")
+        print(f"✓ Run profile saved to: {path}")
+
+
+# =====================================================================
+# PIPELINE EXECUTION
+# =====================================================================
+
+class PipelinedIO:
+    """Overlap reading, transforming and writing batches: a reader thread
+    decodes the next batch and a writer thread flushes the previous one
+    while the caller transforms the current one. Bounded queues give
+    backpressure; batches keep their order on both sides"""
+    
+    def __init__(self, background=None, queue_size=None):
+        self.background = Config.PIPELINED_IO if background is None else background
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        # Seconds each thread spent working, and the caller spent waiting on them
+        self.busy = {'read': 0.0, 'write': 0.0}
+        self.cpu = {'read': 0.0, 'write': 0.0}
+        self.waited = 0.0
+        self.rows = 0
+        self.error = None
+        self.stopped = threading.Event()
+        self.reader = None
+        self.reads = None
+        self.writer = None
+        self.writes = None
+        self.start = time.perf_counter()
+    
+    def timed(self, side, func, *args):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            return func(*args)
+        finally:
+            self.busy[side] += time.perf_counter() - wall
+            self.cpu[side] += time.thread_time() - cpu
+    
+    def read(self, batches):
+        """Yield the batches, fetched up to queue_size ahead on the reader thread"""
+        batches = iter(batches)
+        done = object()
+        if not self.background:
+            while (batch := self.timed('read', next, batches, done)) is not done:
+                self.rows += len(batch)
+                yield batch
+            return
+        
+        self.reads = queue.Queue(maxsize=self.queue_size)
+        self.reader = threading.Thread(target=self.produce, args=(batches, done),
+                                       name='batch-reader', daemon=True)
+        self.reader.start()
+        while True:
+            start = time.perf_counter()
+            batch = self.reads.get()
+            self.waited += time.perf_counter() - start
+            if batch is done:
+                break
+            self.rows += len(batch)
+            yield batch
+        self.reader.join()
+        self.reader = None
+        if self.error is not None:
+            raise self.error
+    
+    def produce(self, batches, done):
+        """Reader thread: fetch batches until they run out or close() stops it"""
+        try:
+            while not self.stopped.is_set():
+                batch = self.timed('read', next, batches, done)
+                if batch is done:
+                    break
+                self.reads.put(batch)
+        except Exception as e:
+            self.error = e
+        finally:
+            if hasattr(batches, 'close'):
+                batches.close()
+            self.reads.put(done)
+    
+    def write(self, func, *args):
+        """Call func(*args) on the writer thread, after every earlier write"""
+        if not self.background:
+            self.timed('write', func, *args)
+            return
+        if self.writer is None:
+            self.writes = queue.Queue(maxsize=self.queue_size)
+            self.writer = threading.Thread(target=self.drain, name='batch-writer', daemon=True)
+            self.writer.start()
+        start = time.perf_counter()
+        self.writes.put((func, args))
+        self.waited += time.perf_counter() - start
+    
+    def drain(self):
+        """Writer thread: keep calling until the None sentinel"""
+        while True:
+            item = self.writes.get()
+            if item is None:
+                return
+            if self.error is None:
+                try:
+                    self.timed('write', item[0], *item[1])
+                except Exception as e:
+                    # Raised from close(); keep draining so the caller never blocks
+                    self.error = e
+    
+    def close(self):
+        """Stop the reader, wait for pending writes and raise a thread's error"""
+        if self.reader is not None:
+            self.stopped.set()
+            # Unblock a reader waiting on a full queue
+            while self.reader.is_alive():
+                with contextlib.suppress(queue.Empty):
+                    self.reads.get(timeout=0.1)
+            self.reader = None
+        if self.writer is not None:
+            start = time.perf_counter()
+            self.writes.put(None)
+            self.writer.join()
+            self.waited += time.perf_counter() - start
+            self.writer = None
+        if self.error is not None:
+            raise self.error
+    
+    def summary(self):
+        """Busy seconds per step over the wall time; overlap is their sum / wall
+        (1.0 when run in turn, up to 3.0 with all three steps always busy)"""
+        wall = time.perf_counter() - self.start
+        transform = wall - self.waited
+        if not self.background:
+            transform -= self.busy['read'] + self.busy['write']
+        return {
+            'pipelined': self.background,
+            'wall_s': wall,
+            'read_s': self.busy['read'],
+            'transform_s': transform,
+            'write_s': self.busy['write'],
+            'wait_s': self.waited,
+            'overlap': (self.busy['read'] + transform + self.busy['write']) / wall if wall else None,
+            'rows': self.rows,
+            'rows_per_sec': self.rows / wall if wall else None,
+        }
+
+
+class DataPipeline:
+    """Main pipeline orchestrator"""
+    
+    BACKENDS = ('pandas', 'duckdb')
+    
+    def __init__(self, streaming=None):
+        self.start_time = datetime.now()
+        self.cleaner = DataCleaner()
+        self.rollups = RollupBuilder()
+        self.od_matrix = ODMatrix() if Config.OD_MATRIX else None
+        # This month's binned metrics, the history later months are judged against
+        self.robust_stats = RobustStats() if Config.STAT_OUTLIERS else None
+        self.export = None
+        self.profiler = StageProfiler()
+        # PipelinedIO.summary() of a batch-by-batch run
+        self.io = None
+        self.streaming = Config.STREAMING if streaming is None else streaming
+        
+        self.categorical_mappings = {}
+        
+        # Summary inputs, filled in by run_batch / run_streaming: sketches
+        # of every final column (borough counts come from these)
+        self.profile = DataProfile()
+        self.total_rows = 0
+        self.columns = []
+        
+        # Ensure output directory exists
+        os.makedirs(Config.CLEAN_DATA_DIR, exist_ok=True)
+    
+    def run(self):
+        
+        if Config.PROFILE_TRACEMALLOC:
+            tracemalloc.start()
+        profiler = self.profiler
+        
+        try:
+            result = self.execute()
             
-            # ====== SAVE RESULTS ======
-            self.save_results(trips_df, zones_df)
+            if Config.DUPLICATE_KEYS_DIR and self.cleaner.duplicate_keys is not None:
+                self.cleaner.duplicate_keys.save(Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET)
+            
+            # ====== ROLLUPS ======
+            with profiler.stage('save_rollups'):
+                self.save_rollups(self.rollups)
+            if self.od_matrix is not None:
+                with profiler.stage('save_od_matrix'):
+                    self.od_matrix.save(Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET)
+            if self.robust_stats is not None:
+                with profiler.stage('save_outlier_stats'):
+                    self.robust_stats.save(Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET)
             
             # ====== GENERATE REPORT ======
-            self.cleaner.save_report()
-            self.print_summary(trips_df)
+            with profiler.stage('save_report'):
+                self.cleaner.save_report(self.profile)
+            self.print_summary_counts(self.profile, self.total_rows, self.columns)
             
-            return trips_df
+            # ====== EXPORTS (written in the background until now) ======
+            with profiler.stage('finish_export'):
+                self.finish_export()
+            
+            profiler.save(mode=self.mode, source=Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET, io=self.io)
+            
+            return result
             
         except Exception as e:
             print(f"   {str(e)}")
             import traceback
             traceback.print_exc()
             return None
+        finally:
+            if Config.PROFILE_TRACEMALLOC:
+                tracemalloc.stop()
+    
+    @property
+    def mode(self):
+        if Config.BACKEND == 'duckdb':
+            return 'duckdb'
+        return 'streaming' if self.streaming else 'batch'
+    
+    def execute(self):
+        """Run the per-file stages with the configured backend and mode"""
+        if Config.BACKEND not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {Config.BACKEND}")
+        if Config.BACKEND == 'duckdb':
+            return self.run_duckdb()
+        if self.streaming:
+            return self.run_streaming()
+        return self.run_batch()
+    
+    def run_batch(self):
+        """Process the whole trip file in memory"""
+        
+        profiler = self.profiler
+        
+        # ====== DATA INTEGRATION ======
+        loader = DataLoader()
+        zones_df = loader.load_zone_lookup()
+        
+        # ====== INTEGRATION, INTEGRITY, NORMALIZATION, FEATURES ======
+        # Persisted duplicate keys change between runs, so cached stages can't be reused
+        if Config.STAGE_CACHE and not Config.DUPLICATE_KEYS_DIR:
+            trips_df, categorical_mappings = self.transform_cached(zones_df)
+        else:
+            trips_df = self.load_trip_data()
+            trips_df, categorical_mappings = self.transform(trips_df, zones_df)
+        
+        # ====== SAVE RESULTS ======
+        with profiler.stage('build_rollups', len(trips_df)):
+            self.rollups.add(trips_df)
+        if self.od_matrix is not None:
+            with profiler.stage('build_od_matrix', len(trips_df)):
+                self.od_matrix.add(trips_df)
+        if self.robust_stats is not None:
+            with profiler.stage('build_outlier_stats', len(trips_df)):
+                self.robust_stats.add(trips_df)
+        with profiler.stage('save_results', len(trips_df)):
+            self.save_results(trips_df, zones_df)
+        
+        # ====== DATABASE LOAD ======
+        if Config.LOAD_DATABASE:
+            with profiler.stage('load_database', len(trips_df)):
+                DatabaseLoader().load({Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET: [trips_df]}, zones_df)
+        
+        with profiler.stage('profile_output', len(trips_df)):
+            self.profile.add(trips_df)
+        self.total_rows = len(trips_df)
+        self.columns = list(trips_df.columns)
+        
+        return trips_df
+    
+    def stages(self, zones_df, index_offset=0):
+        """Ordered per-frame stages: (name, function, settings it depends on)"""
+        cleaner = self.cleaner
+        
+        def integrate(trips_df):
+            trips_df = DataLoader.integrate_data(trips_df, zones_df)
+            if index_offset:
+                # Keep row labels global so chunked output matches batch mode
+                trips_df.index = pd.RangeIndex(index_offset, index_offset + len(trips_df))
+            return trips_df
+        
+        outlier_rules = [(key, column, cleaner.threshold(low), cleaner.threshold(high))
+                         for key, _, column, low, high in Config.OUTLIER_RULES]
+        zone_source = (StageCache.fingerprint(Config.ZONE_LOOKUP_CSV)
+                       if os.path.exists(Config.ZONE_LOOKUP_CSV) else None)
+        
+        stages = [
+            # ====== DATA INTEGRATION ======
+            ('integrate_data', integrate, [zone_source]),
+            # ====== DATA INTEGRITY ======
+            ('handle_missing_values', cleaner.handle_missing_values,
+             [cleaner.CRITICAL_FIELDS, cleaner.PAYMENT_FIELDS]),
+            ('remove_duplicates', cleaner.remove_duplicates,
+             [cleaner.DUPLICATE_COLS, Config.DUPLICATE_MODE, Config.BLOOM_CAPACITY, Config.BLOOM_ERROR_RATE]),
+            ('detect_outliers', cleaner.detect_outliers, [outlier_rules]),
+            # ====== NORMALIZATION ======
+            ('normalize', self.normalize, [Config.TRIP_DTYPES]),
+            # ====== FEATURE ENGINEERING ======
+            ('create_derived_features', FeatureEngineer.create_derived_features,
+             [Config.DERIVED_FEATURES or FeatureEngineer.registry.defaults(), ZoneGeometry.source()]),
+        ]
+        if Config.STAT_OUTLIERS:
+            # ====== STATISTICAL OUTLIERS (needs pickup_hour) ======
+            stages.append(('detect_statistical_outliers', cleaner.detect_statistical_outliers,
+                           [Config.STAT_OUTLIERS, Config.STAT_OUTLIER_BANDS, Config.STAT_OUTLIER_MIN_TRIPS,
+                            RobustStats.history(Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET)
+                            if cleaner.stat_history is None else cleaner.stat_history]))
+        
+        return stages
+    
+    def normalize(self, trips_df):
+        """Run all DataNormalizer steps, keeping the categorical mappings"""
+        normalizer = DataNormalizer()
+        profiler = self.profiler
+        trips_df = profiler.run('normalize_timestamps', normalizer.normalize_timestamps, trips_df)
+        trips_df = profiler.run('normalize_numeric_fields', normalizer.normalize_numeric_fields, trips_df)
+        trips_df, self.categorical_mappings = profiler.run(
+            'normalize_categorical_fields', normalizer.normalize_categorical_fields, trips_df)
+        
+        return trips_df
+    
+    def load_trip_data(self):
+        with self.profiler.stage('load_trip_data') as result:
+            trips_df = DataLoader.load_trip_data()
+            result['rows_out'] = len(trips_df)
+        return trips_df
+    
+    def transform(self, trips_df, zones_df, index_offset=0):
+        """Run merge -> clean -> normalize -> feature steps on one frame"""
+        for name, stage, _ in self.stages(zones_df, index_offset):
+            trips_df = self.profiler.run(name, stage, trips_df)
+        
+        return trips_df, self.categorical_mappings
+    
+    def transform_cached(self, zones_df):
+        """Like transform, but resume from the latest cached stage output"""
+        cache = StageCache()
+        stages = self.stages(zones_df)
+        
+        # Chain the keys: each stage's key covers everything upstream of it
+        key = StageCache.make_key(StageCache.code_version(), DataLoader.source_fingerprint())
+        keys = []
+        for name, _, settings in stages:
+            key = StageCache.make_key(key, name, settings)
+            keys.append(key)
+        
+        resume_at = 0
+        for i in reversed(range(len(stages))):
+            if cache.contains(stages[i][0], keys[i]):
+                resume_at = i + 1
+                break
+        
+        cached = None
+        if resume_at:
+            name = stages[resume_at - 1][0]
+            with self.profiler.stage('load_cached_stage') as result:
+                cached = cache.load(name, keys[resume_at - 1])
+                result['rows_out'] = len(cached[0]) if cached else 0
+        if cached:
+            trips_df, state = cached
+            self.restore_state(state)
+            print(f"  Reusing cached output up to {name} ({len(trips_df):,} rows)")
+        else:
+            resume_at = 0
+            trips_df = self.load_trip_data()
+        
+        for (name, stage, _), key in list(zip(stages, keys))[resume_at:]:
+            trips_df = self.profiler.run(name, stage, trips_df)
+            with self.profiler.stage('store_cached_stage', len(trips_df)):
+                cache.store(name, key, trips_df, self.state())
+        cache.evict()
+        
+        return trips_df, self.categorical_mappings
+    
+    def state(self):
+        """Report counters etc. to store alongside a cached stage output"""
+        return {
+            'stats': {key: int(value) for key, value in self.cleaner.stats.items()},
+            'passenger_median': None if pd.isna(self.cleaner.passenger_median) else float(self.cleaner.passenger_median),
+            'profile': self.cleaner.profile.state(),
+            'categorical_mappings': self.categorical_mappings,
+        }
+    
+    def restore_state(self, state):
+        """Put back the counters a cached stage output was produced with"""
+        self.cleaner.stats = Counter(state['stats'])
+        self.cleaner.passenger_median = state['passenger_median']
+        self.cleaner.profile = DataProfile.from_state(state['profile'])
+        self.categorical_mappings = {col: {int(code): label for code, label in mapping.items()}
+                                     for col, mapping in state['categorical_mappings'].items()}
+    
+    def run_streaming(self):
+        """Process the trip data chunk by chunk, appending to the outputs"""
+        profiler = self.profiler
+        loader = DataLoader()
+        zones_df = loader.load_zone_lookup()
+        lookup = ZoneLookup(zones_df)
+        
+        # Cheap pre-pass over the columns that cross-chunk state depends on
+        with profiler.stage('prepare_streaming'):
+            self.cleaner.prepare_streaming(loader.iter_trip_batches(
+                columns=DataCleaner.CRITICAL_FIELDS + ['passenger_count']
+            ))
+        
+        offset = 0
+        
+        def transform(batch):
+            nonlocal offset
+            trips_df, _ = self.transform(batch, lookup, index_offset=offset)
+            offset += len(batch)
+            return trips_df
+        
+        return self.write_batches('read_trip_batch', loader.iter_trip_batches(), transform, zones_df)
+    
+    def run_duckdb(self):
+        """Integrity stages in DuckDB, then stream the kept trips through the rest"""
+        profiler = self.profiler
+        zones_df = DataLoader.load_zone_lookup()
+        lookup = ZoneLookup(zones_df)
+        
+        with profiler.stage('convert_csv_to_parquet'):
+            DataLoader.convert_csv_to_parquet()
+        backend = DuckDBBackend(self.cleaner)
+        try:
+            with profiler.stage('duckdb_clean') as result:
+                result['rows_out'] = backend.clean()
+            
+            # The backend already cleaned; attach zones and run the remaining stages
+            def transform(batch):
+                batch = self.profiler.run('integrate_data', lambda df: backend.integrate(df, lookup), batch)
+                for name, stage, _ in self.stages(lookup):
+                    if name not in DuckDBBackend.STAGES:
+                        batch = self.profiler.run(name, stage, batch)
+                return batch
+            
+            return self.write_batches('read_clean_batch', backend.batches(), transform, zones_df)
+        finally:
+            backend.close()
+    
+    def write_batches(self, name, batches, transform, zones_df):
+        """Transform each batch and append it to the outputs and rollups,
+        reading ahead and writing behind on PipelinedIO's threads"""
+        profiler = self.profiler
+        store = TripStore(preserve_index=True)
+        self.export = TripExport()
+        pipeline = PipelinedIO()
+        total_rows = 0
+        columns = []
+        
+        try:
+            # The stage times the wait for each batch (its decode when run in turn)
+            for i, batch in enumerate(profiler.iterate(name, pipeline.read(batches))):
+                batch_rows = len(batch)
+                
+                # Per-stage chatter would repeat for every chunk
+                with contextlib.redirect_stdout(io.StringIO()):
+                    trips_df = transform(batch)
+                
+                if trips_df.empty:
+                    continue
+                
+                with profiler.stage('write_outputs', len(trips_df)):
+                    pipeline.write(store.write, trips_df)
+                    self.export.write(trips_df)
+                with profiler.stage('build_rollups', len(trips_df)):
+                    self.rollups.add(trips_df)
+                if self.od_matrix is not None:
+                    with profiler.stage('build_od_matrix', len(trips_df)):
+                        self.od_matrix.add(trips_df)
+                if self.robust_stats is not None:
+                    with profiler.stage('build_outlier_stats', len(trips_df)):
+                        self.robust_stats.add(trips_df)
+                with profiler.stage('profile_output', len(trips_df)):
+                    self.profile.add(trips_df)
+                total_rows += len(trips_df)
+                columns = trips_df.columns
+                print(f"  Chunk {i + 1}: {batch_rows:,} rows in, {len(trips_df):,} rows out")
+        finally:
+            pipeline.close()
+            store.close()
+        
+        self.io = pipeline.summary()
+        if pipeline.background:
+            profiler.add('reader_thread', pipeline.busy['read'], pipeline.cpu['read'], pipeline.rows)
+            profiler.add('writer_thread', pipeline.busy['write'], pipeline.cpu['write'], total_rows)
+        self.print_io(self.io)
+        
+        zones_df.to_csv(Config.ZONE_DATA, index=False)
+        
+        if Config.LOAD_DATABASE and total_rows:
+            with profiler.stage('load_database', total_rows):
+                DatabaseLoader().load({Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET:
+                                       DatabaseLoader.iter_parquet([Config.INTEGRATED_DATA])}, zones_df)
+        
+        self.total_rows = total_rows
+        self.columns = list(columns)
+        
+        return Config.INTEGRATED_DATA
+    
+    @staticmethod
+    def print_io(io):
+        """Busy time of reading, transforming and writing against the wall time"""
+        print(f"✓ {'Pipelined' if io['pipelined'] else 'Sequential'} I/O: read {io['read_s']:.1f}s, "
+              f"transform {io['transform_s']:.1f}s, write {io['write_s']:.1f}s in {io['wall_s']:.1f}s "
+              f"(overlap {io['overlap']:.2f}x, {io['rows_per_sec']:,.0f} rows/sec)")
     
     def save_results(self, trips_df, zones_df):
         """Save cleaned and integrated data"""
@@ -576,29 +3668,484 @@ class DataPipeline:
         
         # Save integrated trip data as Parquet (efficient format)
         print(f"\n1. Saving integrated trip data...")
-        trips_df.to_parquet(Config.INTEGRATED_DATA, engine='pyarrow', compression='snappy')        
-        trips_df.to_csv(Config.CLEAN_TRIP_DATA, index=False)
+        store = TripStore()
+        store.write(trips_df)
+        store.close()
+        # CSV / Feather exports finish while the rest of the run continues
+        self.export = TripExport()
+        self.export.write(trips_df)
         
         zones_df.to_csv(Config.ZONE_DATA, index=False)
      
+    def finish_export(self):
+        """Wait for the background exports and close their files"""
+        if self.export is not None:
+            export, self.export = self.export, None
+            export.close()
+    
+    @staticmethod
+    def stored_duplicate_keys(cleaner):
+        """Report the keys stored over every file, not the sum of the workers' views"""
+        cleaner.stats['duplicate_keys'], cleaner.stats['duplicate_key_bytes'] = DuplicateIndex.stored()
+    
+    @staticmethod
+    def save_rollups(rollups):
+        """Write rollups to Parquet and, when loading, to SQLite"""
+        if not rollups.tables:
+            return
+        rollups.save()
+        if Config.LOAD_DATABASE:
+            DatabaseLoader().load_rollups(rollups.results())
+    
     def print_summary(self, df):
         """Print pipeline summary statistics"""
+        self.print_summary_counts(DataProfile.of(df[['pickup_borough']]), len(df), df.columns)
+    
+    @staticmethod
+    def print_summary_counts(profile, total_rows, columns):
+        """Print summary statistics from the profile of the final trips"""
         
         print(f"\nTop Pickup Boroughs:")
-        for borough, count in df['pickup_borough'].value_counts().head(5).items():
-            print(f"  {borough}: {count:,} trips ({count/len(df)*100:.1f}%)")
+        borough_counts = profile['pickup_borough'].top(5) if 'pickup_borough' in profile else []
+        for borough, count in borough_counts:
+            print(f"  {borough}: {count:,} trips ({count/total_rows*100:.1f}%)")
         
         print(f"\nDerived Features Created:")
         derived_features = ['avg_speed_mph', 'cost_per_mile', 'tip_percentage', 
                            'time_of_day', 'is_inter_borough', 'revenue_per_minute']
         for feature in derived_features:
-            if feature in df.columns:
+            if feature in columns:
                 print(f"  ✓ {feature}")
 
+
+def _run_trip_file(path, settings, stat_reference=None, batch=None):
+    """Worker entry point: run the per-file stages for one monthly file
+    (stat_reference: this file's entry of RobustStats.references; batch:
+    the files processed alongside it, whose stored keys aren't checked)"""
+    for name, value in settings.items():
+        setattr(Config, name, value)
+    Config.use_trip_file(path)
+    # SQLite takes one writer at a time; the parent loads all partitions
+    Config.LOAD_DATABASE = False
+    # Other workers' months would evict this one's stage copies (Config.STAGE_CACHE)
+    Config.STAGE_CACHE = False
+    
+    pipeline = DataPipeline()
+    pipeline.cleaner.duplicate_exclude = batch
+    if stat_reference is not None:
+        pipeline.cleaner.stat_history, pipeline.cleaner.stat_reference = stat_reference
+    if Config.PROFILE_TRACEMALLOC:
+        tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline.execute()
+        with pipeline.profiler.stage('finish_export'):
+            pipeline.finish_export()
+        # Each month's cells go to their own file; the parent sums them once
+        if pipeline.od_matrix is not None:
+            with pipeline.profiler.stage('save_od_matrix'):
+                pipeline.od_matrix.save_month(path)
+        if pipeline.robust_stats is not None:
+            with pipeline.profiler.stage('save_outlier_stats'):
+                pipeline.robust_stats.save_month(path)
+        if Config.DUPLICATE_KEYS_DIR and pipeline.cleaner.duplicate_keys is not None:
+            with pipeline.profiler.stage('save_duplicate_keys'):
+                pipeline.cleaner.duplicate_keys.save(path)
+    
+    # Only counters travel back; the trips themselves stay in the partition
+    return {
+        'path': path,
+        'partition': Config.INTEGRATED_DATA,
+        'stats': pipeline.cleaner.stats,
+        'passenger_median': pipeline.cleaner.passenger_median,
+        'input_profile': pipeline.cleaner.profile,
+        'output_profile': pipeline.profile,
+        'rollups': pipeline.rollups.tables,
+        'total_rows': pipeline.total_rows,
+        'columns': pipeline.columns,
+        'profile': pipeline.profiler.records,
+    }
+
+
+class MultiFilePipeline:
+    """Process many monthly trip files in parallel, one partition per file"""
+    
+    def __init__(self, inputs=None, max_workers=None):
+        self.start_time = datetime.now()
+        self.files = DataLoader.find_trip_files(inputs)
+        self.max_workers = max_workers or Config.MAX_WORKERS or os.cpu_count()
+        self.cleaner = DataCleaner()
+        self.rollups = RollupBuilder()
+        self.profiler = StageProfiler()
+        self.partitions = []
+        
+        os.makedirs(Config.PARTITIONS_DIR, exist_ok=True)
+    
+    def run(self):
+        
+        if not self.files:
+            print(f"   No trip files match {Config.TRIP_DATA_FILES}")
+            return []
+        
+        settings = Config.settings()
+        profiler = self.profiler
+        profile = DataProfile()
+        total_rows = 0
+        columns = []
+        # Trip file -> its partition
+        sources = {}
+        
+        # Every file is judged against the months stored before this run
+        references = {}
+        if Config.STAT_OUTLIERS:
+            with profiler.stage('load_outlier_stats'):
+                references = RobustStats.references(self.files)
+        
+        print(f"Processing {len(self.files)} files with {self.max_workers} workers...")
+        with profiler.stage('process_files'), \
+                ProcessPoolExecutor(max_workers=min(self.max_workers, len(self.files))) as pool:
+            futures = [pool.submit(_run_trip_file, path, settings, references.get(path), self.files)
+                       for path in self.files]
+            for future in as_completed(futures):
+                result = future.result()
+                # Worker stages sum across files: their wall time exceeds process_files
+                profiler.merge(result['profile'])
+                self.cleaner.merge(result['stats'], result['passenger_median'], result['input_profile'])
+                self.partitions.append(result['partition'])
+                sources[result['path']] = result['partition']
+                self.rollups.merge(result['rollups'])
+                profile.merge(result['output_profile'])
+                total_rows += result['total_rows']
+                columns = columns or result['columns']
+                print(f"  ✓ {os.path.basename(result['path'])}: {result['total_rows']:,} rows")
+        
+        self.partitions.sort()
+        if Config.DUPLICATE_KEYS_DIR:
+            # Workers check the keys stored by files outside this run, so
+            # duplicates are caught against earlier runs but not between its files
+            DataPipeline.stored_duplicate_keys(self.cleaner)
+        zones_df = DataLoader.load_zone_lookup()
+        zones_df.to_csv(Config.ZONE_DATA, index=False)
+        
+        # ====== DATABASE LOAD ======
+        if Config.LOAD_DATABASE:
+            with profiler.stage('load_database', total_rows):
+                DatabaseLoader().load({path: DatabaseLoader.iter_parquet([partition])
+                                       for path, partition in sorted(sources.items())}, zones_df)
+        
+        # ====== ROLLUPS ======
+        with profiler.stage('save_rollups'):
+            DataPipeline.save_rollups(self.rollups)
+        if Config.OD_MATRIX:
+            with profiler.stage('save_od_matrix'):
+                ODMatrix.rebuild()
+        if Config.STAT_OUTLIERS:
+            with profiler.stage('save_outlier_stats'):
+                RobustStats.rebuild()
+        
+        # ====== GENERATE REPORT ======
+        with profiler.stage('save_report'):
+            self.cleaner.save_report(profile)
+        DataPipeline.print_summary_counts(profile, total_rows, columns)
+        profiler.save(mode='multi-file', files=self.files, workers=self.max_workers)
+        
+        elapsed = (datetime.now() - self.start_time).total_seconds()
+        print(f"\n✓ {len(self.files)} files, {total_rows:,} rows in {elapsed:.1f}s")
+        
+        return self.partitions
+
+
+# =====================================================================
+# INCREMENTAL INGESTION
+# =====================================================================
+
+class IngestDaemon:
+    """Poll for trip files and process only new or changed ones, folding each
+    into the partitions, rollups, OD matrix, outlier statistics and duplicate keys"""
+    
+    HASH_BLOCK = 8 * 1024 * 1024  # bytes read per hash update
+    
+    def __init__(self, inputs=None, max_concurrent=None):
+        self.inputs = Config.TRIP_DATA_FILES if inputs is None else inputs
+        self.max_concurrent = max_concurrent or Config.WATCH_MAX_CONCURRENT
+        self.manifest_path = os.path.join(Config.INGEST_DIR, 'manifest.json')
+        # path -> size, mtime_ns, sha256 and the outcome of its last run
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)['files']
+        self.profiler = StageProfiler()
+        self.stopping = None
+    
+    def scan(self):
+        """Files whose size or modification time no longer match the manifest"""
+        pending = []
+        now = time.time()
+        for path in DataLoader.find_trip_files(self.inputs):
+            path = os.path.abspath(path)
+            stat = os.stat(path)
+            entry = self.manifest.get(path)
+            if entry and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            if now - stat.st_mtime < Config.WATCH_SETTLE_SECONDS:
+                continue  # picked up by a later scan once the copy has finished
+            pending.append(path)
+        return pending
+    
+    @classmethod
+    def file_hash(cls, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(cls.HASH_BLOCK), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    async def check(self, path, semaphore):
+        """(path, stat, hash) if the content changed; a touched but identical file is only re-stamped"""
+        async with semaphore:
+            stat = os.stat(path)
+            digest = await asyncio.to_thread(self.file_hash, path)
+        entry = self.manifest.get(path)
+        if entry and entry['sha256'] == digest:
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            return None
+        return path, stat, digest
+    
+    async def process(self, pool, semaphore, settings, references, batch, path, stat, digest):
+        """Run one file in a worker process and record what it produced"""
+        entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest,
+                 'processed': datetime.now().isoformat(timespec='seconds')}
+        async with semaphore:
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    pool, _run_trip_file, path, settings, references.get(path), batch)
+            except Exception as e:
+                # Not retried until the file changes again
+                print(f"  ✗ {os.path.basename(path)}: {e}")
+                self.manifest[path] = dict(entry, error=str(e))
+                self.save_manifest()
+                return None
+        
+        self.profiler.merge(result['profile'])
+        self.record(result)
+        self.manifest[path] = dict(entry, partition=result['partition'], rows=result['total_rows'])
+        self.save_manifest()
+        print(f"  ✓ {os.path.basename(path)}: {result['total_rows']:,} rows")
+        return result
+    
+    def record(self, result):
+        """Keep a file's rollup sums, counters and profiles so combined outputs never need it rerun"""
+        rollups = RollupBuilder()
+        rollups.merge(result['rollups'])
+        rollups.save_month(result['path'])
+        
+        median = result['passenger_median']
+        state = {
+            'stats': {key: int(value) for key, value in result['stats'].items()},
+            'passenger_median': None if median is None or pd.isna(median) else float(median),
+            'input_profile': result['input_profile'].state(),
+            'output_profile': result['output_profile'].state(),
+            'total_rows': result['total_rows'],
+            'columns': list(result['columns']),
+        }
+        self.write_json(self.state_path(result['path']), state)
+    
+    @staticmethod
+    def state_path(path):
+        return os.path.join(Config.INGEST_DIR, 'files', f"{Config.source_key(path)}.json")
+    
+    def save_manifest(self):
+        self.write_json(self.manifest_path, {'files': self.manifest}, indent=2)
+    
+    @staticmethod
+    def write_json(path, data, **kwargs):
+        # Written whole or not at all: a crash never leaves half a manifest
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f, **kwargs)
+        os.replace(tmp, path)
+    
+    async def poll(self, pool):
+        """One scan: process what changed, then refresh the combined outputs"""
+        pending = self.scan()
+        if not pending:
+            return []
+        
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        changed = [item for item in await asyncio.gather(*(self.check(path, semaphore) for path in pending))
+                   if item is not None]
+        self.save_manifest()
+        if not changed:
+            return []
+        
+        replaced = [path for path, _, _ in changed if 'partition' in self.manifest.get(path, {})]
+        print(f"\n{datetime.now():%Y-%m-%d %H:%M:%S}: {len(changed) - len(replaced)} new, "
+              f"{len(replaced)} changed trip files")
+        
+        # Files of one scan don't see each other's duplicate keys or outlier
+        # statistics (as in MultiFilePipeline)
+        self.profiler = StageProfiler()
+        settings = Config.settings()
+        batch = [path for path, _, _ in changed]
+        references = RobustStats.references(batch) if Config.STAT_OUTLIERS else {}
+        results = await asyncio.gather(*(self.process(pool, semaphore, settings, references, batch, *item)
+                                         for item in changed))
+        results = [result for result in results if result is not None]
+        if results:
+            self.refresh({result['path']: result['partition'] for result in results})
+            self.profiler.save(mode='ingest', files=[result['path'] for result in results],
+                               workers=self.max_concurrent)
+        return results
+    
+    def refresh(self, sources):
+        """Rebuild the combined outputs from what every ingested file left
+        behind (sources: the trip files just processed -> their partitions)"""
+        profiler = self.profiler
+        zones_df = DataLoader.load_zone_lookup()
+        zones_df.to_csv(Config.ZONE_DATA, index=False)
+        
+        # ====== DATABASE LOAD: a changed file's trips replace its earlier ones ======
+        if Config.LOAD_DATABASE:
+            with profiler.stage('load_database'):
+                DatabaseLoader().load({path: DatabaseLoader.iter_parquet([partition])
+                                       for path, partition in sorted(sources.items())}, zones_df, replace=False)
+        
+        # ====== ROLLUPS ======
+        with profiler.stage('save_rollups'):
+            DataPipeline.save_rollups(RollupBuilder.rebuild())
+        if Config.OD_MATRIX:
+            with profiler.stage('save_od_matrix'):
+                ODMatrix.rebuild()
+        if Config.STAT_OUTLIERS:
+            with profiler.stage('save_outlier_stats'):
+                RobustStats.rebuild()
+        
+        # ====== GENERATE REPORT (every ingested file) ======
+        cleaner = DataCleaner()
+        profile = DataProfile()
+        total_rows = 0
+        columns = []
+        for path, entry in sorted(self.manifest.items()):
+            if 'partition' not in entry:
+                continue
+            with open(self.state_path(path)) as f:
+                state = json.load(f)
+            cleaner.merge(state['stats'], state['passenger_median'], DataProfile.from_state(state['input_profile']))
+            profile.merge(DataProfile.from_state(state['output_profile']))
+            total_rows += state['total_rows']
+            columns = columns or state['columns']
+        if Config.DUPLICATE_KEYS_DIR:
+            DataPipeline.stored_duplicate_keys(cleaner)
+        with profiler.stage('save_report'):
+            cleaner.save_report(profile)
+        DataPipeline.print_summary_counts(profile, total_rows, columns)
+    
+    async def run(self, once=False):
+        """Scan every WATCH_INTERVAL seconds until SIGINT / SIGTERM (or after one scan)"""
+        os.makedirs(os.path.join(Config.INGEST_DIR, 'files'), exist_ok=True)
+        os.makedirs(Config.PARTITIONS_DIR, exist_ok=True)
+        self.stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):
+                # A scan in progress finishes first
+                loop.add_signal_handler(sig, self.stopping.set)
+        
+        print(f"Watching {self.inputs} ({len(self.manifest)} files in the manifest, "
+              f"{self.max_concurrent} at a time)")
+        with ProcessPoolExecutor(max_workers=self.max_concurrent) as pool:
+            while not self.stopping.is_set():
+                await self.poll(pool)
+                if once:
+                    break
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self.stopping.wait(), Config.WATCH_INTERVAL)
+        print("✓ Ingestion stopped")
+
+
 # =====================================================================
 # RUN PIPELINE
 # =====================================================================
 
+def print_plan(files):
+    """What a run with the current settings would read and write"""
+    mode = 'duckdb' if Config.BACKEND == 'duckdb' else 'streaming' if Config.STREAMING else 'batch'
+    if len(files) > 1:
+        print(f"  Input: {len(files)} trip files ({mode}, {Config.MAX_WORKERS or os.cpu_count()} workers)")
+        for path in files:
+            print(f"    {path}")
+        print(f"  Output: {Config.PARTITIONS_DIR}")
+    else:
+        print(f"  Input: {Config.TRIP_DATA_CSV or Config.TRIP_DATA_PARQUET} ({mode})")
+        print(f"  Output: {Config.INTEGRATED_DATA}")
+    for fmt in Config.OUTPUT_FORMATS:
+        print(f"  Export: {fmt}")
+    
+    registry = FeatureEngineer.registry
+    features = Config.DERIVED_FEATURES or [name for name, feature in registry.features.items()
+                                            if feature['available'] is None]
+    print(f"  Features: {', '.join(features)}")
+    if Config.DERIVED_FEATURES is None:
+        geometry = [name for name in registry.features if name not in features]
+        if not ZoneGeometry.missing():
+            print(f"  Zone geometry features: {', '.join(geometry)}")
+        else:
+            print("  Zone geometry features skipped (no shapefile or index)")
+    print(f"  Rollups: {', '.join(Config.ROLLUPS)}" + (", OD matrix" if Config.OD_MATRIX else ""))
+    if Config.STAT_OUTLIERS:
+        months = len(glob.glob(os.path.join(Config.OUTLIER_STATS_DIR, 'months', '*.npz')))
+        print(f"  Statistical outliers: {Config.STAT_OUTLIERS} ({months} months of history)")
+    if Config.LOAD_DATABASE:
+        trips = "replacing all trips" if Config.DB_REPLACE_TRIPS else "replacing each file's earlier trips"
+        print(f"  Database: {Config.DATABASE} ({trips})")
+
+
+def main(argv=None):
+    """Command line entry point; only a real run loads the data stack"""
+    parser = argparse.ArgumentParser(description="Clean and integrate NYC yellow taxi trip data")
+    parser.add_argument('--streaming', action='store_true', help="process each month chunk by chunk")
+    parser.add_argument('--backend', choices=DataPipeline.BACKENDS, help="execution backend (default: Config.BACKEND)")
+    parser.add_argument('--dry-run', action='store_true', help="validate the configuration, show the plan and exit")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep polling TRIP_DATA_FILES, processing only new or changed files")
+    parser.add_argument('--once', action='store_true', help="with --watch: one scan, then exit")
+    parser.add_argument('--replace-trips', action='store_true',
+                        help="with LOAD_DATABASE: delete every trip in the database before loading, "
+                             "not just the loaded files' earlier trips")
+    args = parser.parse_args(argv)
+    
+    if args.streaming:
+        Config.STREAMING = True
+    if args.backend:
+        Config.BACKEND = args.backend
+    if args.replace_trips:
+        Config.DB_REPLACE_TRIPS = True
+    
+    problems = Config.validate()
+    for problem in problems:
+        print(f"✗ {problem}")
+    if problems:
+        return 1
+    
+    files = DataLoader.find_trip_files()
+    if args.dry_run:
+        print("✓ Configuration is valid")
+        print_plan(files)
+        if args.watch:
+            print(f"  Watch: {len(IngestDaemon().scan())} new or changed files, "
+                  f"every {Config.WATCH_INTERVAL}s, {Config.WATCH_MAX_CONCURRENT} at a time")
+        return 0
+    
+    if args.watch:
+        asyncio.run(IngestDaemon().run(once=args.once))
+        return 0
+    
+    if len(files) > 1:
+        pipeline = MultiFilePipeline()
+    else:
+        pipeline = DataPipeline()
+    # run() reports a failure and returns None
+    return 0 if pipeline.run() is not None else 1
+
+
 if __name__ == "__main__":
-    pipeline = DataPipeline()
-    result_df = pipeline.run() 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Frame Copy Counter
+==================
+Runs the batch transform on a synthetic month and counts full-frame
+copies: DataFrame operations whose result shares no column buffer with
+the frame they were called on. Copies are attributed to the pipeline
+function that made them and asserted against COPY_BUDGET, so a stage
+that starts copying the whole frame again fails the run. Needs no
+input data or arguments, so it can run unattended (e.g. in CI).
+
+Usage: python scripts/benchmark_copies.py [rows]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import functools
+import contextlib
+import io
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_clean_up_pipeline as pipeline
+from data_clean_up_pipeline import Config, DataLoader, DataPipeline
+from synthetic_trips import generate
+
+DEFAULT_ROWS = 200_000
+# Frames smaller than this are lookups and summaries, not trip data
+MIN_ROWS = 1000
+# DataFrame methods that can return a new frame
+WATCHED = ['__getitem__', 'dropna', 'fillna', 'copy', 'astype', 'take', 'reset_index',
+           'drop', 'sort_values', 'merge', 'assign', 'reindex', 'where', 'mask', 'round']
+# Allowed full-frame copies per pipeline function: a filter has to copy
+# the kept rows once; everything else should work column by column
+COPY_BUDGET = {
+    'handle_missing_values': 1,
+    'remove_duplicates': 1,
+    'detect_outliers': 1,
+}
+
+
+def buffer_ids(series):
+    """Addresses of the memory behind a column"""
+    values = series.array
+    if hasattr(values, '_pa_array'):
+        return {buf.address for chunk in values._pa_array.chunks for buf in chunk.buffers() if buf}
+    for attr in ('_data', 'codes', '_ndarray'):
+        if hasattr(values, attr):
+            values = getattr(values, attr)
+            break
+    array = np.asarray(values)
+    return {array.__array_interface__['data'][0]} if array.size else set()
+
+
+def is_full_copy(before, after):
+    """True when no column of `after` reuses memory from `before`"""
+    shared = [col for col in after.columns if col in before.columns]
+    if not shared or len(before) < MIN_ROWS:
+        return False
+    return all(not (buffer_ids(before[col]) & buffer_ids(after[col])) for col in shared)
+
+
+def caller():
+    """Innermost pipeline function on the stack"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code.co_filename == pipeline.__file__:
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return '(outside pipeline)'
+
+
+@contextlib.contextmanager
+def count_copies():
+    """Patch the watched DataFrame methods to count full-frame copies"""
+    copies = Counter()
+    depth = [0]
+    originals = {name: getattr(pd.DataFrame, name) for name in WATCHED}
+
+    def watch(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            # Only the outermost call counts; pandas calls itself internally
+            depth[0] += 1
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                depth[0] -= 1
+            if depth[0] == 0 and isinstance(result, pd.DataFrame) and result is not self \
+                    and is_full_copy(self, result):
+                copies[caller()] += 1
+            return result
+        return wrapper
+
+    for name, method in originals.items():
+        setattr(pd.DataFrame, name, watch(method))
+    try:
+        yield copies
+    finally:
+        for name, method in originals.items():
+            setattr(pd.DataFrame, name, method)
+
+
+def main(rows):
+    workdir = tempfile.mkdtemp(prefix='frame_copies_')
+    try:
+        path = os.path.join(workdir, 'yellow_tripdata.csv')
+        generate(rows, path)
+        Config.TRIP_DATA_CSV = path
+        Config.TRIP_DATA_PARQUET = os.path.join(workdir, 'tripdata.parquet')
+        DataLoader.convert_csv_to_parquet()
+        trips_df = DataLoader.load_trip_data()
+        zones_df = DataLoader.load_zone_lookup()
+
+        with count_copies() as copies, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            trips_df, _ = DataPipeline().transform(trips_df, zones_df)
+            elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"Rows: {rows:,}; transform {elapsed:.2f}s, {len(trips_df):,} rows out")
+    print(f"{'function':32} {'copies':>7} {'budget':>7}")
+    over = []
+    for name in sorted(set(copies) | set(COPY_BUDGET)):
+        budget = COPY_BUDGET.get(name, 0)
+        print(f"{name:32} {copies[name]:>7} {budget:>7}")
+        if copies[name] > budget:
+            over.append(name)
+    print(f"{'total':32} {sum(copies.values()):>7} {sum(COPY_BUDGET.values()):>7}")
+
+    assert len(trips_df) > 0, "transform dropped every row"
+    assert not over, f"over the copy budget: {', '.join(over)}"
+    print("✓ Within the copy budget")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,146 @@
+"""
+Feature Micro-Benchmarks
+========================
+Times each derived feature in FeatureEngineer against the previous
+np.where / Series.apply implementation on a synthetic frame, and checks
+that both produce the same values.
+
+Usage: python scripts/benchmark_features.py [rows]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import FeatureEngineer
+
+DEFAULT_ROWS = 1_000_000
+REPEATS = 5
+
+
+# =====================================================================
+# PREVIOUS IMPLEMENTATIONS
+# =====================================================================
+
+def legacy_avg_speed_mph(df):
+    speed = pd.Series(np.where(
+        df['trip_duration_minutes'] > 0,
+        df['trip_distance'] / (df['trip_duration_minutes'] / 60),
+        0
+    ))
+    return speed.clip(upper=80).round(2)
+
+
+def legacy_cost_per_mile(df):
+    return pd.Series(np.where(
+        df['trip_distance'] > 0,
+        df['total_amount'] / df['trip_distance'],
+        0
+    )).round(2)
+
+
+def legacy_tip_percentage(df):
+    return pd.Series(np.where(
+        df['fare_amount'] > 0,
+        (df['tip_amount'] / df['fare_amount']) * 100,
+        0
+    )).clip(upper=100).round(2)
+
+
+def legacy_time_of_day(df):
+    def categorize_time_of_day(hour):
+        if 0 <= hour < 6:
+            return 'Night'
+        elif 6 <= hour < 10:
+            return 'Morning Rush'
+        elif 10 <= hour < 16:
+            return 'Midday'
+        elif 16 <= hour < 20:
+            return 'Evening Rush'
+        else:
+            return 'Night'
+
+    return df['pickup_hour'].apply(categorize_time_of_day)
+
+
+def legacy_is_inter_borough(df):
+    return (df['pickup_borough'] != df['dropoff_borough']).astype(int)
+
+
+def legacy_revenue_per_minute(df):
+    return pd.Series(np.where(
+        df['trip_duration_minutes'] > 0,
+        df['total_amount'] / df['trip_duration_minutes'],
+        0
+    )).round(2)
+
+
+FEATURES = {
+    'avg_speed_mph': legacy_avg_speed_mph,
+    'cost_per_mile': legacy_cost_per_mile,
+    'tip_percentage': legacy_tip_percentage,
+    'time_of_day': legacy_time_of_day,
+    'is_inter_borough': legacy_is_inter_borough,
+    'revenue_per_minute': legacy_revenue_per_minute,
+}
+
+
+# =====================================================================
+# BENCHMARK
+# =====================================================================
+
+def make_trips(rows, seed=0):
+    """Feature inputs with realistic ranges, including zero denominators"""
+    rng = np.random.default_rng(seed)
+    boroughs = pd.CategoricalDtype(['Bronx', 'Brooklyn', 'Manhattan', 'Queens', 'Staten Island'])
+    distance = np.round(rng.gamma(1.5, 2.0, rows), 2)
+    distance[rng.random(rows) < 0.01] = 0
+    duration = np.round(rng.gamma(2.0, 7.0, rows), 2)
+    duration[rng.random(rows) < 0.01] = 0
+    fare = np.round(2.5 + distance * 2.5, 2)
+    fare[rng.random(rows) < 0.01] = 0
+    tip = np.round(fare * rng.choice([0, 0.15, 0.2, 0.25], rows), 2)
+    return pd.DataFrame({
+        'trip_distance': distance,
+        'trip_duration_minutes': duration,
+        'fare_amount': fare,
+        'tip_amount': tip,
+        'total_amount': fare + tip + 0.8,
+        'pickup_hour': rng.integers(0, 24, rows).astype('int32'),
+        'pickup_borough': pd.Categorical.from_codes(rng.integers(0, 5, rows), dtype=boroughs),
+        'dropoff_borough': pd.Categorical.from_codes(rng.integers(0, 5, rows), dtype=boroughs),
+    })
+
+
+def best_time(func, df):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(rows):
+    df = make_trips(rows)
+
+    print(f"Rows: {rows:,} (best of {REPEATS})")
+    print(f"{'feature':20} {'before (ms)':>12} {'after (ms)':>11} {'speedup':>8}")
+    for name, legacy in FEATURES.items():
+        before, expected = best_time(legacy, df)
+        after, actual = best_time(getattr(FeatureEngineer, name), df)
+
+        expected = np.asarray(expected, dtype=object)
+        actual = np.asarray(actual, dtype=object)
+        assert (expected == actual).all(), name
+
+        print(f"{name:20} {before * 1000:>12.1f} {after * 1000:>11.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
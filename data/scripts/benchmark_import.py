@@ -0,0 +1,68 @@
+"""
+Import-Time Benchmark
+=====================
+Measures start-up cost of the pipeline module with `python -X importtime`
+in fresh interpreters: a bare import, a `--dry-run`, and an import
+followed by the first data access (where the deferred data stack loads).
+Reports wall time, total import time and the heaviest top-level imports,
+and fails if the bare import or the dry run pulls in the data stack.
+
+Usage: python scripts/benchmark_import.py [repeats]
+"""
+
+import os
+import re
+import sys
+import time
+import subprocess
+
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REPEATS = 5
+# Modules that should only load once a stage needs them
+HEAVY = ['pandas', 'numpy', 'pyarrow', 'duckdb', 'geopandas', 'shapely', 'pyproj']
+# name -> (interpreter arguments, data stack expected)
+CASES = {
+    'import': (['-c', 'import data_clean_up_pipeline'], False),
+    'dry-run': (['data_clean_up_pipeline.py', '--dry-run'], False),
+    'first data access': (['-c', 'import data_clean_up_pipeline as m; m.DataLoader.load_zone_lookup()'], True),
+}
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(args):
+    """Wall seconds and `-X importtime` records (self us, cumulative us, depth, module)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=DATA_DIR,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    records = [(int(own), int(cumulative), len(indent) // 2, module)
+               for own, cumulative, indent, module in LINE.findall(result.stderr)]
+    return wall, records
+
+
+def main(repeats):
+    failed = []
+    for name, (args, heavy_expected) in CASES.items():
+        runs = [measure(args) for _ in range(repeats)]
+        wall, records = min(runs, key=lambda run: run[0])
+        top_level = [record for record in records if record[2] == 0]
+        # Lazily imported packages log only their submodules, so match by prefix
+        loaded = [package for package in HEAVY
+                  if any(record[3].split('.')[0] == package for record in records)]
+
+        print(f"\n{name}: wall {wall * 1000:.0f} ms (best of {repeats}), "
+              f"imports {sum(record[1] for record in top_level) / 1000:.0f} ms")
+        for own, cumulative, _, module in sorted(top_level, key=lambda record: -record[1])[:5]:
+            print(f"  {module:32} {cumulative / 1000:>8.1f} ms")
+        print(f"  data stack loaded: {', '.join(loaded) or 'none'}")
+        if loaded and not heavy_expected:
+            failed.append(name)
+
+    if failed:
+        print(f"\n✗ Data stack imported eagerly in: {', '.join(failed)}")
+        sys.exit(1)
+    print("\n✓ Import and dry run stay free of the data stack")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS)
@@ -0,0 +1,54 @@
+"""
+Ingest Schema Benchmark
+=======================
+Reads a yellow trip CSV twice - with pandas type inference and with the
+typed ingest schema from Config.TRIP_DTYPES - and reports read time and
+resident memory per row for both.
+
+Usage: python scripts/benchmark_ingest_schema.py [trip_csv]
+"""
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import Config, DataLoader
+
+
+def timed(func, *args):
+    """Wall time of one call, plus its result"""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def read_inferred(path):
+    """The previous ingest: everything inferred, datetimes parsed later"""
+    df = pd.read_csv(path)
+    for col in Config.TRIP_DATETIME_COLUMNS:
+        df[col] = pd.to_datetime(df[col])
+    return df
+
+
+def main(path):
+    inferred_time, inferred = timed(pd.read_csv, path)
+    parsed_time, _ = timed(read_inferred, path)
+    typed_time, typed = timed(DataLoader.read_trip_csv, path)
+
+    before = DataLoader.memory_per_row(inferred)
+    after = DataLoader.memory_per_row(typed)
+
+    print(f"Rows: {len(typed):,}")
+    print(f"{'':28} {'read (s)':>9} {'bytes/row':>10}")
+    print(f"{'inferred':28} {inferred_time:>9.3f} {before:>10.0f}")
+    print(f"{'inferred + to_datetime':28} {parsed_time:>9.3f} {'':>10}")
+    print(f"{'typed schema':28} {typed_time:>9.3f} {after:>10.0f}")
+    print(f"\nMemory per row: {before:.0f} -> {after:.0f} bytes ({after / before * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else Config.TRIP_DATA_CSV)
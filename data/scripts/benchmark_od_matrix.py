@@ -0,0 +1,113 @@
+"""
+OD Matrix Benchmark
+===================
+Builds the hour x zone x zone OD arrays for a synthetic month with
+ODMatrix (bincount on combined keys) and with a pandas groupby, checks
+that both agree, then times a "top 10 flows out of a zone" query on
+the memory-mapped arrays against the same query on the trip Parquet.
+Also checks that an empty month saves and rebuilds with the others.
+
+Usage: python scripts/benchmark_od_matrix.py [rows]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import ODMatrix
+
+DEFAULT_ROWS = 5_000_000
+REPEATS = 5
+ZONE = 237  # Upper East Side South, one of the busiest pickup zones
+
+
+def make_trips(rows, seed=0):
+    """Final-trip columns the OD matrix reads, with pickups skewed to busy zones"""
+    rng = np.random.default_rng(seed)
+    weights = rng.pareto(1.2, 265) + 0.01
+    weights /= weights.sum()
+    distance = np.round(rng.lognormal(0.6, 0.75, rows), 2)
+    duration = np.round(distance / rng.lognormal(2.4, 0.3, rows) * 60 + 1.5, 2)
+    return pd.DataFrame({
+        'PULocationID': rng.choice(np.arange(1, 266), rows, p=weights).astype('int16'),
+        'DOLocationID': rng.choice(np.arange(1, 266), rows, p=weights).astype('int16'),
+        'pickup_hour': rng.integers(0, 24, rows).astype('int32'),
+        'total_amount': np.round(3.3 + 2.5 * distance + 0.35 * duration, 2),
+        'trip_duration_minutes': duration,
+        'avg_speed_mph': np.round(np.minimum(distance / (duration / 60), 80), 2),
+    })
+
+
+def best_time(func, *args, **kwargs):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def groupby_matrix(trips_df):
+    return trips_df.groupby(['pickup_hour', 'PULocationID', 'DOLocationID']).agg(
+        trips=('total_amount', 'size'), revenue=('total_amount', 'sum'))
+
+
+def build(trips_df):
+    od_matrix = ODMatrix()
+    od_matrix.add(trips_df)
+    return od_matrix
+
+
+def groupby_top_flows(path, zone, n=10):
+    """The query without the matrix: filter the trips, group, sort"""
+    trips_df = pd.read_parquet(path, columns=['PULocationID', 'DOLocationID', 'total_amount'],
+                               filters=[('PULocationID', '==', zone)])
+    return trips_df.groupby('DOLocationID').agg(trips=('total_amount', 'size')).nlargest(n, 'trips')
+
+
+def main(rows):
+    trips_df = make_trips(rows)
+    workdir = tempfile.mkdtemp(prefix='od_matrix_')
+
+    try:
+        print(f"Rows: {rows:,} (best of {REPEATS})")
+        groupby_time, expected = best_time(groupby_matrix, trips_df)
+        build_time, od_matrix = best_time(build, trips_df)
+
+        hour, pickup, dropoff = (expected.index.get_level_values(i).to_numpy() for i in range(3))
+        assert (od_matrix.grid('trips')[hour, pickup, dropoff] == expected['trips'].to_numpy()).all()
+        assert np.allclose(od_matrix.grid('revenue')[hour, pickup, dropoff], expected['revenue'])
+        print(f"build: groupby {groupby_time * 1000:.0f} ms, bincount {build_time * 1000:.0f} ms "
+              f"({groupby_time / build_time:.1f}x)")
+
+        od_matrix.save('synthetic', workdir)
+        # A month that ends with no trips must round-trip through save / rebuild
+        empty = ODMatrix()
+        empty.add(trips_df.iloc[:0])
+        empty.save('empty', workdir)
+        assert np.allclose(ODMatrix.open(workdir).grid('revenue')[hour, pickup, dropoff], expected['revenue'])
+        path = os.path.join(workdir, 'trips.parquet')
+        trips_df.to_parquet(path, index=False)
+        size = sum(os.path.getsize(os.path.join(workdir, f"{name}.npy")) for name in od_matrix.arrays)
+        print(f"arrays on disk: {size / 1e6:.0f} MB")
+
+        parquet_time, expected = best_time(groupby_top_flows, path, ZONE)
+        open_time, mapped = best_time(ODMatrix.open, workdir)
+        query_time, top = best_time(mapped.top_flows, ZONE, 10)
+        assert (top['trips'].to_numpy() == expected['trips'].to_numpy()).all()
+        print(f"top 10 flows out of zone {ZONE}: Parquet + groupby {parquet_time * 1000:.1f} ms, "
+              f"memory-mapped matrix {(open_time + query_time) * 1000:.1f} ms "
+              f"(open {open_time * 1000:.1f} + query {query_time * 1000:.1f})")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
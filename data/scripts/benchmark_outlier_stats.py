@@ -0,0 +1,97 @@
+"""
+Outlier Statistics Benchmark
+============================
+Compares the two ways of getting per hour and zone pair medians / MADs
+once a new month arrives: a pandas groupby over every month's trips (a
+full regroup), and RobustStats binning only the new month and summing
+its counts with the stored months. Checks that the binned medians are
+within RobustStats.ACCURACY of the exact (lower) medians.
+
+Usage: python scripts/benchmark_outlier_stats.py [rows per month] [months]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import Config, ODMatrix, RobustStats
+from benchmark_od_matrix import make_trips
+
+DEFAULT_ROWS = 2_000_000
+DEFAULT_MONTHS = 3
+METRIC = 'trip_duration_minutes'
+
+
+def month(rows, seed):
+    trips_df = make_trips(rows, seed)
+    trips_df['trip_distance'] = np.round(trips_df['avg_speed_mph'] * trips_df['trip_duration_minutes'] / 60, 2)
+    trips_df['fare_amount'] = np.round(trips_df['total_amount'] * 0.8, 2)
+    return trips_df
+
+
+def full_regroup(months):
+    """Exact lower median and MAD per cell over every month's trips"""
+    trips_df = pd.concat(months, ignore_index=True)
+    cells, _ = ODMatrix.keys(trips_df)
+    values = pd.Series(trips_df[METRIC].to_numpy(), index=cells)
+    grouped = values.groupby(level=0)
+    median = grouped.quantile(0.5, interpolation='lower')
+    deviation = (values - median.reindex(values.index).to_numpy()).abs()
+    mad = deviation.groupby(level=0).quantile(0.5, interpolation='lower')
+    return median, mad
+
+
+def main(rows, months):
+    data = [month(rows, seed) for seed in range(months)]
+    workdir = tempfile.mkdtemp(prefix='outlier_stats_')
+
+    try:
+        # The earlier months are already stored, as after previous runs
+        for i, trips_df in enumerate(data[:-1]):
+            stats = RobustStats()
+            stats.add(trips_df)
+            stats.save_month(f"month-{i}", workdir)
+        RobustStats.rebuild(workdir)
+
+        start = time.perf_counter()
+        median, mad = full_regroup(data)
+        regroup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stats = RobustStats()
+        stats.add(data[-1])
+        bin_time = time.perf_counter() - start
+        start = time.perf_counter()
+        stats.save(f"month-{months - 1}", workdir)
+        save_time = time.perf_counter() - start
+        start = time.perf_counter()
+        reference = RobustStats.reference('next-month', workdir)
+        load_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir)
+
+    cells, trips, binned_median, binned_mad = reference[METRIC]
+    assert (cells == median.index.to_numpy()).all()
+    error = np.abs(binned_median / median.to_numpy() - 1)
+    assert error.max() <= RobustStats.ACCURACY * 1.01, error.max()
+    print(f"Rows: {rows:,} x {months} months, {len(cells):,} hour/zone-pair cells")
+    print(f"full regroup (pandas groupby): {regroup_time:.2f}s")
+    print(f"incremental: bin new month {bin_time:.2f}s + merge and summarize {save_time:.2f}s "
+          f"({regroup_time / (bin_time + save_time):.1f}x); next run loads the summary in {load_time * 1000:.0f} ms")
+    # Binning resolves a MAD to about one bin, i.e. ACCURACY of the median
+    judged = trips >= Config.STAT_OUTLIER_MIN_TRIPS
+    mad_error = np.abs(binned_mad - mad.to_numpy())[judged] / median.to_numpy()[judged]
+    print(f"median error max {error.max() * 100:.2f}%; in the {judged.sum():,} judged cells, "
+          f"MAD error max {mad_error.max() * 100:.2f}% of the median")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS,
+         int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MONTHS)
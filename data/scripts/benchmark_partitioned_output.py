@@ -0,0 +1,122 @@
+"""
+Partitioned Output Benchmark
+============================
+Writes a synthetic month of integrated trips in several layouts - the
+previous single snappy file, a single file with tuned row groups, and
+hive-partitioned directories by day (and borough) - then times a
+one-day, one-borough query against each and reports size on disk.
+
+Usage: python scripts/benchmark_partitioned_output.py [rows]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import Config, DataLoader, TripStore, ZoneLookup
+
+DEFAULT_ROWS = 2_000_000
+REPEATS = 3
+
+DATE_COLS = ['pickup_year', 'pickup_month', 'pickup_day']
+LAYOUTS = [
+    # (label, partition columns, compression)
+    ('single file, tuned row groups', [], 'snappy'),
+    ('by day, snappy', DATE_COLS, 'snappy'),
+    ('by day, zstd', DATE_COLS, 'zstd'),
+    ('by day + borough, zstd', DATE_COLS + ['pickup_borough'], 'zstd'),
+]
+QUERY = {'pickup_year': 2019, 'pickup_month': 1, 'pickup_day': 15, 'pickup_borough': 'Manhattan'}
+QUERY_COLUMNS = ['tpep_pickup_datetime', 'PULocationID', 'DOLocationID', 'fare_amount', 'tip_amount']
+
+
+def make_trips(rows, seed=0):
+    """One month of integrated-trip columns, in pickup order like the raw files"""
+    rng = np.random.default_rng(seed)
+    pickup = pd.Timestamp('2019-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 31 * 86400, rows)), unit='s')
+    trips_df = pd.DataFrame({
+        'tpep_pickup_datetime': pickup,
+        'tpep_dropoff_datetime': pickup + pd.to_timedelta(rng.integers(60, 3600, rows), unit='s'),
+        'PULocationID': rng.integers(1, 266, rows).astype('int16'),
+        'DOLocationID': rng.integers(1, 266, rows).astype('int16'),
+        'passenger_count': rng.integers(1, 7, rows).astype('int8'),
+        'trip_distance': np.round(rng.gamma(1.5, 2.0, rows), 2),
+        'fare_amount': np.round(rng.gamma(2.0, 6.0, rows), 2),
+        'tip_amount': np.round(rng.gamma(1.0, 2.0, rows), 2),
+        'total_amount': np.round(rng.gamma(2.0, 8.0, rows), 2),
+    })
+    lookup = ZoneLookup(DataLoader.load_zone_lookup())
+    lookup.attach(trips_df, 'PULocationID', 'pickup')
+    lookup.attach(trips_df, 'DOLocationID', 'dropoff')
+    trips_df['pickup_year'] = trips_df['tpep_pickup_datetime'].dt.year
+    trips_df['pickup_month'] = trips_df['tpep_pickup_datetime'].dt.month
+    trips_df['pickup_day'] = trips_df['tpep_pickup_datetime'].dt.day
+    return trips_df
+
+
+def disk_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def best_time(func, *args, **kwargs):
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def read_and_filter(path):
+    """The previous access pattern: load the file, filter in pandas"""
+    trips_df = pd.read_parquet(path, columns=QUERY_COLUMNS + list(QUERY))
+    mask = np.logical_and.reduce([trips_df[col] == value for col, value in QUERY.items()])
+    return trips_df.loc[mask, QUERY_COLUMNS]
+
+
+def main(rows):
+    trips_df = make_trips(rows)
+    workdir = tempfile.mkdtemp(prefix='partitioned_output_')
+
+    try:
+        print(f"Rows: {rows:,}; query: {QUERY} (best of {REPEATS})")
+        print(f"{'layout':32} {'write (s)':>10} {'size (MB)':>10} {'query (ms)':>11} {'rows':>8}")
+
+        # Previous layout: one snappy file with pyarrow's default row groups
+        path = os.path.join(workdir, 'before.parquet')
+        start = time.perf_counter()
+        trips_df.to_parquet(path, compression='snappy')
+        write_time = time.perf_counter() - start
+        query_time, expected = best_time(read_and_filter, path)
+        print(f"{'single file (before)':32} {write_time:>10.2f} {disk_size(path) / 1e6:>10.1f} "
+              f"{query_time * 1000:>11.1f} {len(expected):>8,}")
+
+        for i, (label, partition_cols, compression) in enumerate(LAYOUTS):
+            Config.PARQUET_COMPRESSION = compression
+            path = os.path.join(workdir, f'layout_{i}.parquet')
+            start = time.perf_counter()
+            store = TripStore(path, partition_cols=partition_cols)
+            store.write(trips_df)
+            store.close()
+            write_time = time.perf_counter() - start
+
+            query_time, result = best_time(TripStore.read, path, columns=QUERY_COLUMNS, **QUERY)
+            assert len(result) == len(expected), label
+            print(f"{label:32} {write_time:>10.2f} {disk_size(path) / 1e6:>10.1f} "
+                  f"{query_time * 1000:>11.1f} {len(result):>8,}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,168 @@
+"""
+End-to-End Pipeline Benchmark
+=============================
+Runs the full pipeline on synthetic TLC-shaped months (see
+synthetic_trips.py) at several sizes, each in a fresh process so peak
+memory is per run. Wall time, throughput, peak RSS and the per-stage
+timings from the run profile are appended as one JSON line per run to a
+results file, tagged with the git commit, and compared with the latest
+run of the same size and mode from a different commit.
+
+Usage: python scripts/benchmark_pipeline.py [rows ...] [--streaming | --duckdb] [--results path]
+"""
+
+import os
+import sys
+import json
+import shutil
+import platform
+import subprocess
+import contextlib
+import io
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import Config, DataPipeline
+from synthetic_trips import generate
+
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+SEED = 0
+BENCHMARK_DIR = os.path.join(Config.CLEAN_DATA_DIR, "benchmarks")
+RESULTS_FILE = os.path.join(BENCHMARK_DIR, "pipeline.jsonl")
+
+
+def git_commit():
+    """Short HEAD hash, marked '+dirty' when tracked files have changed"""
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=Config.BASE_DIR, capture_output=True,
+                              text=True).stdout.strip()
+    commit = git('rev-parse', '--short', 'HEAD') or 'unknown'
+    return commit + ('+dirty' if git('status', '--porcelain', '--untracked-files=no') else '')
+
+
+def synthetic_month(rows):
+    """Path of the synthetic CSV for this size, generated on first use"""
+    path = os.path.join(BENCHMARK_DIR, 'input', f'yellow_tripdata_{rows}_{SEED}.csv')
+    if not os.path.exists(path):
+        print(f"Generating {rows:,} synthetic trips...")
+        generate(rows, path, SEED)
+    return path
+
+
+def run_pipeline(path, workdir, streaming, backend='pandas'):
+    """Worker entry point: one pipeline run with every output under workdir"""
+    clean_data_dir = Config.CLEAN_DATA_DIR
+    for name, value in list(vars(Config).items()):
+        if name.isupper() and isinstance(value, str) and value.startswith(clean_data_dir):
+            setattr(Config, name, workdir + value[len(clean_data_dir):])
+    Config.TRIP_DATA_CSV = path
+    Config.BACKEND = backend
+    # Measure the work itself, not cache hits or the server database
+    Config.STAGE_CACHE = False
+    Config.LOAD_DATABASE = False
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        DataPipeline(streaming=streaming).run()
+    with open(Config.PROFILE_FILE) as f:
+        return json.load(f)
+
+
+def benchmark(rows, streaming, backend):
+    path = synthetic_month(rows)
+    workdir = os.path.join(BENCHMARK_DIR, 'run')
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    try:
+        # A fresh interpreter per run keeps peak RSS from carrying over
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            profile = pool.submit(run_pipeline, path, workdir, streaming, backend).result()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': pa.__version__,
+        'rows': rows,
+        'mode': backend if backend != 'pandas' else 'streaming' if streaming else 'batch',
+        'wall_s': round(profile['wall_s'], 3),
+        'rows_per_sec': round(rows / profile['wall_s']),
+        'peak_rss_mb': profile['peak_rss_mb'],
+        'stages': {stage['stage']: {'wall_s': round(stage['wall_s'], 3),
+                                    'cpu_s': round(stage['cpu_s'], 3),
+                                    'peak_rss_mb': stage['peak_rss_mb'],
+                                    'parent': stage['parent']}
+                   for stage in profile['stages']},
+    }
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baseline_for(result, previous):
+    """Latest earlier run of the same size and mode from another commit"""
+    for other in reversed(previous):
+        if (other['rows'], other['mode']) == (result['rows'], result['mode']) \
+                and other['commit'] != result['commit']:
+            return other
+    return None
+
+
+def change(after, before):
+    return f"{(after - before) / before * 100:+.0f}%" if before else "-"
+
+
+def report(result, baseline):
+    print(f"\n{result['rows']:,} rows, {result['mode']} @ {result['commit']}: "
+          f"{result['wall_s']:.2f}s, {result['rows_per_sec']:,} rows/sec, "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    if baseline:
+        print(f"  vs {baseline['commit']}: wall {change(result['wall_s'], baseline['wall_s'])}, "
+              f"peak RSS {change(result['peak_rss_mb'], baseline['peak_rss_mb'])}")
+
+    print(f"  {'stage':30} {'wall (s)':>9} {'cpu (s)':>8} {'RSS (MB)':>9} {'vs base':>8}")
+    for name, stage in result['stages'].items():
+        before = (baseline or {}).get('stages', {}).get(name)
+        delta = change(stage['wall_s'], before['wall_s']) if before else "-"
+        label = ("  " if stage.get('parent') else "") + name
+        print(f"  {label:30} {stage['wall_s']:>9.2f} {stage['cpu_s']:>8.2f} "
+              f"{stage['peak_rss_mb'] or 0:>9.0f} {delta:>8}")
+
+
+def main(sizes, streaming, backend, results_path):
+    previous = load_results(results_path)
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+
+    for rows in sizes:
+        result = benchmark(rows, streaming, backend)
+        report(result, baseline_for(result, previous))
+        with open(results_path, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+    print(f"\n✓ Results appended to: {results_path}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    results_path = RESULTS_FILE
+    if '--results' in args:
+        i = args.index('--results')
+        results_path = args[i + 1]
+        del args[i:i + 2]
+    streaming = '--streaming' in args
+    backend = 'duckdb' if '--duckdb' in args else 'pandas'
+    sizes = [int(arg) for arg in args if not arg.startswith('--')] or DEFAULT_SIZES
+    main(sizes, streaming, backend, results_path)
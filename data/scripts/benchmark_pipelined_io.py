@@ -0,0 +1,73 @@
+"""
+Pipelined I/O Benchmark
+=======================
+Runs the batch-by-batch pipeline on a synthetic TLC-shaped month twice,
+each in a fresh process: with the reader, transform and writer taking
+turns (PIPELINED_IO = False), and overlapped on PipelinedIO's threads.
+Reports the busy time of each step, the achieved overlap (busy time /
+wall time) and end-to-end throughput, and checks that both runs wrote
+the same Parquet output.
+
+Usage: python scripts/benchmark_pipelined_io.py [rows] [--duckdb]
+"""
+
+import os
+import sys
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import Config
+from benchmark_pipeline import BENCHMARK_DIR, synthetic_month, run_pipeline
+
+DEFAULT_ROWS = 2_000_000
+
+
+def run(path, workdir, backend, pipelined):
+    """Worker entry point: one streaming run with pipelined I/O on or off"""
+    Config.PIPELINED_IO = pipelined
+    return run_pipeline(path, workdir, True, backend)
+
+
+def main(rows, backend):
+    path = synthetic_month(rows)
+    results = {}
+    workdirs = {}
+
+    try:
+        for pipelined in (False, True):
+            workdir = os.path.join(BENCHMARK_DIR, f"run-{'pipelined' if pipelined else 'sequential'}")
+            shutil.rmtree(workdir, ignore_errors=True)
+            workdirs[pipelined] = workdir
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results[pipelined] = pool.submit(run, path, workdir, backend, pipelined).result()
+
+        outputs = [pq.read_table(os.path.join(workdirs[pipelined], os.path.relpath(
+            Config.INTEGRATED_DATA, Config.CLEAN_DATA_DIR))) for pipelined in (False, True)]
+        assert outputs[0].equals(outputs[1]), "pipelined output differs from the sequential run"
+    finally:
+        for workdir in workdirs.values():
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Rows: {rows:,}, {backend} backend, {Config.CHUNK_SIZE:,} rows per batch, {os.cpu_count()} CPUs")
+    print(f"  {'I/O':12} {'read (s)':>9} {'transform (s)':>14} {'write (s)':>10} {'wall (s)':>9} "
+          f"{'overlap':>8} {'rows/sec':>10} {'run (s)':>8}")
+    for pipelined, profile in results.items():
+        io = profile['io']
+        print(f"  {'pipelined' if pipelined else 'sequential':12} {io['read_s']:>9.2f} {io['transform_s']:>14.2f} "
+              f"{io['write_s']:>10.2f} {io['wall_s']:>9.2f} {io['overlap']:>7.2f}x "
+              f"{io['rows_per_sec']:>10,.0f} {profile['wall_s']:>8.2f}")
+    sequential, pipelined = results[False]['io'], results[True]['io']
+    print(f"✓ Same output; batch loop {sequential['wall_s'] / pipelined['wall_s']:.2f}x faster pipelined, "
+          f"whole run {results[False]['wall_s'] / results[True]['wall_s']:.2f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    backend = 'duckdb' if '--duckdb' in args else 'pandas'
+    sizes = [int(arg) for arg in args if not arg.startswith('--')]
+    main(sizes[0] if sizes else DEFAULT_ROWS, backend)
@@ -0,0 +1,71 @@
+"""
+Zone Geometry Benchmark
+=======================
+Times the straight-line distance and adjacency features for synthetic
+trips computed two ways: with geopandas on the shapefile (read, project,
+centroids, per-trip distance), and with the prebuilt ZoneGeometry index
+(open the memory-mapped arrays, index them by zone pair). Both must give
+the same distances.
+
+Usage: python scripts/benchmark_zone_geometry.py [shapefile] [rows]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import Config, ZoneGeometry
+
+DEFAULT_ROWS = 5_000_000
+
+
+def geopandas_distances(shapefile, pickup, dropoff):
+    """The per-run approach: load the shapes and measure each trip's zone pair"""
+    import geopandas as gpd
+
+    gdf = gpd.read_file(shapefile).to_crs(ZoneGeometry.PROJECTED_CRS)
+    centroids = gdf.dissolve(by='LocationID').centroid
+    pu = centroids.reindex(pickup).reset_index(drop=True)
+    do = centroids.reindex(dropoff).reset_index(drop=True)
+    return pu.distance(do).to_numpy() / 5280  # EPSG:2263 is in feet
+
+
+def main(shapefile, rows):
+    rng = np.random.default_rng(0)
+    pickup = rng.integers(1, 264, rows)
+    dropoff = rng.integers(1, 264, rows)
+    workdir = tempfile.mkdtemp(prefix='zone_index_')
+
+    try:
+        start = time.perf_counter()
+        expected = geopandas_distances(shapefile, pickup, dropoff)
+        geopandas_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ZoneGeometry.build(shapefile, workdir)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        geometry = ZoneGeometry.open(workdir)
+        miles = geometry.straight_line_miles(pickup, dropoff)
+        adjacent = geometry.adjacent(pickup, dropoff)
+        index_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir)
+
+    assert np.allclose(miles, expected, rtol=1e-5, equal_nan=True)
+    print(f"Rows: {rows:,}; {adjacent.mean() * 100:.1f}% of trips between adjacent zones")
+    print(f"geopandas per run: {geopandas_time:.2f}s")
+    print(f"index build (once): {build_time:.2f}s; open + lookups per run: {index_time:.2f}s "
+          f"({geopandas_time / index_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else Config.TAXI_ZONES_SHP,
+         int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ROWS)
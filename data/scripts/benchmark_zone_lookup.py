@@ -0,0 +1,89 @@
+"""
+Zone Lookup Benchmark
+=====================
+Compares the old two-merge integration path against the array-indexed
+ZoneLookup used by DataLoader.integrate_data.
+
+Usage: python scripts/benchmark_zone_lookup.py [rows ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import DataLoader, ZoneLookup
+
+DEFAULT_SIZES = [1_000_000, 10_000_000]
+REPEATS = 3
+
+
+def integrate_with_merge(trips_df, zones_df):
+    """The previous integrate_data: two full merges plus rename/drop"""
+    trips_df = trips_df.merge(zones_df, left_on='PULocationID', right_on='LocationID',
+                              how='left', suffixes=('', '_pickup'))
+    trips_df = trips_df.rename(columns={'Borough': 'pickup_borough', 'Zone': 'pickup_zone',
+                                        'service_zone': 'pickup_service_zone'})
+    trips_df = trips_df.merge(zones_df, left_on='DOLocationID', right_on='LocationID',
+                              how='left', suffixes=('', '_dropoff'))
+    trips_df = trips_df.rename(columns={'Borough': 'dropoff_borough', 'Zone': 'dropoff_zone',
+                                        'service_zone': 'dropoff_service_zone'})
+    return trips_df.drop(columns=['LocationID', 'LocationID_dropoff'])
+
+
+def integrate_with_lookup(trips_df, lookup):
+    """The array-indexed path, on a shallow copy so each repeat starts clean"""
+    trips_df = trips_df.copy(deep=False)
+    lookup.attach(trips_df, 'PULocationID', 'pickup')
+    lookup.attach(trips_df, 'DOLocationID', 'dropoff')
+    return trips_df
+
+
+def make_trips(rows, seed=0):
+    """Trip-shaped frame: location IDs (a few out of range) plus payload columns"""
+    rng = np.random.default_rng(seed)
+    trips = {
+        'PULocationID': rng.integers(1, 268, rows),
+        'DOLocationID': rng.integers(1, 268, rows),
+    }
+    for col in ['trip_distance', 'fare_amount', 'tip_amount', 'total_amount']:
+        trips[col] = rng.random(rows)
+    return pd.DataFrame(trips)
+
+
+def best_time(func, *args):
+    """Best wall time of REPEATS runs, plus the last result"""
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(sizes):
+    zones_df = DataLoader.load_zone_lookup()
+    lookup = ZoneLookup(zones_df)
+    zone_cols = [f'{prefix}_{suffix}' for prefix in ['pickup', 'dropoff']
+                 for suffix in ZoneLookup.COLUMNS.values()]
+
+    print(f"{'rows':>12} {'merge (s)':>10} {'lookup (s)':>11} {'speedup':>8}")
+    for rows in sizes:
+        trips_df = make_trips(rows)
+        merge_time, merged = best_time(integrate_with_merge, trips_df, zones_df)
+        lookup_time, looked_up = best_time(integrate_with_lookup, trips_df, lookup)
+
+        # Both paths must attach the same values
+        for col in zone_cols:
+            assert merged[col].astype(object).equals(looked_up[col].astype(object)), col
+
+        print(f"{rows:>12,} {merge_time:>10.3f} {lookup_time:>11.3f} {merge_time / lookup_time:>7.1f}x")
+        del trips_df, merged, looked_up
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,207 @@
+"""
+Synthetic Yellow Trip Generator
+===============================
+Generates yellow-trip CSVs shaped like the TLC files: zone IDs from
+taxi_zone_lookup.csv weighted towards the Yellow Zone, a daily demand
+curve, distance/duration/fare that move together, TLC fees and tips by
+payment type. On top of that it injects the problems the pipeline
+cleans: nulls, exact duplicates, and every outlier class in
+Config.OUTLIER_RULES. Output is deterministic for a given seed.
+
+Usage: python scripts/synthetic_trips.py rows output_csv [seed]
+"""
+
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_clean_up_pipeline import Config, DataLoader
+
+CHUNK_ROWS = 1_000_000
+MONTH_START = pd.Timestamp('2019-01-01')
+MONTH_DAYS = 31
+
+# Share of rows hit by each injected problem
+NULL_RATE = 0.005
+DUPLICATE_RATE = 0.003
+OUTLIER_RATE = 0.002  # per outlier class
+
+# Relative pickup demand by hour of day
+HOURLY_DEMAND = np.array([
+    3.0, 2.2, 1.6, 1.2, 1.0, 1.2, 2.4, 4.0, 4.8, 4.6, 4.4, 4.5,
+    4.7, 4.7, 5.0, 5.2, 5.0, 5.4, 6.2, 6.2, 5.6, 5.2, 4.8, 3.9,
+])
+ZONE_WEIGHTS = {'Yellow Zone': 40.0, 'Airports': 25.0, 'Boro Zone': 1.0, 'EWR': 0.2}
+PASSENGER_COUNTS = [1, 2, 3, 4, 5, 6]
+PASSENGER_WEIGHTS = [0.70, 0.14, 0.04, 0.02, 0.06, 0.04]
+NULL_COLUMNS = ['passenger_count', 'fare_amount', 'trip_distance', 'tip_amount',
+                'tolls_amount', 'PULocationID']
+
+
+def zone_distribution():
+    """Location IDs and pickup weights from the zone lookup"""
+    zones_df = DataLoader.load_zone_lookup()
+    weights = zones_df['service_zone'].map(ZONE_WEIGHTS).fillna(0.1).to_numpy()
+    return zones_df['LocationID'].to_numpy(), weights / weights.sum()
+
+
+def clean_trips(rows, rng, zones, start, span_seconds):
+    """Valid trips with correlated distance, duration and fare"""
+    location_ids, zone_weights = zones
+
+    # Pickups follow the daily demand curve; rows come out in pickup order
+    days = rng.integers(0, max(1, span_seconds // 86400), rows)
+    hours = rng.choice(24, rows, p=HOURLY_DEMAND / HOURLY_DEMAND.sum())
+    offsets = days * 86400 + hours * 3600 + rng.integers(0, 3600, rows)
+    pickup = start + pd.to_timedelta(np.sort(offsets), unit='s')
+    hour = pickup.hour.to_numpy()
+
+    distance = np.round(np.clip(rng.lognormal(0.6, 0.75, rows), 0.1, 60), 2)
+    # Slower in the daytime, faster at night
+    rush = (hour >= 7) & (hour < 20)
+    speed = rng.lognormal(np.where(rush, 2.25, 2.75), 0.3)
+    duration = np.maximum(distance / speed * 60 + rng.normal(1.5, 0.5, rows), 1.5)
+    dropoff = pickup + pd.to_timedelta(np.round(duration * 60), unit='s')
+
+    fare = np.round((2.5 + 2.5 * distance + 0.15 * duration) * 2) / 2
+    airport = rng.random(rows) < 0.02
+    fare = np.where(airport, 52.0, fare)
+    extra = np.select([(hour >= 20) | (hour < 6), (hour >= 16) & (hour < 20)], [0.5, 1.0], 0.0)
+    payment = rng.choice([1, 2, 3, 4], rows, p=[0.70, 0.28, 0.01, 0.01])
+    tip = np.where(payment == 1, np.round(fare * rng.choice([0, 0.15, 0.2, 0.25, 0.3], rows), 2), 0.0)
+    tolls = np.where(rng.random(rows) < 0.05, 5.76, 0.0)
+    total = np.round(fare + extra + 0.5 + tip + tolls + 0.3, 2)
+
+    return pd.DataFrame({
+        'VendorID': rng.choice([1, 2], rows, p=[0.4, 0.6]),
+        'tpep_pickup_datetime': pickup,
+        'tpep_dropoff_datetime': dropoff,
+        'passenger_count': rng.choice(PASSENGER_COUNTS, rows, p=PASSENGER_WEIGHTS),
+        'trip_distance': distance,
+        'RatecodeID': np.where(airport, 2, 1),
+        'store_and_fwd_flag': np.where(rng.random(rows) < 0.01, 'Y', 'N'),
+        'PULocationID': rng.choice(location_ids, rows, p=zone_weights),
+        'DOLocationID': rng.choice(location_ids, rows, p=zone_weights),
+        'payment_type': payment,
+        'fare_amount': fare,
+        'extra': extra,
+        'mta_tax': 0.5,
+        'tip_amount': tip,
+        'tolls_amount': tolls,
+        'improvement_surcharge': 0.3,
+        'total_amount': total,
+        'congestion_surcharge': np.nan,  # not charged before February 2019
+    })
+
+
+def inject_outliers(trips_df, rng, counts):
+    """Break OUTLIER_RATE of the rows for each rule in Config.OUTLIER_RULES"""
+    rows = len(trips_df)
+    parts = ['fare_amount', 'extra', 'mta_tax', 'tip_amount', 'tolls_amount', 'improvement_surcharge']
+
+    for key, *_ in Config.OUTLIER_RULES:
+        index = rng.choice(rows, int(rows * OUTLIER_RATE), replace=False)
+        if key == 'distance':
+            trips_df.loc[index, 'trip_distance'] = rng.choice([0.0, 150.0], len(index))
+        elif key == 'fare':
+            trips_df.loc[index, 'fare_amount'] = rng.choice([1.0, 750.0], len(index))
+            # Keep the total consistent so only the fare rule fires
+            trips_df.loc[index, 'total_amount'] = trips_df.loc[index, parts].sum(axis=1).round(2)
+        elif key == 'passenger_count':
+            trips_df.loc[index, 'passenger_count'] = rng.choice([0, 9], len(index))
+        elif key == 'temporal':
+            minutes = rng.choice([0.5, 240.0], len(index))
+            trips_df.loc[index, 'tpep_dropoff_datetime'] = (
+                trips_df.loc[index, 'tpep_pickup_datetime'] + pd.to_timedelta(minutes, unit='m'))
+        elif key == 'logical':
+            trips_df.loc[index, 'tpep_dropoff_datetime'] = (
+                trips_df.loc[index, 'tpep_pickup_datetime'] - pd.Timedelta(minutes=5))
+        elif key == 'total_mismatch':
+            trips_df.loc[index, 'total_amount'] += 5.0
+        else:
+            continue
+        counts[f'outlier_{key}'] += len(index)
+
+
+def inject_nulls(trips_df, rng, counts):
+    """Blank NULL_RATE of each column in NULL_COLUMNS"""
+    for col in NULL_COLUMNS:
+        index = rng.choice(len(trips_df), int(len(trips_df) * NULL_RATE), replace=False)
+        trips_df[col] = trips_df[col].astype('float64' if col != 'PULocationID' else 'Int64')
+        trips_df.loc[index, col] = np.nan if col != 'PULocationID' else pd.NA
+        counts[f'null_{col}'] += len(index)
+
+
+def inject_duplicates(trips_df, rng, counts):
+    """Copy rows next to their originals, as repeated records appear in the raw files"""
+    index = np.sort(rng.choice(len(trips_df), int(len(trips_df) * DUPLICATE_RATE), replace=False))
+    counts['duplicates'] += len(index)
+    order = np.concatenate([np.arange(len(trips_df)), index])
+    return trips_df.iloc[np.sort(order, kind='stable')].reset_index(drop=True)
+
+
+def to_csv_table(trips_df):
+    """Arrow table with timestamps written like the TLC files"""
+    table = pa.Table.from_pandas(trips_df, preserve_index=False)
+    for col in Config.TRIP_DATETIME_COLUMNS:
+        index = table.schema.get_field_index(col)
+        table = table.set_column(index, col, pc.strftime(
+            table[col].cast(pa.timestamp('s')), format=Config.DATETIME_FORMAT))
+    return table
+
+
+def generate(rows, path, seed=0):
+    """Write `rows` synthetic trips (before duplicates are added) to a CSV; returns injection counts"""
+    zones = zone_distribution()
+    counts = Counter()
+
+    chunks = max(1, -(-rows // CHUNK_ROWS))
+    span = MONTH_DAYS * 86400 // chunks
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = None
+    try:
+        for i in range(chunks):
+            # One generator per chunk so any chunk is reproducible on its own
+            rng = np.random.default_rng([seed, i])
+            chunk_rows = min(CHUNK_ROWS, rows - i * CHUNK_ROWS)
+            trips_df = clean_trips(chunk_rows, rng, zones, MONTH_START + pd.Timedelta(seconds=i * span), span)
+            inject_outliers(trips_df, rng, counts)
+            inject_nulls(trips_df, rng, counts)
+            trips_df = inject_duplicates(trips_df, rng, counts)
+
+            table = to_csv_table(trips_df)
+            if writer is None:
+                writer = pacsv.CSVWriter(path, table.schema,
+                                         write_options=pacsv.WriteOptions(quoting_style='none'))
+            writer.write_table(table)
+            counts['rows'] += len(trips_df)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return dict(counts)
+
+
+def main(rows, path, seed):
+    start = time.perf_counter()
+    counts = generate(rows, path, seed)
+    print(f"Wrote {counts['rows']:,} rows to {path} in {time.perf_counter() - start:.1f}s")
+    for key, count in counts.items():
+        if key != 'rows':
+            print(f"  {key}: {count:,}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    main(int(sys.argv[1]), sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 0)